@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import bisect
 import itertools
 import math
 import os
@@ -12,6 +13,7 @@ import sys
 import socket
 import random
 import logging
+import threading
 import time
 from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
@@ -104,6 +106,15 @@ MX_SUBNET_PREFIX_LEN_V6 = 64
 M0_SUBNET_PREFIX_LEN_V6 = 64
 # Describe default start asn of M1s
 M1_ASN_START = 65200
+# Max value of IPv4 address as integer
+IPV4_MAX_INT = 0xffffffff
+# Max number of route commands sent to exabgp in one HTTP request
+ROUTES_CHUNK_SIZE = 5000
+# Max number of route sets sent in parallel
+MAX_PARALLEL_PEERS = 16
+
+# HTTP session of each thread, see get_http_session()
+_thread_local = threading.local()
 
 
 def wait_for_http(host_ip, http_port, timeout=10):
@@ -121,6 +132,7 @@ def wait_for_http(host_ip, http_port, timeout=10):
             started = True
         except socket.error:
             tries += 1
+    s.close()
 
     return started
 
@@ -150,20 +162,27 @@ def read_topo(topo_name, path):
         return {}
 
 
-def change_routes(action, ptf_ip, port, routes):
-    logging.debug("action = {}, ptf_ip = {}, port = {}, routes = {}".format(action, ptf_ip, port, routes))
-    messages = []
+def get_http_session():
+    """
+    Get HTTP session of current thread. The session keeps the connections to exabgp HTTP API alive, so the
+    chunks of routes sent to a peer, and the peers handled by the same thread, reuse the connections.
+    """
+    session = getattr(_thread_local, "http_session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.http_session = session
+    return session
+
+
+def generate_route_commands(action, routes):
     for prefix, nexthop, aspath in routes:
         if aspath:
-            messages.append(
-                "{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath))
+            yield "{} route {} next-hop {} as-path [ {} ]".format(action, prefix, nexthop, aspath)
         else:
-            messages.append(
-                "{} route {} next-hop {}".format(action, prefix, nexthop))
-    wait_for_http(ptf_ip, port, timeout=60)
-    url = "http://%s:%d" % (ptf_ip, port)
-    data = {"commands": ";".join(messages)}
+            yield "{} route {} next-hop {}".format(action, prefix, nexthop)
+
 
+def post_route_commands(session, url, data):
     # nosemgrep-next-line
     # Flaky error `ConnectionResetError(104, 'Connection reset by peer')` may happen while using `requests.post`
     # To avoid this error, we add sleep time before sending request.
@@ -171,7 +190,7 @@ def change_routes(action, ptf_ip, port, routes):
     # If one retry fails, we increase the waiting time.
     for i in range(0, 5):
         try:
-            r = requests.post(url, data=data, timeout=360, proxies={"http": None, "https": None})
+            r = session.post(url, data=data, timeout=360, proxies={"http": None, "https": None})
             break
         except Exception as e:
             logging.debug("Got exception {}, will try to connect again".format(e))
@@ -192,6 +211,34 @@ def change_routes(action, ptf_ip, port, routes):
         )
 
 
+def change_routes(action, ptf_ip, port, routes):
+    """
+    Announce or withdraw routes through exabgp HTTP API of a peer.
+
+    The routes can be any iterable of (prefix, nexthop, aspath), a generator is consumed lazily. Route commands
+    are sent in chunks of ROUTES_CHUNK_SIZE over a keep-alive HTTP session.
+    """
+    logging.debug("action = {}, ptf_ip = {}, port = {}".format(action, ptf_ip, port))
+    wait_for_http(ptf_ip, port, timeout=60)
+    url = "http://%s:%d" % (ptf_ip, port)
+    session = get_http_session()
+
+    start = time.time()
+    route_count = 0
+    commands = generate_route_commands(action, routes)
+    while True:
+        chunk = list(itertools.islice(commands, ROUTES_CHUNK_SIZE))
+        if not chunk:
+            break
+        post_route_commands(session, url, {"commands": ";".join(chunk)})
+        route_count += len(chunk)
+        logging.debug("{} routes sent to {}, action = {}".format(route_count, url, action))
+
+    elapsed = time.time() - start
+    logging.info("{} {} routes to {} in {:.2f} seconds, {:.0f} routes/s".format(
+        action, route_count, url, elapsed, route_count / elapsed if elapsed > 0 else 0))
+
+
 def send_routes_for_each_set(args):
     routes, port, action, ptf_ip = args
     change_routes(action, ptf_ip, port, routes)
@@ -199,7 +246,7 @@ def send_routes_for_each_set(args):
 
 def send_routes_in_parallel(route_set):
     """
-    Sends the given set of routes in parallel using a thread pool.
+    Sends the given set of routes in parallel using a thread pool of at most MAX_PARALLEL_PEERS threads.
 
     Args:
         route_set (list): A list of route sets to send.
@@ -207,20 +254,21 @@ def send_routes_in_parallel(route_set):
     Returns:
         None
     """
-    # Create a pool of worker processes
-    pool = ThreadPool(processes=len(route_set))
-
-    # Use the ThreadPool.map function to apply the function to each set of routes
-    results = pool.map(send_routes_for_each_set, route_set)
+    if not route_set:
+        return
 
-    # Optionally, process the results
-    for result in results:
-        # Process individual results here
-        pass
+    # Create a pool of worker threads
+    pool = ThreadPool(processes=min(len(route_set), MAX_PARALLEL_PEERS))
 
-    # Close the pool and wait for all processes to complete
-    pool.close()
-    pool.join()
+    try:
+        start = time.time()
+        for done, _ in enumerate(pool.imap_unordered(send_routes_for_each_set, route_set), 1):
+            logging.info("Routes of {}/{} route sets sent in {:.2f} seconds".format(
+                done, len(route_set), time.time() - start))
+    finally:
+        # Close the pool and wait for all threads to complete
+        pool.close()
+        pool.join()
 
 
 # AS path from Leaf router for T0 topology
@@ -272,7 +320,7 @@ def get_uplink_router_as_path(uplink_router_type, spine_asn):
 
 # Generate prefixs of route
 def generate_prefix(subnet_size, ip_base, offset):
-    ip = get_new_ip(ip_base, offset)
+    ip = ip_int_to_str(int(ip_base) + offset)
     prefixlen = (ip_base.max_prefixlen - int(math.log(subnet_size, 2)))
     prefix = "{}/{}".format(ip, prefixlen)
     return prefix
@@ -619,6 +667,74 @@ def get_new_ip(curr_ip, skip_count):
     return new_ip
 
 
+def ip_int_to_str(ip_int, version=None):
+    """
+    Format ip address given as integer. Without version, the version is chosen like ipaddress.ip_address does.
+    """
+    if version == 4 or (version is None and ip_int <= IPV4_MAX_INT):
+        return "{}.{}.{}.{}".format(ip_int >> 24, (ip_int >> 16) & 0xff, (ip_int >> 8) & 0xff, ip_int & 0xff)
+    return str(ipaddress.IPv6Address(ip_int))
+
+
+def parse_prefix(prefix):
+    """
+    Parse prefix to tuple (version, first ip as integer, last ip as integer)
+    """
+    net = ipaddress.ip_network(UNICODE_TYPE(prefix))
+    first = int(net.network_address)
+    return net.version, first, first + net.num_addresses - 1
+
+
+def generate_subnets(net_str, new_prefixlen, start=0, count=None):
+    """
+    Generate prefixes of subnets of net_str with prefix length new_prefixlen, from the [start]th subnet.
+    The same prefixes as ipaddress.ip_network(net_str).subnets(new_prefix=new_prefixlen) are generated,
+    but lazily and without creating ipaddress objects.
+    Sample input:
+    "192.0.0.0/8", 24, 2, 2
+    Sample output:
+    "192.0.2.0/24", "192.0.3.0/24"
+    """
+    version, first, last = parse_prefix(net_str)
+    subnet_size = 1 << ((32 if version == 4 else 128) - new_prefixlen)
+    subnet_number = (last - first + 1) // subnet_size
+    end = subnet_number if count is None else min(subnet_number, start + count)
+    for index in range(start, end):
+        yield "{}/{}".format(ip_int_to_str(first + index * subnet_size, version), new_prefixlen)
+
+
+def build_prefix_intervals(prefixes):
+    """
+    Build index of prefixes for checking if another prefix is subnet of any of them.
+    Prefixes are either nested or disjoint, so only the outermost prefixes are kept, as sorted disjoint intervals
+    of integers per ip version.
+    """
+    intervals = {}
+    for version, first, last in sorted((parse_prefix(prefix) for prefix in prefixes),
+                                       key=lambda interval: (interval[0], interval[1], -interval[2])):
+        starts, ends = intervals.setdefault(version, ([], []))
+        if ends and last <= ends[-1]:
+            continue
+        starts.append(first)
+        ends.append(last)
+    return intervals
+
+
+def is_subnet_of_intervals(intervals, prefix):
+    """
+    Check if prefix is subnet of any prefix indexed by build_prefix_intervals. Like ipaddress subnet_of,
+    TypeError is raised if there are indexed prefixes of another ip version.
+    """
+    version, first, last = parse_prefix(prefix)
+    for other_version in intervals:
+        if other_version != version:
+            raise TypeError("{} and {} are not of the same version".format(
+                prefix, "IPv{} prefixes".format(other_version)))
+    starts, ends = intervals.get(version, ([], []))
+    index = bisect.bisect_right(starts, first) - 1
+    return index >= 0 and last <= ends[index]
+
+
 def get_next_ip_by_net(net_str):
     """
     Get the nearest next non-overlapping ip address based on the net_str
@@ -1127,13 +1243,11 @@ def fib_ft2_routes(topo, ptf_ip, action="announce"):
 
     group_number = len(vms) // GROUP_SIZE
     routes_per_group = ROUTE_NUMBER // group_number  # Number of routes per group
-    subnets_ipv4 = list(ipaddress.ip_network(UNICODE_TYPE(BASE_NETWORK_V4)).subnets(new_prefix=PREFIX_LEN_V4))
-    subnets_ipv6 = list(ipaddress.ip_network(UNICODE_TYPE(BASE_NETWORK_V6)).subnets(new_prefix=PREFIX_LEN_V6))
     route_offset = 0
     # Generate routes for each group
     for group_index in range(group_number):
-        group_subnets_ipv4 = subnets_ipv4[route_offset:route_offset + routes_per_group]
-        group_subnets_ipv6 = subnets_ipv6[route_offset:route_offset + routes_per_group]
+        group_subnets_ipv4 = list(generate_subnets(BASE_NETWORK_V4, PREFIX_LEN_V4, route_offset, routes_per_group))
+        group_subnets_ipv6 = list(generate_subnets(BASE_NETWORK_V6, PREFIX_LEN_V6, route_offset, routes_per_group))
         route_offset += routes_per_group
         as_path = "{} {}".format(leaf_asn_start + group_index, tor_asn_start + group_index)
         # Get the index of the VM in the group
@@ -1324,9 +1438,6 @@ def fib_lt2_routes(topo, ptf_ip, action="annouce"):
 
     default_route_as_path = get_uplink_router_as_path("upperspine", None)
 
-    all_subnetv4 = list(ipaddress.ip_network(BASE_ADDR_V4).subnets(new_prefix=24))
-    all_subnetv6 = list(ipaddress.ip_network(BASE_ADDR_V6).subnets(new_prefix=124))
-
     group_nums = len(t1_vms) // T1_GROUP_SIZE
     t1_route_per_group = math.ceil(ROUTE_NUMBER_T1 / T1_GROUP_SIZE / group_nums)
 
@@ -1339,8 +1450,10 @@ def fib_lt2_routes(topo, ptf_ip, action="annouce"):
     )
 
     for group in range(group_nums):
-        selected_v4_subnets = all_subnetv4[group * t1_route_per_group: group * t1_route_per_group + t1_route_per_group]
-        selected_v6_subnets = all_subnetv6[group * t1_route_per_group: group * t1_route_per_group + t1_route_per_group]
+        selected_v4_subnets = list(generate_subnets(BASE_ADDR_V4, 24, group * t1_route_per_group,
+                                                    t1_route_per_group))
+        selected_v6_subnets = list(generate_subnets(BASE_ADDR_V6, 124, group * t1_route_per_group,
+                                                    t1_route_per_group))
 
         as_path = "{} {}".format(leaf_asn_start + group, tor_asn_start + group)
 
@@ -1439,12 +1552,10 @@ def filterout_subnet_ipv6(aggregate_routes, candidate_routes):
 
 
 def filterout_subnet(aggregate_routes, candidate_routes):
-    subnets = []
-    for ar in aggregate_routes:
-        ar_net = ipaddress.ip_network(UNICODE_TYPE(ar[0]))
-        for cr in candidate_routes:
-            if ipaddress.ip_network(UNICODE_TYPE(cr[0])).subnet_of(ar_net):
-                subnets.append(cr)
+    if not aggregate_routes:
+        return list(set(candidate_routes))
+    intervals = build_prefix_intervals(ar[0] for ar in aggregate_routes)
+    subnets = [cr for cr in candidate_routes if is_subnet_of_intervals(intervals, cr[0])]
     return list(set(candidate_routes) - set(subnets))
 
 
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 from ansible.module_utils.basic import AnsibleModule
+import hashlib
 import json
 import traceback
 from collections import defaultdict
@@ -11,6 +12,11 @@ try:
 except ImportError:
     print("Failed to import multi_asic")
 
+try:
+    from swsscommon.swsscommon import ConfigDBConnector
+except ImportError:
+    ConfigDBConnector = None
+
 DOCUMENTATION = '''
 ---
 module: config_facts
@@ -29,6 +35,34 @@ options:
     source:
         description:
             - Set to "running" for running config, or "persistent" for persistent config from /etc/sonic/config_db.json
+    tables:
+        description:
+            - List of config DB tables to be returned. All the tables are returned if not specified.
+            - For running config, only the specified tables are read from CONFIG_DB.
+        required: false
+    config_hash:
+        description:
+            - Hash of the config returned by a previous call with the same arguments. If the config is not changed,
+              the facts are not returned and 'not_modified' is set to True.
+        required: false
+'''
+
+EXAMPLES = '''
+# Get running config facts of PORT and PORTCHANNEL tables
+- name: Get running config facts of ports and port channels
+  config_facts:
+    host: "{{ inventory_hostname }}"
+    source: running
+    tables:
+      - PORT
+      - PORTCHANNEL
+
+# Get persistent config facts only if they are changed since the previous call
+- name: Get persistent config facts if changed
+  config_facts:
+    host: "{{ inventory_hostname }}"
+    source: persistent
+    config_hash: "{{ previous_result.config_hash }}"
 '''
 
 PERSISTENT_CONFIG_PATH = "/etc/sonic/config_db{}.json"
@@ -124,6 +158,33 @@ def get_running_config(module, namespace):
     return json_info
 
 
+def get_running_config_tables(module, namespace, tables):
+    """Read the tables from running config, in the same format as 'sonic-cfggen -d --print-data' does."""
+    if ConfigDBConnector is None:
+        config = get_running_config(module, namespace)
+        return {table: config[table] for table in tables if table in config}
+
+    if namespace:
+        config_db = multi_asic.connect_config_db_for_ns(namespace)
+    else:
+        config_db = ConfigDBConnector()
+        config_db.connect()
+
+    config = {}
+    for table in tables:
+        entries = config_db.get_table(table)
+        if entries:
+            config[table] = {
+                TABLE_NAME_SEPARATOR.join(key) if isinstance(key, tuple) else key: entry
+                for key, entry in entries.items()
+            }
+    return config
+
+
+def get_config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 def get_facts(config, namespace):
     """ Create the facts dict """
 
@@ -155,6 +216,8 @@ def main():
             source=dict(required=True, choices=["running", "persistent"]),
             filename=dict(),
             namespace=dict(default=None),
+            tables=dict(type='list', default=None),
+            config_hash=dict(default=None),
         ),
         supports_check_mode=True
     )
@@ -163,6 +226,7 @@ def main():
     try:
         config = {}
         namespace = m_args['namespace']
+        tables = m_args['tables']
         if m_args["source"] == "persistent":
             if 'filename' in m_args and m_args['filename'] is not None:
                 cfg_file_path = "%s" % m_args['filename']
@@ -174,14 +238,24 @@ def main():
                     cfg_file_path = PERSISTENT_CONFIG_PATH.format("")
             with open(cfg_file_path, "r") as f:
                 config = json.load(f)
+            if tables is not None:
+                config = {table: config[table] for table in tables if table in config}
         elif m_args["source"] == "running":
-            config = get_running_config(module, namespace)
+            if tables is not None:
+                config = get_running_config_tables(module, namespace, tables)
+            else:
+                config = get_running_config(module, namespace)
+
+        config_hash = get_config_hash(config)
+        if m_args['config_hash'] == config_hash:
+            module.exit_json(ansible_facts={}, config_hash=config_hash, not_modified=True)
+
         results = get_facts(config, namespace)
 
         # NOTE: This is a workaround to allow getting port channel members from
         # PORTCHANNEL table.
         _add_member_list_to_portchannel(results)
-        module.exit_json(ansible_facts=results)
+        module.exit_json(ansible_facts=results, config_hash=config_hash, not_modified=False)
     except Exception as e:
         tb = traceback.format_exc()
         module.fail_json(msg=str(e) + "\n" + tb)
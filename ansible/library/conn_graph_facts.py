@@ -15,12 +15,14 @@ from natsort import natsorted
 try:
     from ansible.module_utils.port_utils import get_port_alias_to_name_map
     from ansible.module_utils.debug_utils import config_module_logging
+    from ansible.module_utils.graph_utils import GraphCache, cache_name
 except ImportError:
     # Add parent dir for using outside Ansible
     import sys
     sys.path.append('..')
     from module_utils.port_utils import get_port_alias_to_name_map
     from module_utils.debug_utils import config_module_logging
+    from module_utils.graph_utils import GraphCache, cache_name
 
 
 config_module_logging('conn_graph_facts')
@@ -132,12 +134,20 @@ class LabGraph(object):
         self._cache_port_alias_to_name = {}
         self._cache_port_name_to_alias = {}
 
-        self.csv_facts = {}
-        self.read_csv_files()
+        # Parsing the csv files is slow, reuse the results if the csv files are not changed. The graph facts
+        # depend on the port alias mapping of port_utils as well, they are always built from the csv facts.
+        self.csv_facts = GraphCache().get(
+            cache_name("lab_graph", self.path, self.group), list(self.csv_files.values()), self._read_csv_facts
+        )
 
         self.graph_facts = {}
         self.csv_to_graph_facts()
 
+    def _read_csv_facts(self):
+        self.csv_facts = {}
+        self.read_csv_files()
+        return self.csv_facts
+
     def read_csv_files(self):
         for k, v in self.csv_files.items():
             if os.path.exists(v):
@@ -508,6 +518,24 @@ class LabGraph(object):
         return (True, results)
 
 
+def get_graph_hostnames(path, group):
+    """Get hostnames of the devices in the graph files of the group
+
+    Hostnames are read from the devices csv file of the group only, and are cached until the file is changed.
+    So the group of the hosts is found without building the whole graph of each group.
+    """
+    devices_file = os.path.join(path, LabGraph.SUPPORTED_CSV_FILES["devices"].format(group))
+
+    def _read_hostnames():
+        if not os.path.exists(devices_file):
+            logging.debug("Missing file {}".format(devices_file))
+            return []
+        with open(devices_file) as csvfile:
+            return [row["Hostname"] for row in csv.DictReader(csvfile)]
+
+    return set(GraphCache().get(cache_name("graph_hostnames", path, group), [devices_file], _read_hostnames))
+
+
 def find_graph(hostnames, part=False):
     """Find the graph file for the target device
 
@@ -527,24 +555,22 @@ def find_graph(hostnames, part=False):
     target_group = None
     for group in graph_groups:
         logging.debug("Looking at graph files of group {} for hosts {}".format(group, hostnames))
-        lab_graph = LabGraph(LAB_GRAPHFILE_PATH, group)
-        graph_hostnames = set(lab_graph.graph_facts["devices"].keys())
+        graph_hostnames = get_graph_hostnames(LAB_GRAPHFILE_PATH, group)
         logging.debug("For graph group {}, got hostnames {}".format(group, graph_hostnames))
 
         if not part:
             if set(hostnames) <= graph_hostnames:
-                target_graph = lab_graph
                 target_group = group
                 break
         else:
             THRESHOLD = 0.8
             in_graph_hostnames = set(hostnames).intersection(graph_hostnames)
             if len(in_graph_hostnames) * 1.0 / len(hostnames) >= THRESHOLD:
-                target_graph = lab_graph
                 target_group = group
                 break
 
-    if target_graph is not None:
+    if target_group is not None:
+        target_graph = LabGraph(LAB_GRAPHFILE_PATH, target_group)
         logging.debug("Returning lab graph of group {} for hosts {}".format(target_group, hostnames))
 
     return target_graph
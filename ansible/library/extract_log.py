@@ -7,6 +7,8 @@ import traceback
 import logging.handlers
 import logging
 import hashlib
+import json
+import shutil
 import sys
 import re
 import gzip
@@ -42,6 +44,14 @@ Options:
       required: True
       Default: None
 
+    - option-name: index_dir
+      description: a directory where the marker index of the log files is kept. The index records byte offsets
+                   of the lines with LogAnalyzer markers per log file, keyed by inode. Subsequent runs scan only
+                   the data appended since the previous run, seek straight to the start marker and copy the range
+                   with zero-copy file I/O. It is used only if 'start_string' is a LogAnalyzer marker.
+      required: False
+      Default: None
+
 '''
 
 EXAMPLES = '''
@@ -58,6 +68,14 @@ EXAMPLES = '''
     dest: '/tmp/'
     flat: yes
 
+- name: Extract syslog entries since the LogAnalyzer start marker using the marker index
+  extract_log:
+    directory: '/var/log'
+    file_prefix: 'syslog'
+    start_string: 'start-LogAnalyzer-test_example.2024-01-01-00:00:00'
+    target_filename: '/tmp/syslog'
+    index_dir: '/tmp'
+
 - name: Extract all sairedis.rec entries since the last reboot
   extract_log:
     directory: '/var/log/swss'
@@ -88,6 +106,11 @@ EXAMPLES = '''
 
 logger = logging.getLogger('ExtractLog')
 
+# Lines containing this token are recorded in the marker index
+INDEX_TOKEN = 'LogAnalyzer'
+# Number of bytes at the beginning of a file used to detect reuse of its inode by another file
+INDEX_HEAD_SIZE = 4096
+
 
 def extract_lines(directory, filename, target_string):
     path = os.path.join(directory, filename)
@@ -282,11 +305,164 @@ def combine_logs_and_save(directory, filenames, start_string, target_string, tar
                 path, line_processed, line_copied))
 
 
-def extract_log(directory, prefixname, target_string, target_filename):
+def open_log(path, mode='rt'):
+    if 'gz' in path:
+        return gzip.open(path, mode=mode)
+    return open(path, mode)
+
+
+class MarkerIndex(object):
+    """Persistent index of the lines containing INDEX_TOKEN in the log files of @directory
+    starting with @prefixname.
+
+    Entries are keyed by inode, so they survive rename of the files by logrotate. An entry records
+    how many bytes of the file were scanned and the offsets of the found lines. The entry is valid
+    while the file is not smaller than the scanned size and its first bytes are unchanged, so only
+    the data appended since the previous run has to be scanned. For compressed files the offsets
+    are in the uncompressed stream."""
+
+    def __init__(self, index_dir, directory, prefixname):
+        name = hashlib.md5(os.path.join(directory, prefixname).encode('utf-8')).hexdigest()
+        self.path = os.path.join(index_dir, 'extract_log.{}.{}.index'.format(prefixname, name))
+        self.directory = directory
+        self.entries = {}
+        try:
+            with open(self.path) as fp:
+                self.entries = json.load(fp)
+        except (IOError, OSError, ValueError):
+            logger.debug("extract_log index {} is not available, building it".format(self.path))
+
+    def _head_md5(self, path, size):
+        with open(path, 'rb') as fp:
+            return hashlib.md5(fp.read(min(size, INDEX_HEAD_SIZE))).hexdigest()
+
+    def _scan(self, path, entry):
+        token = INDEX_TOKEN.encode('utf-8')
+        offset = entry['scanned']
+        with open_log(path, 'rb') as fp:
+            fp.seek(offset)
+            for line in fp:
+                if not line.endswith(b'\n') and 'gz' not in path:
+                    # The line is still being written, scan it next time
+                    break
+                if token in line:
+                    entry['lines'].append([offset, line.decode('utf-8', 'replace').replace('\x00', '')])
+                offset += len(line)
+        entry['scanned'] = offset
+
+    def update(self, filenames):
+        """Bring the entries of @filenames up to date and drop entries of files which are gone"""
+        entries = {}
+        for filename in filenames:
+            path = os.path.join(self.directory, filename)
+            st = os.stat(path)
+            inode = str(st.st_ino)
+            entry = self.entries.get(inode)
+            if entry is not None:
+                if st.st_size < entry['size'] or entry['head_md5'] != self._head_md5(path, entry['head_size']):
+                    entry = None
+                elif 'gz' in path and st.st_size != entry['size']:
+                    entry = None
+            if entry is None:
+                entry = {'scanned': 0, 'lines': [], 'head_size': min(st.st_size, INDEX_HEAD_SIZE),
+                         'head_md5': self._head_md5(path, st.st_size)}
+                self._scan(path, entry)
+            elif 'gz' not in path and entry['scanned'] < st.st_size:
+                self._scan(path, entry)
+            entry['size'] = st.st_size
+            entry['filename'] = filename
+            entries[inode] = entry
+        self.entries = entries
+
+    def save(self):
+        tmp_path = '{}.{}'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.entries, fp)
+        os.rename(tmp_path, self.path)
+
+    def locate(self, filenames, target_string):
+        """Find the log file with the latest line containing @target_string and the offset in it from
+        which the log has to be copied. Gives the same result as extract_latest_line_with_string and
+        combine_logs_and_save do for the lines containing INDEX_TOKEN.
+
+        Returns tuple (filename, offset, latest_line) or None if there is no such line"""
+        by_filename = dict((entry['filename'], entry) for entry in self.entries.values())
+        for filename in filenames:
+            entry = by_filename[filename]
+            lines = [(offset, line) for offset, line in entry['lines'] if target_string in line]
+            target_lines = [(filename, None, line, entry['size']) for offset, line in lines
+                            if 'extract_log' not in line]
+            if not target_lines:
+                if 'gz' not in filename and entry['scanned'] < entry['size']:
+                    # The line may be in the part of the file which is not indexed yet
+                    return None
+                continue
+
+            path = os.path.join(self.directory, filename)
+            dt = datetime.datetime.fromtimestamp(os.path.getctime(path))
+            target = None
+            for target_line in target_lines:
+                target_line = (filename, dt, target_line[2], target_line[3])
+                if target is None or comparator(target_line, target) > 0:
+                    target = target_line
+            # combine_logs_and_save starts copying from the first line containing the target string
+            return filename, lines[0][0], target[2]
+
+        return None
+
+
+def copy_logs_from_offset(directory, filenames, offset, target_filename):
+    """Copy the log starting at @offset of the last file in @filenames and all the files
+    before it in reverse order. Plain files are copied with sendfile, if it is available."""
+    with open(target_filename, 'wb') as fp:
+        for filename in reversed(filenames):
+            path = os.path.join(directory, filename)
+            with open_log(path, 'rb') as src:
+                src.seek(offset)
+                if 'gz' in path or not hasattr(os, 'sendfile'):
+                    shutil.copyfileobj(src, fp)
+                else:
+                    remaining = os.fstat(src.fileno()).st_size - offset
+                    while remaining > 0:
+                        sent = os.sendfile(fp.fileno(), src.fileno(), offset, remaining)
+                        if sent == 0:
+                            break
+                        offset += sent
+                        remaining -= sent
+            logger.debug("extract_log copied file {}".format(path))
+            offset = 0
+
+
+def extract_log_with_index(directory, prefixname, filenames, target_string, target_filename, index_dir):
+    """Extract log using the marker index in @index_dir. Returns False if the target string is not
+    in the index, in which case the log has to be extracted by scanning the files"""
+    index = MarkerIndex(index_dir, directory, prefixname)
+    index.update(filenames)
+    index.save()
+    located = index.locate(filenames, target_string)
+    if located is None:
+        return False
+
+    file_with_latest_line, offset, latest_line = located
+    m = hashlib.md5()
+    m.update(latest_line.encode('utf-8'))
+    logger.debug("extract_log start file {} offset {}, latest line md5sum {}".format(
+        file_with_latest_line, offset, m.hexdigest()))
+    files_to_copy = calculate_files_to_copy(filenames, file_with_latest_line)
+    logger.debug("extract_log subsequent files {}".format(files_to_copy))
+    copy_logs_from_offset(directory, files_to_copy, offset, target_filename)
+    return True
+
+
+def extract_log(directory, prefixname, target_string, target_filename, index_dir=None):
     logger.debug("extract_log for start string {}".format(
         target_string.replace("start-", "")))
     filenames = list_files(directory, prefixname)
     logger.debug("extract_log from files {}".format(filenames))
+    if index_dir and INDEX_TOKEN in target_string:
+        if extract_log_with_index(directory, prefixname, filenames, target_string, target_filename, index_dir):
+            return
+        logger.debug("extract_log start string is not in the index, scanning files")
     file_with_latest_line, file_create_time, latest_line, file_size = extract_latest_line_with_string(
         directory, filenames, target_string)
     m = hashlib.md5()
@@ -308,6 +484,7 @@ def main():
             file_prefix=dict(required=True, type='str'),
             start_string=dict(required=True, type='str'),
             target_filename=dict(required=True, type='str'),
+            index_dir=dict(required=False, type='str', default=None),
         ),
         supports_check_mode=False)
 
@@ -319,7 +496,7 @@ def main():
 
     try:
         extract_log(p['directory'], p['file_prefix'],
-                    p['start_string'], p['target_filename'])
+                    p['start_string'], p['target_filename'], index_dir=p['index_dir'])
     except Exception:
         tb = traceback.format_exc()
         module.fail_json(msg=tb)
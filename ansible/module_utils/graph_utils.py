@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+GRAPH_CACHE_DIR_ENV = "CONN_GRAPH_CACHE_DIR"
+DEFAULT_GRAPH_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ansible", "cache", "conn_graph")
+# Bump the version when format of the cached data is changed
+GRAPH_CACHE_VERSION = 2
+
+
+def cache_name(prefix, *parts):
+    """Get name of cache entry for the graph data identified by the parts, e.g. folder and group of graph files"""
+    key = "\0".join(os.path.abspath(part) if os.path.sep in part else part for part in parts)
+    return "{}_{}".format(prefix, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+
+
+def _file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+class GraphCache(object):
+    """Cache of data parsed from the connection graph files
+
+    Each cache entry is stored in a pickle file in the cache folder, together with the mtime, size and content hash
+    of the graph files it was parsed from. The cached data is used as long as the graph files have the same mtime
+    and size, or the same content hash. Otherwise the data is parsed from the graph files again.
+
+    The cache folder is `~/.ansible/cache/conn_graph` by default and can be changed by environment variable
+    `CONN_GRAPH_CACHE_DIR`. Setting the environment variable to an empty string disables the cache.
+    """
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get(GRAPH_CACHE_DIR_ENV, DEFAULT_GRAPH_CACHE_DIR)
+        self.cache_dir = cache_dir
+
+    @property
+    def enabled(self):
+        return bool(self.cache_dir)
+
+    def _entry_path(self, name):
+        return os.path.join(self.cache_dir, "{}.pickle".format(name))
+
+    def _load_entry(self, name):
+        try:
+            with open(self._entry_path(name), "rb") as f:
+                entry = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != GRAPH_CACHE_VERSION:
+            return None
+        return entry
+
+    def _save_entry(self, name, entry):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".{}.".format(name))
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=2)
+            # Atomic, concurrent readers get either the old or the new entry
+            os.rename(tmp_path, self._entry_path(name))
+        except (IOError, OSError) as e:
+            logging.debug("Failed to save graph cache entry {}: {}".format(name, repr(e)))
+
+    def get(self, name, files, build):
+        """Get the data parsed from the files, from cache if the files are not changed
+
+        Args:
+            name (str): Name of the cache entry.
+            files (list): Paths of the graph files the data is parsed from. A missing file is allowed.
+            build (function): Function without argument, parsing the data from the files.
+
+        Returns:
+            The data returned by build, or the cached copy of it.
+        """
+        if not self.enabled:
+            return build()
+
+        files = sorted(files)
+        stats = [_file_stat(path) for path in files]
+        entry = self._load_entry(name)
+        if entry is not None and entry["files"] == files:
+            if entry["stats"] == stats:
+                logging.debug("Use cached graph data {}".format(name))
+                return entry["data"]
+
+            # Files are touched or changed. The data is still valid if content of the files is not changed.
+            hashes = [_file_hash(path) if stat is not None else None for path, stat in zip(files, stats)]
+            if entry["hashes"] == hashes:
+                logging.debug("Use cached graph data {}, content of the graph files is not changed".format(name))
+                entry["stats"] = stats
+                self._save_entry(name, entry)
+                return entry["data"]
+        else:
+            hashes = [_file_hash(path) if stat is not None else None for path, stat in zip(files, stats)]
+
+        logging.debug("Build graph data {} from graph files {}".format(name, files))
+        data = build()
+        self._save_entry(name, {
+            "version": GRAPH_CACHE_VERSION,
+            "files": files,
+            "stats": stats,
+            "hashes": hashes,
+            "data": data,
+        })
+        return data
@@ -1,11 +1,19 @@
 from __future__ import (absolute_import, division, print_function)
 import os.path
+import sys
 import yaml
 import xml.etree.ElementTree as ET
 
 from ansible.utils.display import Display
 from ansible.plugins.lookup import LookupBase
 from ansible.errors import AnsibleError
+
+try:
+    from ansible.module_utils.graph_utils import GraphCache, cache_name
+except ImportError:
+    # Custom module_utils are not importable by lookup plugins, import it from the ansible folder of the repo
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+    from module_utils.graph_utils import GraphCache, cache_name
 __metaclass__ = type
 
 DOCUMENTATION = """
@@ -35,14 +43,19 @@ class LookupModule(LookupBase):
         with open(graph_list_file) as fd:
             file_list = yaml.safe_load(fd)
 
+        graph_cache = GraphCache()
         for gf in file_list:
             display.debug('Looking at conn graph file: %s' % gf)
             gf = self.find_file_in_search_path(variables, 'files', gf)
             if not gf:
                 continue
-            with open(gf) as fd:
-                root = ET.fromstring(fd.read())
-                hosts_all = [d.attrib['Hostname'] for d in root.iter('Device')]
-                if set(hostnames) <= set(hosts_all):
-                    return [os.path.basename(gf)]
+            hosts_all = graph_cache.get(cache_name('graphfile_hosts', gf), [gf], lambda: self._read_hostnames(gf))
+            if set(hostnames) <= set(hosts_all):
+                return [os.path.basename(gf)]
         return []
+
+    @staticmethod
+    def _read_hostnames(graph_file):
+        with open(graph_file) as fd:
+            root = ET.fromstring(fd.read())
+            return [d.attrib['Hostname'] for d in root.iter('Device')]
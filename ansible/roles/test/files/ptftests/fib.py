@@ -1,7 +1,7 @@
 import re
 import six
 
-from ipaddress import ip_address, ip_network
+from ipaddress import ip_address
 from lpm import LpmDict
 
 # These subnets are excluded from FIB test
@@ -56,18 +56,22 @@ class Fib():
 
         # filter out empty lines and lines starting with '#'
         pattern = re.compile("^#.*$|^[ \t]*$")
+        # most of the routes share a few next hop groups, parse each of them once
+        next_hops = {}
 
+        # read the file line by line, large FIB files are not loaded into memory
         with open(file_path, 'r') as f:
-            for line in f.readlines():
+            for line in f:
                 if pattern.match(line):
                     continue
-                entry = line.split(' ', 1)
-                prefix = ip_network(six.text_type(entry[0]))
-                next_hop = self.NextHop(entry[1])
-                if prefix.version == 4:
-                    self._ipv4_lpm_dict[str(prefix)] = next_hop
-                elif prefix.version == 6:
-                    self._ipv6_lpm_dict[str(prefix)] = next_hop
+                prefix, next_hop_info = line.split(' ', 1)
+                next_hop = next_hops.get(next_hop_info)
+                if next_hop is None:
+                    next_hop = next_hops[next_hop_info] = self.NextHop(next_hop_info)
+                if ':' in prefix:
+                    self._ipv6_lpm_dict[prefix] = next_hop
+                else:
+                    self._ipv4_lpm_dict[prefix] = next_hop
 
     def __getitem__(self, ip):
         ip = ip_address(six.text_type(ip))
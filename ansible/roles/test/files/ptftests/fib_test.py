@@ -21,6 +21,7 @@ Usage:          Examples of how to use log analyzer
 # ---------------------------------------------------------------------
 import logging
 import random
+import socket
 import time
 import json
 import itertools
@@ -28,6 +29,7 @@ import fib
 
 import ptf
 import ptf.packet as scapy
+import ptf.ptfutils
 
 from ptf.base_tests import BaseTest
 from ptf.mask import Mask
@@ -35,8 +37,7 @@ from ptf.testutils import test_params_get
 from ptf.testutils import simple_tcp_packet
 from ptf.testutils import simple_tcpv6_packet
 from ptf.testutils import send_packet
-from ptf.testutils import verify_packet_any_port
-from ptf.testutils import verify_no_packet_any
+from ptf.testutils import dp_poll
 
 from collections.abc import Iterable
 from collections import defaultdict
@@ -79,6 +80,7 @@ class FibTest(BaseTest):
     ACTION_FWD = 'fwd'
     ACTION_DROP = 'drop'
     DEFAULT_SWITCH_TYPE = 'voq'
+    DEFAULT_BATCH_SIZE = 32
 
     _required_params = [
         'fib_info_files',
@@ -115,6 +117,7 @@ class FibTest(BaseTest):
          - dst_vid                vlan tag id of dst pkts. Default: None(untag)
          - ignore_ttl:            mask the ttl field in the expected packet
          - single_fib_for_duts:   have a single fib file for all DUTs in multi-dut case. Default: False
+         - batch_size:            number of pkts sent before the received pkts are verified. Default: 32
         '''
         self.dataplane = ptf.dataplane_instance
         self.asic_type = self.test_params.get('asic_type')
@@ -178,6 +181,7 @@ class FibTest(BaseTest):
         self.single_fib = self.test_params.get(
             'single_fib_for_duts', "multiple-fib")
         self.topo_type = self.test_params.get('topo_type', None)
+        self.batch_size = max(int(self.test_params.get('batch_size', self.DEFAULT_BATCH_SIZE)), 1)
 
     def check_ip_ranges(self, ipv4=True):
         for dut_index, dut_fib in enumerate(self.fibs):
@@ -193,9 +197,12 @@ class FibTest(BaseTest):
             else:
                 covered_ip_ranges = ip_ranges[:]
 
+            # send and verify the pkts of all the ranges in batches
+            routes = []
             for ip_range in covered_ip_ranges:
                 if ip_range.get_first_ip() in dut_fib:
-                    self.check_ip_range(ip_range, dut_index, ipv4)
+                    routes.extend(self.get_ip_range_routes(ip_range, dut_index, ipv4))
+            self.check_ip_routes(routes, ipv4)
 
             random.shuffle(covered_ip_ranges)
             self.check_balancing(covered_ip_ranges, dut_index, ipv4)
@@ -239,7 +246,14 @@ class FibTest(BaseTest):
         return src_port, exp_port_lists, next_hops
 
     def check_ip_range(self, ip_range, dut_index, ipv4=True):
+        self.check_ip_routes(self.get_ip_range_routes(ip_range, dut_index, ipv4), ipv4)
 
+    def get_ip_range_routes(self, ip_range, dut_index, ipv4=True):
+        '''
+        @summary: Get the routes to check for the first, the last and a random IP of the range
+        @return list of (src_port, dst_ip, exp_port_lists)
+        '''
+        routes = []
         dst_ips = []
         dst_ips.append(ip_range.get_first_ip())
         if ip_range.length() > 1:
@@ -259,10 +273,11 @@ class FibTest(BaseTest):
                 if not exp_port_list:
                     logging.info('Skip checking ip range {} with exp_ports {}'.format(
                         ip_range, exp_port_lists))
-                    return
+                    return []
             logging.info('Checking ip range {}, src_port={}, exp_port_lists={}, dst_ip={}, dut_index={}'
                          .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
-            self.check_ip_route(src_port, dst_ip, exp_port_lists, ipv4)
+            routes.append((src_port, dst_ip, exp_port_lists))
+        return routes
 
     def check_balancing(self, ip_ranges, dut_index, ipv4=True):
         # Test traffic balancing across ECMP/LAG members
@@ -296,9 +311,9 @@ class FibTest(BaseTest):
                 # Change balancing_test_times according to number of next hop groups
                 logging.info('Checking ip range balancing {}, src_port={}, exp_ports={}, dst_ip={}, dut_index={}'
                              .format(ip_range, src_port, exp_port_lists, dst_ip, dut_index))
-                for i in range(0, self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))):
-                    (matched_port, _) = self.check_ip_route(
-                        src_port, dst_ip, exp_port_lists, ipv4)
+                test_times = self.balancing_test_times*len(list(itertools.chain(*exp_port_lists)))
+                for (matched_port, _) in self.check_ip_routes(
+                        [(src_port, dst_ip, exp_port_lists)] * test_times, ipv4):
                     hit_count_map[matched_port] = hit_count_map.get(
                         matched_port, 0) + 1
                 for next_hop in next_hops:
@@ -310,21 +325,9 @@ class FibTest(BaseTest):
                     break
 
     def check_ip_route(self, src_port, dst_ip_addr, dst_port_lists, ipv4=True):
-        if ipv4:
-            res = self.check_ipv4_route(src_port, dst_ip_addr, dst_port_lists)
-        else:
-            res = self.check_ipv6_route(src_port, dst_ip_addr, dst_port_lists)
-
-        if self.pkt_action == self.ACTION_DROP:
-            return res
-
-        (matched_port, received) = res
-
-        assert received
-
-        logging.info("Received packet at " + str(matched_port))
-        time.sleep(0.02)
-
+        (matched_port, received) = self.check_ip_routes([(src_port, dst_ip_addr, dst_port_lists)], ipv4)[0]
+        if self.pkt_action == self.ACTION_FWD:
+            logging.info("Received packet at " + str(matched_port))
         return (matched_port, received)
 
     def check_ipv4_route(self, src_port, dst_ip_addr, dst_port_lists):
@@ -334,8 +337,26 @@ class FibTest(BaseTest):
         @param dest_ip_addr: destination IP to build packet with.
         @param dst_port_lists: list of ports on which to expect packet to come back from the switch
         '''
-        sport = random.randint(0, 65535)
-        dport = random.randint(0, 65535)
+        return self.check_ip_routes([(src_port, dst_ip_addr, dst_port_lists)])[0]
+
+    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+        '''
+        @summary: Check IPv6 route works.
+        @param source_port_index: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
+        '''
+        return self.check_ip_routes([(src_port, dst_ip_addr, dst_port_lists)], ipv4=False)[0]
+
+    def build_ipv4_pkts(self, src_port, dst_ip_addr, sport, dport):
+        '''
+        @summary: Build IPv4 packet to send to switch and the masked packet expected from it.
+        @param src_port: index of port to use for sending packet to switch
+        @param dest_ip_addr: destination IP to build packet with.
+        @param sport: TCP source port
+        @param dport: TCP destination port
+        @return (pkt, masked_exp_pkt)
+        '''
         ip_src = "30.0.0.1"
         ip_dst = dst_ip_addr
         src_mac = self.dataplane.get_mac(0, src_port)
@@ -374,66 +395,17 @@ class FibTest(BaseTest):
             masked_exp_pkt.set_do_not_care_scapy(scapy.IP, "chksum")
             masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
 
-        send_packet(self, src_port, pkt)
-        logging.info('Sent Ether(src={}, dst={})/IP(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
-                     .format(pkt.src,
-                             pkt.dst,
-                             pkt['IP'].src,
-                             pkt['IP'].dst,
-                             sport,
-                             dport,
-                             src_port))
-        logging.info('Expect Ether(src={}, dst={})/IP(src={}, dst={})/TCP(sport={}, dport={})'
-                     .format('any',
-                             'any',
-                             ip_src,
-                             ip_dst,
-                             sport,
-                             dport))
-
-        dst_ports = list(itertools.chain(*dst_port_lists))
-        if self.pkt_action == self.ACTION_FWD:
-            rcvd_port_index, rcvd_pkt = verify_packet_any_port(
-                self, masked_exp_pkt, dst_ports, timeout=1)
-            rcvd_port = dst_ports[rcvd_port_index]
-            len_rcvd_pkt = len(rcvd_pkt)
-            logging.info('Recieved packet at port {} and packet is {} bytes'.format(
-                rcvd_port, len_rcvd_pkt))
-            logging.info(
-                'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
-            else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if exp_src_mac != actual_src_mac:
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
-            return (rcvd_port, rcvd_pkt)
-        elif self.pkt_action == self.ACTION_DROP:
-            verify_no_packet_any(self, masked_exp_pkt, dst_ports)
-            return (None, None)
-    # ---------------------------------------------------------------------
+        return pkt, masked_exp_pkt
 
-    def check_ipv6_route(self, src_port, dst_ip_addr, dst_port_lists):
+    def build_ipv6_pkts(self, src_port, dst_ip_addr, sport, dport):
         '''
-        @summary: Check IPv6 route works.
-        @param source_port_index: index of port to use for sending packet to switch
+        @summary: Build IPv6 packet to send to switch and the masked packet expected from it.
+        @param src_port: index of port to use for sending packet to switch
         @param dest_ip_addr: destination IP to build packet with.
-        @param dst_port_lists: list of ports on which to expect packet to come back from the switch
-        @return Boolean
+        @param sport: TCP source port
+        @param dport: TCP destination port
+        @return (pkt, masked_exp_pkt)
         '''
-        sport = random.randint(0, 65535)
-        dport = random.randint(0, 65535)
         ip_src = '2000:0030::1'
         ip_dst = dst_ip_addr
         src_mac = self.dataplane.get_mac(0, src_port)
@@ -469,54 +441,108 @@ class FibTest(BaseTest):
             masked_exp_pkt.set_do_not_care_scapy(scapy.IPv6, "hlim")
             masked_exp_pkt.set_do_not_care_scapy(scapy.TCP, "chksum")
 
-        send_packet(self, src_port, pkt)
-        logging.info('Sent Ether(src={}, dst={})/IPv6(src={}, dst={})/TCP(sport={}, dport={}) on port {}'
-                     .format(pkt.src,
-                             pkt.dst,
-                             pkt['IPv6'].src,
-                             pkt['IPv6'].dst,
-                             sport,
-                             dport,
-                             src_port))
-        logging.info('Expect Ether(src={}, dst={})/IPv6(src={}, dst={})/TCP(sport={}, dport={})'
-                     .format('any',
-                             'any',
-                             ip_src,
-                             ip_dst,
-                             sport,
-                             dport))
-
-        dst_ports = list(itertools.chain(*dst_port_lists))
-        if self.pkt_action == self.ACTION_FWD:
-            rcvd_port_index, rcvd_pkt = verify_packet_any_port(
-                self, masked_exp_pkt, dst_ports, timeout=1)
-            rcvd_port = dst_ports[rcvd_port_index]
-            len_rcvd_pkt = len(rcvd_pkt)
-            logging.info('Recieved packet at port {} and packet is {} bytes'.format(
-                rcvd_port, len_rcvd_pkt))
-            logging.info(
-                'Recieved packet with length of {}'.format(len_rcvd_pkt))
-            exp_src_mac = None
-            if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
-                # active-active dualtor, the packet could be received from either ToR, so use the received
-                # port to find the corresponding ToR
-                for dut_index, port_list in enumerate(dst_port_lists):
-                    if rcvd_port in port_list:
-                        exp_src_mac = self.ptf_test_port_map[str(
-                            rcvd_port)]["target_src_mac"][dut_index]
+        return pkt, masked_exp_pkt
+
+    def check_ip_routes(self, routes, ipv4=True):
+        '''
+        @summary: Check the routes work. Packets of up to batch_size routes are sent back to back
+        before the received packets are verified, instead of sending and verifying them one by one.
+        @param routes: list of (src_port, dst_ip, dst_port_lists)
+        @return list of (matched_port, received packet) of the routes, (None, None) if pkt_action is drop
+        '''
+        results = []
+        for index in range(0, len(routes), self.batch_size):
+            results.extend(self.check_ip_route_batch(routes[index:index + self.batch_size], ipv4))
+        return results
+
+    def check_ip_route_batch(self, routes, ipv4=True):
+        '''
+        @summary: Send the packets of the routes, then verify the packets received from the switch.
+        The sent packets are identified by the destination IP and random TCP ports.
+        @param routes: list of (src_port, dst_ip, dst_port_lists)
+        @return list of (matched_port, received packet) of the routes, (None, None) if pkt_action is drop
+        '''
+        family = socket.AF_INET if ipv4 else socket.AF_INET6
+        pending = {}
+        for index, (src_port, dst_ip_addr, dst_port_lists) in enumerate(routes):
+            while True:
+                sport = random.randint(0, 65535)
+                dport = random.randint(0, 65535)
+                key = (socket.inet_pton(family, dst_ip_addr), sport, dport)
+                if key not in pending:
+                    break
+            if ipv4:
+                pkt, masked_exp_pkt = self.build_ipv4_pkts(src_port, dst_ip_addr, sport, dport)
             else:
-                exp_src_mac = self.ptf_test_port_map[str(
-                    rcvd_port)]["target_src_mac"][0]
-            actual_src_mac = scapy.Ether(rcvd_pkt).src
-            if exp_src_mac != actual_src_mac:
-                raise Exception(
-                    "Pkt sent from {} to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
-                    "but the src mac doesn't match, expected {}, got {}".
-                    format(ip_src, ip_dst, src_port, rcvd_port, exp_src_mac, actual_src_mac))
-            return (rcvd_port, rcvd_pkt)
-        elif self.pkt_action == self.ACTION_DROP:
-            verify_no_packet_any(self, masked_exp_pkt, dst_ports)
-            return (None, None)
+                pkt, masked_exp_pkt = self.build_ipv6_pkts(src_port, dst_ip_addr, sport, dport)
+            pending[key] = (index, src_port, dst_ip_addr, dst_port_lists, masked_exp_pkt)
+            send_packet(self, src_port, pkt)
+            logging.debug('Sent pkt to {} with TCP(sport={}, dport={}) on port {}, expect it on ports {}'
+                          .format(dst_ip_addr, sport, dport, src_port, dst_port_lists))
+
+        results = [(None, None)] * len(routes)
+        if self.pkt_action == self.ACTION_FWD:
+            timeout = 1
+        else:
+            timeout = ptf.ptfutils.default_negative_timeout
+        deadline = time.time() + timeout
+        while pending and time.time() < deadline:
+            result = dp_poll(self, device_number=0, timeout=deadline - time.time())
+            if not isinstance(result, self.dataplane.PollSuccess):
+                break
+            rcvd_pkt = scapy.Ether(result.packet)
+            ip_layer = rcvd_pkt.getlayer(scapy.IP if ipv4 else scapy.IPv6)
+            tcp_layer = rcvd_pkt.getlayer(scapy.TCP)
+            if ip_layer is None or tcp_layer is None:
+                continue
+            key = (socket.inet_pton(family, ip_layer.dst), tcp_layer.sport, tcp_layer.dport)
+            if key not in pending:
+                continue
+            index, src_port, dst_ip_addr, dst_port_lists, masked_exp_pkt = pending[key]
+            rcvd_port = result.port
+            if rcvd_port not in itertools.chain(*dst_port_lists) or not masked_exp_pkt.pkt_match(result.packet):
+                continue
+            if self.pkt_action == self.ACTION_DROP:
+                raise AssertionError("Pkt sent to {} on port {} should be dropped, but rcvd on port {}"
+                                     .format(dst_ip_addr, src_port, rcvd_port))
+
+            del pending[key]
+            logging.debug('Recieved pkt to {} at port {} and packet is {} bytes'.format(
+                dst_ip_addr, rcvd_port, len(result.packet)))
+            self.check_src_mac(src_port, dst_ip_addr, dst_port_lists, rcvd_port, rcvd_pkt)
+            results[index] = (rcvd_port, result.packet)
+            # wait for each packet as long as verify_packet_any_port
+            deadline = time.time() + timeout
+
+        if self.pkt_action == self.ACTION_FWD and pending:
+            missing = ['{} from port {} to ports {}'.format(dst_ip_addr, src_port, dst_port_lists)
+                       for _, src_port, dst_ip_addr, dst_port_lists, _ in sorted(pending.values())]
+            raise AssertionError("Did not receive {} of {} pkts: {}".format(
+                len(missing), len(routes), ', '.join(missing[:10])))
+        logging.info('Checked {} routes'.format(len(routes)))
+        return results
+
+    def check_src_mac(self, src_port, dst_ip_addr, dst_port_lists, rcvd_port, rcvd_pkt):
+        '''
+        @summary: Check the src mac of the received packet is the mac of the DUT the packet is received from
+        '''
+        exp_src_mac = None
+        if len(self.ptf_test_port_map[str(rcvd_port)]["target_src_mac"]) > 1:
+            # active-active dualtor, the packet could be received from either ToR, so use the received
+            # port to find the corresponding ToR
+            for dut_index, port_list in enumerate(dst_port_lists):
+                if rcvd_port in port_list:
+                    exp_src_mac = self.ptf_test_port_map[str(
+                        rcvd_port)]["target_src_mac"][dut_index]
+        else:
+            exp_src_mac = self.ptf_test_port_map[str(
+                rcvd_port)]["target_src_mac"][0]
+        actual_src_mac = rcvd_pkt.src
+        if exp_src_mac != actual_src_mac:
+            raise Exception(
+                "Pkt sent to {} on port {} was rcvd pkt on {} which is one of the expected ports, "
+                "but the src mac doesn't match, expected {}, got {}".
+                format(dst_ip_addr, src_port, rcvd_port, exp_src_mac, actual_src_mac))
 
     def check_within_expected_range(self, actual, expected):
         '''
@@ -1,7 +1,9 @@
+import binascii
 import random
+import socket
 import six
 
-from ipaddress import ip_address, ip_network
+from ipaddress import IPv4Address, IPv6Address
 from SubnetTree import SubnetTree
 
 '''
@@ -19,96 +21,121 @@ sub-class IpInterval then could be used to get the first/last/random IP within
 this range. It could also check the length of the range and if an IP is within
 this range.
 
+The range boundaries are kept as integers and the sorted ranges are cached
+until a prefix is added or removed, so that FIBs with hundreds of thousands
+of prefixes are loaded and segmented quickly.
+
 To achieve the LPM functionality, use the LpmDict as a dictionary and use
 [] operator to get the corresponding value using the key (IP).
 
 Please check the test_lpm.py file to see the details of how this class works.
 '''
 
+IPV4_MAX_IP = (1 << 32) - 1
+IPV6_MAX_IP = (1 << 128) - 1
+
+
+def parse_prefix(prefix):
+    '''
+    Parse the prefix string without creating ip_network object, it is as strict as ip_network(prefix).
+    Returns tuple (version, first IP, last IP, prefix length), the IPs are integers.
+    '''
+    address, _, prefixlen = prefix.strip().partition('/')
+    if ':' in address:
+        version, family, bits = 6, socket.AF_INET6, 128
+    else:
+        version, family, bits = 4, socket.AF_INET, 32
+    try:
+        first = int(binascii.hexlify(socket.inet_pton(family, address)), 16)
+        prefixlen = int(prefixlen) if prefixlen else bits
+    except (socket.error, ValueError):
+        raise ValueError('{} does not appear to be an IPv4 or IPv6 network'.format(prefix))
+    if prefixlen < 0 or prefixlen > bits:
+        raise ValueError('{} has invalid prefix length'.format(prefix))
+    host_mask = (1 << (bits - prefixlen)) - 1
+    if first & host_mask:
+        raise ValueError('{} has host bits set'.format(prefix))
+    return version, first, first | host_mask, prefixlen
+
 
 class LpmDict():
     class IpInterval:
-        def __init__(self, s, e):
+        # s and e are ip_address objects, or integers if ipv4 is given
+        def __init__(self, s, e, ipv4=None):
             assert s <= e
-            self._start = s
-            self._end = e
+            if ipv4 is None:
+                ipv4 = s.version == 4
+            self._address = IPv4Address if ipv4 else IPv6Address
+            self._start = int(s)
+            self._end = int(e)
 
         # __len__ has hard limit on returning long int
         def length(self):
-            return int(self._end) - int(self._start)
+            return self._end - self._start
 
         def contains(self, ip):
-            return ip >= self._start and ip <= self._end
+            if isinstance(ip, six.string_types):
+                ip = self._address(six.text_type(ip))
+            return int(ip) >= self._start and int(ip) <= self._end
 
         def get_first_ip(self):
-            return str(self._start)
+            return str(self._address(self._start))
 
         def get_last_ip(self):
-            return str(self._end)
+            return str(self._address(self._end))
 
         def get_random_ip(self):
-            diff = self.length()
-            return str(self._start + random.randint(0, diff))
+            return str(self._address(random.randint(self._start, self._end)))
 
         def __str__(self):
-            return str(self._start) + ' - ' + str(self._end)
+            return self.get_first_ip() + ' - ' + self.get_last_ip()
 
     def __init__(self, ipv4=True):
         self._ipv4 = ipv4
+        self._max_ip = IPV4_MAX_IP if ipv4 else IPV6_MAX_IP
+        # (first IP, prefix length) of the prefixes except the default route
         self._prefix_set = set()
         self._subnet_tree = SubnetTree()
         # 0.0.0.0 is a non-routable meta-address that needs to be skipped
-        self._boundaries = {ip_address(u'0.0.0.0'): 1} if ipv4 else {
-            ip_address(u'::'): 1}
+        self._boundaries = {0: 1}
+        self._ranges = None
+
+    def _update_boundary(self, boundary, count):
+        count += self._boundaries.get(boundary, 0)
+        if count:
+            self._boundaries[boundary] = count
+        else:
+            del self._boundaries[boundary]
+        self._ranges = None
 
     def __setitem__(self, key, value):
-        prefix = ip_network(six.text_type(key))
+        _, first, last, prefixlen = parse_prefix(key)
         # add the current key to self._prefix_set only when it is not the default route and it is not a duplicate key
-        if prefix.prefixlen and key not in self._prefix_set:
-            boundary = prefix[0]
-            self._boundaries[boundary] = self._boundaries.get(boundary, 0) + 1
-            if prefix[-1] != ip_address(u'255.255.255.255') \
-                    and prefix[-1] != ip_address(u'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff'):
-                next_boundary = prefix[-1] + 1
-                self._boundaries[next_boundary] = self._boundaries.get(
-                    next_boundary, 0) + 1
-            self._prefix_set.add(key)
+        if prefixlen and (first, prefixlen) not in self._prefix_set:
+            self._update_boundary(first, 1)
+            if last != self._max_ip:
+                self._update_boundary(last + 1, 1)
+            self._prefix_set.add((first, prefixlen))
         self._subnet_tree.__setitem__(key, value)
 
     def __getitem__(self, key):
         return self._subnet_tree[key]
 
     def __delitem__(self, key):
-        if '/0' not in key:
-            prefix = ip_network(six.text_type(key))
-            boundary = prefix[0]
-            next_boundary = prefix[-1] + 1
-            self._boundaries[boundary] = self._boundaries.get(boundary) - 1
-            if not self._boundaries[boundary]:
-                del self._boundaries[boundary]
-            self._boundaries[next_boundary] = self._boundaries.get(
-                next_boundary) - 1
-            if not self._boundaries[next_boundary]:
-                del self._boundaries[next_boundary]
-            self._prefix_set.remove(key)
+        _, first, last, prefixlen = parse_prefix(key)
+        if prefixlen:
+            self._update_boundary(first, -1)
+            if last != self._max_ip:
+                self._update_boundary(last + 1, -1)
+            self._prefix_set.remove((first, prefixlen))
         self._subnet_tree.__delitem__(key)
 
     def ranges(self):
-        sorted_boundaries = sorted(self._boundaries.keys())
-        ranges = []
-        for index, boundary in enumerate(sorted_boundaries):
-            if index != len(sorted_boundaries) - 1:
-                interval = self.IpInterval(
-                    sorted_boundaries[index], sorted_boundaries[index + 1] - 1)
-            else:
-                if self._ipv4:
-                    interval = self.IpInterval(
-                        sorted_boundaries[index], ip_address(u'255.255.255.255'))
-                else:
-                    interval = self.IpInterval(sorted_boundaries[index], ip_address(
-                        u'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff'))
-            ranges.append(interval)
-        return ranges
+        if self._ranges is None:
+            starts = sorted(self._boundaries)
+            ends = [start - 1 for start in starts[1:]] + [self._max_ip]
+            self._ranges = [self.IpInterval(start, end, self._ipv4) for start, end in zip(starts, ends)]
+        return list(self._ranges)
 
     def contains(self, key):
         return key in self._subnet_tree
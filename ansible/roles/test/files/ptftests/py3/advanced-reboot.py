@@ -73,6 +73,7 @@ import scapy.all as scapyall
 from scapy.arch.linux import attach_filter as attach_filter
 
 import sad_path as sp
+import pcap_flow
 
 from ptf import config
 from ptf.base_tests import BaseTest
@@ -245,6 +246,8 @@ class ReloadTest(BaseTest):
         #   Improve this interval to gain more precision of disruptions.
         self.send_interval = 0.0035
         self.sent_packet_count = 0
+        # Sniffer capture file, to be used in examine_flow method.
+        self.capture_pcap = None
         # Thread pool for background watching operations
         self.pool = ThreadPool(processes=3)
 
@@ -1862,7 +1865,7 @@ class ReloadTest(BaseTest):
         """
         This function listens on all ports, in both directions, for the TCP src=1234 dst=5000 packets, until timeout.
         Once found, all packets are dumped to local pcap file,
-        and all packets are saved to self.packets as scapy type(pcap format).
+        and path of the pcap file is saved to self.capture_pcap.
         """
         if not wait:
             wait = self.time_to_listen + self.test_params['sniff_time_incr']
@@ -1892,8 +1895,7 @@ class ReloadTest(BaseTest):
             subprocess.call(["rm", "-rf", capture_pcap])  # remove old capture
             self.kill_sniffer = False
             self.start_sniffer(capture_pcap, sniff_filter, wait)
-            self.packets = scapyall.rdpcap(capture_pcap)
-            self.log("Number of all packets captured: {}".format(len(self.packets)))
+            self.capture_pcap = capture_pcap
         except Exception:
             traceback_msg = traceback.format_exc()
             self.log("Error in tcpdump_sniff: {}".format(traceback_msg))
@@ -1955,199 +1957,142 @@ class ReloadTest(BaseTest):
         if process.returncode is not None:
             self.log("Dumpcap process killed")
 
-    def check_tcp_payload(self, packet):
-        """
-        This method is used by examine_flow() method.
-        It returns True if a packet is not corrupted and has a valid TCP sequential TCP Payload
-        """
-        try:
-            int(bytes(packet[scapyall.TCP].payload)
-                ) in range(self.sent_packet_count)
-            return True
-        except Exception:
-            return False
-
-    def no_flood(self, packet):
-        """
-        This method filters packets which are unique (i.e. no floods).
-        """
-        if (not int(bytes(packet[scapyall.TCP].payload)) in self.unique_id) and \
-                (packet[scapyall.Ether].src == self.dut_mac or packet[scapyall.Ether].src == self.vlan_mac):
-            # This is a unique (no flooded) received packet.
-            # for dualtor, t1->server rcvd pkt will have src MAC as vlan_mac,
-            # and server->t1 rcvd pkt will have src MAC as dut_mac
-            self.unique_id.append(int(bytes(packet[scapyall.TCP].payload)))
-            return True
-        elif packet[scapyall.Ether].dst == self.dut_mac or packet[scapyall.Ether].dst == self.vlan_mac:
-            # This is a sent packet.
-            # for dualtor, t1->server sent pkt will have dst MAC as dut_mac,
-            # and server->t1 sent pkt will have dst MAC as vlan_mac
-            return True
-        else:
-            return False
-
     def examine_flow(self, filename=None):
         """
-        This method examines pcap file (if given), or self.packets scapy file.
+        This method examines pcap file (if given), or the capture of tcpdump_sniff.
+        The capture is read in one pass by pcap_flow.FlowCollector, which keeps only timestamps of the sent
+        and received packets indexed by the TCP payload ID, instead of loading all packets by scapy.
         The method compares TCP payloads of the packets one by one (assuming all payloads are consecutive integers),
         and the losses if found - are treated as disruptions in Dataplane forwarding.
         All disruptions are saved to self.lost_packets dictionary, in format:
         disrupt_start_id = (missing_packets_count, disrupt_time, disrupt_start_timestamp, disrupt_stop_timestamp)
         """
-        if filename:
-            all_packets = scapyall.rdpcap(filename)
-        elif self.packets:
-            all_packets = self.packets
-        else:
-            self.log("Filename and self.packets are not defined.")
-            self.fails['dut'].add("Filename and self.packets are not defined")
+        capture_pcap = filename or self.capture_pcap
+        if not capture_pcap or not os.path.exists(capture_pcap):
+            self.log("Filename and self.capture_pcap are not defined.")
+            self.fails['dut'].add("Filename and self.capture_pcap are not defined")
             return None
-        # Filter out packets and remove floods:
-        # This list will contain all unique Payload ID, to filter out received floods.
-        self.unique_id = list()
-        filtered_packets = [pkt for pkt in all_packets if
-                            scapyall.TCP in pkt and
-                            scapyall.ICMP not in pkt and
-                            pkt[scapyall.TCP].sport == 1234 and
-                            pkt[scapyall.TCP].dport == 5000 and
-                            self.check_tcp_payload(pkt) and
-                            self.no_flood(pkt)
-                            ]
-
-        if self.vnet:
-            decap_packets = [scapyall.Ether(bytes(pkt.payload.payload.payload)[8:]) for pkt in all_packets if
-                             scapyall.UDP in pkt and
-                             pkt[scapyall.UDP].sport == 1234
-                             ]
-            filtered_decap_packets = [pkt for pkt in decap_packets if
-                                      scapyall.TCP in pkt and
-                                      scapyall.ICMP not in pkt and
-                                      pkt[scapyall.TCP].sport == 1234 and
-                                      pkt[scapyall.TCP].dport == 5000 and
-                                      self.check_tcp_payload(pkt) and
-                                      self.no_flood(pkt)
-                                      ]
-            filtered_packets = filtered_packets + filtered_decap_packets
-
-        # Re-arrange packets, if delayed, by Payload ID and Timestamp:
-        packets = sorted(filtered_packets, key=lambda packet: (
-            int(bytes(packet[scapyall.TCP].payload)), packet.time))
+
+        # for dualtor both MACs are needed:
+        #   t1->server sent pkt will have dst MAC as dut_mac, and rcvd pkt will have src MAC as vlan_mac
+        #   server->t1 sent pkt will have dst MAC as vlan_mac, and rcvd pkt will have src MAC as dut_mac
+        dut_macs = [bytes.fromhex(mac.replace(':', '')) for mac in (self.dut_mac, self.vlan_mac)]
+        filtered_pcap = ('/tmp/capture_filtered.pcap' if self.logfile_suffix is None
+                         else "/tmp/capture_filtered_%s.pcap" % self.logfile_suffix)
+        writer = pcap_flow.PcapWriter(filtered_pcap)
+        # Filter out packets with payload ID out of the sent range and remove floods
+        flow = pcap_flow.FlowCollector(dut_macs, self.sent_packet_count - 1, vnet=self.vnet, writer=writer)
+        try:
+            flow.add_packets(pcap_flow.iter_capture(capture_pcap))
+        finally:
+            writer.close()
+        self.log("Number of all packets captured: {}".format(flow.captured_count))
+
         self.lost_packets = dict()
         self.max_disrupt, self.total_disruption = 0, 0
-        sent_packets = dict()
         # Track packet id's that were neither sent or received
         missing_sent_and_received_packet_id_sequences = []
         self.fails['dut'].add("Sniffer failed to capture any traffic")
-        self.assertTrue(packets, "Sniffer failed to capture any traffic")
+        self.assertTrue(writer.count, "Sniffer failed to capture any traffic")
         self.fails['dut'].clear()
-        prev_payload = None
-        if packets:
-            prev_payload, prev_time = -1, 0
-            sent_payload = 0
-            received_counter = 0    # Counts packets from dut.
-            received_but_not_sent_packets = set()
-            sent_counter = 0
-            received_t1_to_vlan = 0
-            received_vlan_to_t1 = 0
-            missed_vlan_to_t1 = 0
-            missed_t1_to_vlan = 0
-            flooded_pkts = []
-            self.disruption_start, self.disruption_stop = None, None
-            for packet in packets:
-                if packet[scapyall.Ether].dst == self.dut_mac or packet[scapyall.Ether].dst == self.vlan_mac:
-                    # This is a sent packet - keep track of it as payload_id:timestamp.
-                    # for dualtor both MACs are needed:
-                    #   t1->server sent pkt will have dst MAC as dut_mac,
-                    #   and server->t1 sent pkt will have dst MAC as vlan_mac
-                    sent_payload = int(bytes(packet[scapyall.TCP].payload))
-                    if sent_payload in sent_packets:
-                        flooded_pkts.append(sent_payload)
-                    sent_packets[sent_payload] = packet.time
-                    sent_counter += 1
-                    continue
-                if packet[scapyall.Ether].src == self.dut_mac or packet[scapyall.Ether].src == self.vlan_mac:
-                    # This is a received packet.
-                    # for dualtor both MACs are needed:
-                    #   t1->server rcvd pkt will have src MAC as vlan_mac,
-                    #   and server->t1 rcvd pkt will have src MAC as dut_mac
-                    received_time = packet.time
-                    received_payload = int(bytes(packet[scapyall.TCP].payload))
-                    if (received_payload % 5) == 0:   # From vlan to T1.
-                        received_vlan_to_t1 += 1
-                    else:
-                        received_t1_to_vlan += 1
-                    received_counter += 1
-                if not (received_payload and received_time):
-                    # This is the first valid received packet.
-                    prev_payload = received_payload
-                    prev_time = received_time
-                    continue
-                if received_payload - prev_payload > 1:
-                    if received_payload not in sent_packets:
-                        self.log("Ignoring received packet with payload {}, as it was not sent".format(
-                            received_payload))
-                        received_but_not_sent_packets.add(received_payload)
-                        continue
-                    # Packets in a row are missing, a potential disruption.
-                    self.log("received_payload: {}, prev_payload: {}, sent_counter: {}, received_counter: {}".format(
-                        received_payload, prev_payload, sent_counter, received_counter))
-                    # How many packets lost in a row.
-                    lost_id = (received_payload - 1) - prev_payload
-
-                    # Find previous sequential sent packet that was captured
-                    missing_sent_and_received_pkt_count = 0
-                    prev_pkt_pt = prev_payload + 1
-                    prev_sent_packet_time = None
-                    while prev_pkt_pt < received_payload:
-                        if prev_pkt_pt in sent_packets:
-                            prev_sent_packet_time = sent_packets[prev_pkt_pt]
-                            break  # Found it
-                        else:
-                            if prev_pkt_pt not in received_but_not_sent_packets:
-                                missing_sent_and_received_pkt_count += 1
-                            prev_pkt_pt += 1
-                    if missing_sent_and_received_pkt_count > 0:
-                        missing_sent_and_received_packet_id_sequences_fmtd = \
-                            str(prev_payload + 1) if missing_sent_and_received_pkt_count == 1\
-                            else "{}-{}".format(prev_payload + 1, received_payload - 1)
-                        missing_sent_and_received_packet_id_sequences.append(
-                            missing_sent_and_received_packet_id_sequences_fmtd)
-                    if prev_sent_packet_time is not None:
-                        # Disruption occurred - some sent packets were not received
-
-                        # How long disrupt lasted.
-                        this_sent_packet_time = sent_packets[received_payload]
-                        disrupt = this_sent_packet_time - prev_sent_packet_time
-
-                        # Add disrupt to the dict:
-                        self.lost_packets[prev_payload] = (
-                            lost_id, disrupt, received_time - disrupt, received_time)
-                        self.log("Disruption between packet ID %d and %d. For %.4f " % (
-                            prev_payload, received_payload, disrupt))
-                        for lost_index in range(prev_payload + 1, received_payload):
-                            # lost received for packet sent from vlan to T1.
-                            if lost_index in sent_packets:
-                                if (lost_index % 5) == 0:
-                                    missed_vlan_to_t1 += 1
-                                else:
-                                    missed_t1_to_vlan += 1
-                        self.log("")
-                        if not self.disruption_start:
-                            self.disruption_start = datetime.datetime.fromtimestamp(
-                                prev_time)
-                        self.disruption_stop = datetime.datetime.fromtimestamp(
-                            received_time)
+        prev_payload, prev_time = -1, 0
+        received_payload, received_time = None, None
+        received_counter = 0    # Counts packets from dut.
+        received_but_not_sent_packets = set()
+        sent_counter = 0
+        received_t1_to_vlan = 0
+        received_vlan_to_t1 = 0
+        missed_vlan_to_t1 = 0
+        missed_t1_to_vlan = 0
+        flooded_pkts = []
+        self.disruption_start, self.disruption_stop = None, None
+        # Payload IDs are consecutive, walk them in order like packets sorted by payload ID and timestamp
+        for payload in range(self.sent_packet_count):
+            sent_count = flow.sent_count[payload]
+            sent_counter += sent_count
+            if sent_count > 1:
+                flooded_pkts.extend([payload] * (sent_count - 1))
+            payload_time = flow.received_time(payload)
+            if payload_time == pcap_flow.NO_TIME:
+                continue
+            received_time = payload_time
+            received_payload = payload
+            if (received_payload % 5) == 0:   # From vlan to T1.
+                received_vlan_to_t1 += 1
+            else:
+                received_t1_to_vlan += 1
+            received_counter += 1
+            if not (received_payload and received_time):
+                # This is the first valid received packet.
                 prev_payload = received_payload
                 prev_time = received_time
-            self.log(
-                "**************** Packet received summary: ********************")
-            self.log("*********** Sent packets captured - {}".format(sent_counter))
-            self.log("*********** received packets captured - t1-to-vlan - {}".format(received_t1_to_vlan))
-            self.log("*********** received packets captured - vlan-to-t1 - {}".format(received_vlan_to_t1))
-            self.log("*********** Missed received packets - t1-to-vlan - {}".format(missed_t1_to_vlan))
-            self.log("*********** Missed received packets - vlan-to-t1 - {}".format(missed_vlan_to_t1))
-            self.log("*********** Flooded pkts - {}".format(flooded_pkts))
-            self.log("**************************************************************")
+                continue
+            if received_payload - prev_payload > 1:
+                this_sent_packet_time = flow.sent_time_before(received_payload, received_time)
+                if this_sent_packet_time == pcap_flow.NO_TIME:
+                    self.log("Ignoring received packet with payload {}, as it was not sent".format(
+                        received_payload))
+                    received_but_not_sent_packets.add(received_payload)
+                    continue
+                # Packets in a row are missing, a potential disruption.
+                self.log("received_payload: {}, prev_payload: {}, sent_counter: {}, received_counter: {}".format(
+                    received_payload, prev_payload, sent_counter, received_counter))
+                # How many packets lost in a row.
+                lost_id = (received_payload - 1) - prev_payload
+
+                # Find previous sequential sent packet that was captured
+                missing_sent_and_received_pkt_count = 0
+                prev_pkt_pt = prev_payload + 1
+                prev_sent_packet_time = None
+                while prev_pkt_pt < received_payload:
+                    if flow.sent_count[prev_pkt_pt]:
+                        prev_sent_packet_time = flow.sent_last[prev_pkt_pt]
+                        break  # Found it
+                    else:
+                        if prev_pkt_pt not in received_but_not_sent_packets:
+                            missing_sent_and_received_pkt_count += 1
+                        prev_pkt_pt += 1
+                if missing_sent_and_received_pkt_count > 0:
+                    missing_sent_and_received_packet_id_sequences_fmtd = \
+                        str(prev_payload + 1) if missing_sent_and_received_pkt_count == 1\
+                        else "{}-{}".format(prev_payload + 1, received_payload - 1)
+                    missing_sent_and_received_packet_id_sequences.append(
+                        missing_sent_and_received_packet_id_sequences_fmtd)
+                if prev_sent_packet_time is not None:
+                    # Disruption occurred - some sent packets were not received
+
+                    # How long disrupt lasted.
+                    disrupt = this_sent_packet_time - prev_sent_packet_time
+
+                    # Add disrupt to the dict:
+                    self.lost_packets[prev_payload] = (
+                        lost_id, disrupt, received_time - disrupt, received_time)
+                    self.log("Disruption between packet ID %d and %d. For %.4f " % (
+                        prev_payload, received_payload, disrupt))
+                    for lost_index in range(prev_payload + 1, received_payload):
+                        # lost received for packet sent from vlan to T1.
+                        if flow.sent_count[lost_index]:
+                            if (lost_index % 5) == 0:
+                                missed_vlan_to_t1 += 1
+                            else:
+                                missed_t1_to_vlan += 1
+                    self.log("")
+                    if not self.disruption_start:
+                        self.disruption_start = datetime.datetime.fromtimestamp(
+                            prev_time)
+                    self.disruption_stop = datetime.datetime.fromtimestamp(
+                        received_time)
+            prev_payload = received_payload
+            prev_time = received_time
+        self.log(
+            "**************** Packet received summary: ********************")
+        self.log("*********** Sent packets captured - {}".format(sent_counter))
+        self.log("*********** received packets captured - t1-to-vlan - {}".format(received_t1_to_vlan))
+        self.log("*********** received packets captured - vlan-to-t1 - {}".format(received_vlan_to_t1))
+        self.log("*********** Missed received packets - t1-to-vlan - {}".format(missed_t1_to_vlan))
+        self.log("*********** Missed received packets - vlan-to-t1 - {}".format(missed_vlan_to_t1))
+        self.log("*********** Flooded pkts - {}".format(flooded_pkts))
+        self.log("**************************************************************")
         self.fails['dut'].add("Sniffer failed to filter any traffic from DUT")
         self.assertTrue(received_counter,
                         "Sniffer failed to filter any traffic from DUT")
@@ -2208,11 +2153,7 @@ class ReloadTest(BaseTest):
             self.fails["dut"].add(message)
 
         self.log("Total incoming packets captured %d" % received_counter)
-        if packets:
-            filename = ('/tmp/capture_filtered.pcap' if self.logfile_suffix is None
-                        else "/tmp/capture_filtered_%s.pcap" % self.logfile_suffix)
-            scapyall.wrpcap(filename, packets)
-            self.log("Filtered pcap dumped to %s" % filename)
+        self.log("Filtered pcap dumped to %s" % filtered_pcap)
 
     def check_forwarding_stop(self, signal):
         self.asic_start_recording_vlan_reachability()
@@ -0,0 +1,302 @@
+"""
+Streaming analysis of the TCP flow captured by advanced-reboot test.
+
+The capture is read block by block and the packets are decoded from raw bytes at fixed Ether/IP/TCP offsets,
+so neither the whole capture nor scapy packets are kept in memory. Timestamps of the sent and received packets
+are kept in arrays indexed by the payload ID, memory usage depends on the number of sent packets only.
+Send timestamps of every packet are kept only for the payload IDs sent more than once, e.g. flooded ones.
+"""
+import struct
+from array import array
+
+PCAP_MAGIC_USEC = 0xa1b2c3d4
+PCAP_MAGIC_NSEC = 0xa1b23c4d
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_IDB = 0x00000001
+PCAPNG_OPB = 0x00000002
+PCAPNG_EPB = 0x00000006
+PCAPNG_OPT_IF_TSRESOL = 9
+
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86DD
+ETH_P_8021Q = 0x8100
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+VXLAN_HEADER_LEN = 8
+
+NO_TIME = -1.0
+
+
+def _tsresol_to_units(value):
+    if value & 0x80:
+        return 2 ** (value & 0x7f)
+    return 10 ** value
+
+
+def _iter_pcap(f, header):
+    magic = struct.unpack("<I", header[:4])[0]
+    endian = "<"
+    if magic not in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+        endian = ">"
+        magic = struct.unpack(">I", header[:4])[0]
+    units = 1e9 if magic == PCAP_MAGIC_NSEC else 1e6
+    f.read(16)  # Rest of the global header
+    record_header = struct.Struct(endian + "IIII")
+    while True:
+        data = f.read(record_header.size)
+        if len(data) < record_header.size:
+            return
+        ts_sec, ts_frac, caplen, _ = record_header.unpack(data)
+        frame = f.read(caplen)
+        if len(frame) < caplen:
+            return
+        yield ts_sec + ts_frac / units, frame
+
+
+def _iter_pcapng(f, header):
+    endian = "<"
+    interface_units = []
+    data = header
+    while True:
+        if len(data) < 8:
+            return
+        block_type = struct.unpack(endian + "I", data[:4])[0]
+        if block_type == PCAPNG_SHB:
+            # Byte order of the section is defined by the byte order magic
+            magic = f.read(4)
+            if len(magic) < 4:
+                return
+            endian = "<" if struct.unpack("<I", magic)[0] == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            block_len = struct.unpack(endian + "I", data[4:8])[0]
+            body = magic + f.read(block_len - 12)
+            interface_units = []
+        else:
+            block_len = struct.unpack(endian + "I", data[4:8])[0]
+            body = f.read(block_len - 8)
+        if len(body) < block_len - 8:
+            return
+
+        if block_type == PCAPNG_IDB:
+            units = 1e6
+            offset = 8  # Options start after linktype, reserved and snaplen
+            while offset + 4 <= len(body) - 4:
+                code, length = struct.unpack(endian + "HH", body[offset:offset + 4])
+                if code == 0:
+                    break
+                if code == PCAPNG_OPT_IF_TSRESOL and length >= 1:
+                    units = _tsresol_to_units(bytearray(body[offset + 4:offset + 5])[0])
+                offset += 4 + (length + 3) // 4 * 4
+            interface_units.append(float(units))
+        elif block_type in (PCAPNG_EPB, PCAPNG_OPB):
+            if block_type == PCAPNG_EPB:
+                interface_id, ts_high, ts_low, caplen = struct.unpack(endian + "IIII", body[:16])
+            else:
+                interface_id, _, ts_high, ts_low, caplen = struct.unpack(endian + "HHIII", body[:16])
+            units = interface_units[interface_id] if interface_id < len(interface_units) else 1e6
+            yield ((ts_high << 32) | ts_low) / units, body[20:20 + caplen]
+
+        data = f.read(8)
+
+
+def iter_capture(filename):
+    """
+    Iterate packets of a pcap or pcapng file.
+    Yields tuple (timestamp in seconds, frame bytes).
+    """
+    with open(filename, "rb") as f:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        if struct.unpack("<I", header[:4])[0] == PCAPNG_SHB:
+            for packet in _iter_pcapng(f, header):
+                yield packet
+        else:
+            for packet in _iter_pcap(f, header):
+                yield packet
+
+
+class PcapWriter(object):
+    """
+    Write frames to a pcap file with nanosecond timestamps.
+    """
+    def __init__(self, filename, snaplen=65535):
+        self.f = open(filename, "wb")
+        self.f.write(struct.pack("<IHHiIII", PCAP_MAGIC_NSEC, 2, 4, 0, 0, snaplen, 1))
+        self.count = 0
+
+    def write(self, timestamp, frame):
+        ts_sec = int(timestamp)
+        ts_nsec = int(round((timestamp - ts_sec) * 1e9))
+        if ts_nsec >= 1000000000:
+            ts_sec, ts_nsec = ts_sec + 1, ts_nsec - 1000000000
+        self.f.write(struct.pack("<IIII", ts_sec, ts_nsec, len(frame), len(frame)))
+        self.f.write(frame)
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+
+def parse_l4(frame):
+    """
+    Decode Ether (with optional 802.1Q tags) and IPv4/IPv6 headers of a frame.
+    Returns tuple (eth_dst, eth_src, ip_proto, l4_offset, l4_end), or None if it is not an IP packet.
+    """
+    if len(frame) < 14:
+        return None
+    eth_dst = frame[0:6]
+    eth_src = frame[6:12]
+    offset = 12
+    eth_type = struct.unpack("!H", frame[offset:offset + 2])[0]
+    while eth_type == ETH_P_8021Q and len(frame) >= offset + 6:
+        offset += 4
+        eth_type = struct.unpack("!H", frame[offset:offset + 2])[0]
+    offset += 2
+
+    if eth_type == ETH_P_IP:
+        if len(frame) < offset + 20:
+            return None
+        ihl = (bytearray(frame[offset:offset + 1])[0] & 0x0f) * 4
+        total_len, frag = struct.unpack("!H2xH", frame[offset + 2:offset + 8])
+        if frag & 0x1fff:
+            # Not the first fragment, there is no L4 header
+            return None
+        ip_proto = bytearray(frame[offset + 9:offset + 10])[0]
+        l4_end = min(offset + total_len, len(frame)) if total_len else len(frame)
+        return eth_dst, eth_src, ip_proto, offset + ihl, l4_end
+    if eth_type == ETH_P_IPV6:
+        if len(frame) < offset + 40:
+            return None
+        payload_len, ip_proto = struct.unpack("!HB", frame[offset + 4:offset + 7])
+        l4_end = min(offset + 40 + payload_len, len(frame)) if payload_len else len(frame)
+        return eth_dst, eth_src, ip_proto, offset + 40, l4_end
+    return None
+
+
+def parse_tcp_payload(frame, sport, dport):
+    """
+    Returns tuple (eth_dst, eth_src, tcp payload) if the frame is a TCP packet with the ports, otherwise None.
+    """
+    l4 = parse_l4(frame)
+    if l4 is None:
+        return None
+    eth_dst, eth_src, ip_proto, l4_offset, l4_end = l4
+    if ip_proto != IPPROTO_TCP or l4_end - l4_offset < 20:
+        return None
+    pkt_sport, pkt_dport = struct.unpack("!HH", frame[l4_offset:l4_offset + 4])
+    if pkt_sport != sport or pkt_dport != dport:
+        return None
+    data_offset = (bytearray(frame[l4_offset + 12:l4_offset + 13])[0] >> 4) * 4
+    return eth_dst, eth_src, frame[l4_offset + data_offset:l4_end]
+
+
+def parse_vxlan_inner_frame(frame, sport):
+    """
+    Returns the inner frame if the frame is a VXLAN packet from the UDP source port, otherwise None.
+    """
+    l4 = parse_l4(frame)
+    if l4 is None:
+        return None
+    _, _, ip_proto, l4_offset, l4_end = l4
+    if ip_proto != IPPROTO_UDP or l4_end - l4_offset < 8:
+        return None
+    if struct.unpack("!H", frame[l4_offset:l4_offset + 2])[0] != sport:
+        return None
+    return frame[l4_offset + 8 + VXLAN_HEADER_LEN:l4_end]
+
+
+class FlowCollector(object):
+    """
+    Collect timestamps of the sent and received packets of the TCP flow, indexed by the payload ID.
+
+    The first packet of a payload ID from the DUT (Ether src is one of the DUT MACs) is a received packet, further
+    packets of the payload ID from the DUT are floods and ignored. Other packets to the DUT (Ether dst is one of the
+    DUT MACs) are sent packets, which are tracked by the count and the first and the last timestamps of the payload ID,
+    and by the timestamps of all packets if the payload ID is sent more than once.
+    Inner packets of the VXLAN packets are tracked separately and used only for the payload IDs without direct packet.
+    """
+    def __init__(self, dut_macs, max_payload_id, sport=1234, dport=5000, vnet=False, writer=None):
+        self.dut_macs = set(dut_macs)
+        self.max_payload_id = max_payload_id
+        self.sport = sport
+        self.dport = dport
+        self.vnet = vnet
+        self.writer = writer
+        size = max_payload_id + 1
+        self.sent_first = array("d", [NO_TIME]) * size
+        self.sent_last = array("d", [NO_TIME]) * size
+        self.sent_count = array("I", [0]) * size
+        # Timestamps of all sent packets of the payload IDs sent more than once
+        self.sent_times = {}
+        self.seen = bytearray(size)
+        self.seen_decap = bytearray(size)
+        self.received = array("d", [NO_TIME]) * size
+        self.received_decap = array("d", [NO_TIME]) * size
+        self.captured_count = 0
+
+    def _add(self, timestamp, frame, decap=False):
+        parsed = parse_tcp_payload(frame, self.sport, self.dport)
+        if parsed is None:
+            return
+        eth_dst, eth_src, payload = parsed
+        try:
+            payload_id = int(payload)
+        except ValueError:
+            return
+        if payload_id < 0 or payload_id > self.max_payload_id:
+            return
+
+        seen, received = (self.seen_decap, self.received_decap) if decap else (self.seen, self.received)
+        if eth_src in self.dut_macs and not seen[payload_id]:
+            seen[payload_id] = 1
+            if eth_dst not in self.dut_macs:
+                received[payload_id] = timestamp
+                if self.writer:
+                    self.writer.write(timestamp, frame)
+                return
+        elif eth_dst not in self.dut_macs:
+            return
+
+        if self.sent_count[payload_id] == 1:
+            self.sent_times[payload_id] = array("d", [self.sent_first[payload_id], timestamp])
+        elif self.sent_count[payload_id] > 1:
+            self.sent_times[payload_id].append(timestamp)
+        if self.sent_count[payload_id] == 0 or timestamp < self.sent_first[payload_id]:
+            self.sent_first[payload_id] = timestamp
+        if timestamp > self.sent_last[payload_id]:
+            self.sent_last[payload_id] = timestamp
+        self.sent_count[payload_id] += 1
+        if self.writer:
+            self.writer.write(timestamp, frame)
+
+    def add_packets(self, packets):
+        """
+        Collect the packets from iterable of tuple (timestamp, frame bytes).
+        """
+        for timestamp, frame in packets:
+            self.captured_count += 1
+            self._add(timestamp, frame)
+            if self.vnet:
+                inner_frame = parse_vxlan_inner_frame(frame, self.sport)
+                if inner_frame is not None:
+                    self._add(timestamp, inner_frame, decap=True)
+
+    def received_time(self, payload_id):
+        """
+        Returns the timestamp of the received packet of the payload ID, or NO_TIME if it was not received.
+        """
+        if self.seen[payload_id]:
+            return self.received[payload_id]
+        return self.received_decap[payload_id]
+
+    def sent_time_before(self, payload_id, timestamp):
+        """
+        Returns the timestamp of the last sent packet of the payload ID that was sent not later than timestamp,
+        or NO_TIME if there is no such packet.
+        """
+        if self.sent_count[payload_id] == 0 or self.sent_first[payload_id] > timestamp:
+            return NO_TIME
+        if self.sent_last[payload_id] <= timestamp:
+            return self.sent_last[payload_id]
+        return max(sent_time for sent_time in self.sent_times[payload_id] if sent_time <= timestamp)
@@ -0,0 +1,175 @@
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+from scapy.layers.inet import IP, TCP
+from scapy.layers.l2 import Ether
+from scapy.packet import Raw
+from scapy.utils import EDecimal, PcapNgWriter, PcapWriter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import pcap_flow  # noqa: E402
+
+DUT_MAC = "00:01:02:03:04:05"
+SERVER_MAC = "00:0a:0b:0c:0d:0e"
+T1_MAC = "00:0f:10:11:12:13"
+# Timestamps with nanosecond fractions, small enough to keep the nanoseconds in a float
+TIMESTAMPS = ["1000.000000001", "1000.123456789", "1001.5", "1002.999999999"]
+USEC = 1e-6
+NSEC = 1e-9
+
+
+def flow_packet(payload_id, eth_src=SERVER_MAC, eth_dst=DUT_MAC):
+    return Ether(src=eth_src, dst=eth_dst) / IP(src="192.168.0.2", dst="10.0.0.1") / \
+        TCP(sport=1234, dport=5000) / Raw(str(payload_id).encode())
+
+
+class BigEndianPcapNgWriter(PcapNgWriter):
+    """pcapng writer with big endian byte order, scapy writes little endian only."""
+
+    def __init__(self, filename):
+        super(BigEndianPcapNgWriter, self).__init__(filename)
+        self.endian = ">"
+        self.endian_magic = struct.pack(">I", pcap_flow.PCAPNG_BYTE_ORDER_MAGIC)
+
+
+class NsecPcapNgWriter(PcapNgWriter):
+    """pcapng writer with nanosecond timestamps, given by the if_tsresol option of the interfaces."""
+
+    def __init__(self, filename):
+        super(NsecPcapNgWriter, self).__init__(filename)
+        self.tsresol = 10 ** 9
+
+    def _write_block_idb(self, linktype, ifname=None):
+        block_idb = struct.pack(self.endian + "HHI", linktype, 0, 262144)
+        options = struct.pack(self.endian + "HHB", pcap_flow.PCAPNG_OPT_IF_TSRESOL, 1, 9) + b"\0" * 3
+        options += struct.pack(self.endian + "HH", 0, 0)
+        self.f.write(self.build_block(struct.pack(self.endian + "I", pcap_flow.PCAPNG_IDB), block_idb,
+                                      options=options))
+
+
+class TestCaptureReaders(unittest.TestCase):
+    """Test pcap_flow.iter_capture reads the captures written by scapy."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.packets = []
+        for index, timestamp in enumerate(TIMESTAMPS):
+            pkt = flow_packet(index)
+            pkt.time = EDecimal(timestamp)
+            self.packets.append(pkt)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, writer_cls, **kwargs):
+        filename = os.path.join(self.tmp_dir, "capture")
+        writer = writer_cls(filename, **kwargs)
+        for pkt in self.packets:
+            writer.write(pkt)
+        writer.close()
+        return filename
+
+    def check(self, filename, resolution):
+        captured = list(pcap_flow.iter_capture(filename))
+        self.assertEqual([frame for _, frame in captured], [bytes(pkt) for pkt in self.packets])
+        for (timestamp, _), pkt in zip(captured, self.packets):
+            # the timestamps are truncated to the resolution of the capture
+            self.assertAlmostEqual(timestamp, float(pkt.time), delta=resolution * 1.5)
+
+    def test_pcap_little_endian(self):
+        self.check(self.write(PcapWriter, endianness="<"), USEC)
+
+    def test_pcap_big_endian(self):
+        self.check(self.write(PcapWriter, endianness=">"), USEC)
+
+    def test_pcap_nsec(self):
+        self.check(self.write(PcapWriter, endianness="<", nano=True), NSEC)
+
+    def test_pcap_big_endian_nsec(self):
+        self.check(self.write(PcapWriter, endianness=">", nano=True), NSEC)
+
+    def test_pcapng_little_endian(self):
+        self.check(self.write(PcapNgWriter), USEC)
+
+    def test_pcapng_big_endian(self):
+        self.check(self.write(BigEndianPcapNgWriter), USEC)
+
+    def test_pcapng_nsec(self):
+        self.check(self.write(NsecPcapNgWriter), NSEC)
+
+    def test_pcapng_interfaces_and_options(self):
+        # An interface description block is written for each new interface name, the packet blocks have options
+        for index, pkt in enumerate(self.packets):
+            pkt.sniffed_on = "eth{}".format(index % 2)
+            pkt.comments = [b"packet %d" % index]
+        self.check(self.write(PcapNgWriter), USEC)
+
+    def test_truncated_capture(self):
+        filename = self.write(PcapWriter, endianness="<", nano=True)
+        with open(filename, "r+b") as f:
+            f.truncate(os.path.getsize(filename) - 1)
+        captured = list(pcap_flow.iter_capture(filename))
+        self.assertEqual([frame for _, frame in captured], [bytes(pkt) for pkt in self.packets[:-1]])
+
+    def test_pcap_writer(self):
+        filename = os.path.join(self.tmp_dir, "filtered")
+        writer = pcap_flow.PcapWriter(filename)
+        for pkt in self.packets:
+            writer.write(float(pkt.time), bytes(pkt))
+        writer.close()
+        self.check(filename, NSEC)
+
+
+class TestFlowCollector(unittest.TestCase):
+    """Test pcap_flow.FlowCollector tracks the sent and received packets of the flow."""
+
+    def collect(self, packets, max_payload_id=9):
+        flow = pcap_flow.FlowCollector([bytes.fromhex(DUT_MAC.replace(":", ""))], max_payload_id)
+        flow.add_packets((float(timestamp), bytes(pkt)) for timestamp, pkt in packets)
+        return flow
+
+    def test_sent_and_received(self):
+        flow = self.collect([
+            ("1.0", flow_packet(0)),
+            ("1.1", flow_packet(0, eth_src=DUT_MAC, eth_dst=T1_MAC)),
+            # flooded copy of the received packet is ignored
+            ("1.2", flow_packet(0, eth_src=DUT_MAC, eth_dst=T1_MAC)),
+            ("2.0", flow_packet(1)),
+            # not a packet of the flow
+            ("2.5", flow_packet(2, eth_src=SERVER_MAC, eth_dst=T1_MAC)),
+        ])
+        self.assertEqual(flow.captured_count, 5)
+        self.assertEqual(list(flow.sent_count[:3]), [1, 1, 0])
+        self.assertEqual(flow.received_time(0), 1.1)
+        self.assertEqual(flow.received_time(1), pcap_flow.NO_TIME)
+        self.assertEqual(flow.sent_time_before(0, 1.1), 1.0)
+        self.assertEqual(flow.sent_time_before(0, 0.5), pcap_flow.NO_TIME)
+        self.assertEqual(flow.sent_time_before(2, 3.0), pcap_flow.NO_TIME)
+
+    def test_sent_time_before_bursts(self):
+        # The payload ID is sent in bursts, the sent time is the last one before the received time
+        flow = self.collect([(timestamp, flow_packet(3)) for timestamp in ["1.0", "1.001", "5.0", "5.002", "9.0"]])
+        self.assertEqual(flow.sent_count[3], 5)
+        self.assertEqual(flow.sent_first[3], 1.0)
+        self.assertEqual(flow.sent_last[3], 9.0)
+        self.assertEqual(flow.sent_time_before(3, 0.9), pcap_flow.NO_TIME)
+        self.assertEqual(flow.sent_time_before(3, 1.0005), 1.0)
+        self.assertEqual(flow.sent_time_before(3, 4.9), 1.001)
+        self.assertEqual(flow.sent_time_before(3, 5.001), 5.0)
+        self.assertEqual(flow.sent_time_before(3, 8.0), 5.002)
+        self.assertEqual(flow.sent_time_before(3, 10.0), 9.0)
+
+    def test_sent_time_before_out_of_order(self):
+        flow = self.collect([(timestamp, flow_packet(4)) for timestamp in ["3.0", "1.0", "2.0"]])
+        self.assertEqual(flow.sent_first[4], 1.0)
+        self.assertEqual(flow.sent_last[4], 3.0)
+        self.assertEqual(flow.sent_time_before(4, 2.5), 2.0)
+        self.assertEqual(flow.sent_time_before(4, 1.5), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,6 +29,7 @@ import re
 import os
 import os.path
 import csv
+import json
 import time
 import logging
 import logging.handlers
@@ -58,6 +59,169 @@ err_start_ignore_marker = -8
 # will not be picked up by the analyzer.
 MAX_LOG_MESSAGE_LENGTH = 1000
 
+# -- Analysis engines
+# "legacy" reads the whole log file into memory and runs every regex on each line.
+# "streaming" reads the log file backwards in blocks of READ_BLOCK_SIZE bytes, stops at the
+# start marker and skips the regex evaluation for lines which do not contain any of the
+# literals required by the match/expect expressions.
+ENGINE_LEGACY = "legacy"
+ENGINE_STREAMING = "streaming"
+ENGINES = [ENGINE_LEGACY, ENGINE_STREAMING]
+READ_BLOCK_SIZE = 1024 * 1024
+
+# -- Line classification results
+LINE_EXPECTED = "expected"
+LINE_MATCHED = "matched"
+
+# -- Repetition quantifier "{m,n}" used in regular expressions
+re_quantifier = re.compile(r"\{(\d*)(,\d*)?\}")
+# -- Escape sequences with arguments: hex, unicode, named unicode, octal and group references
+re_escape_sequence = re.compile(r"\\(x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|N(\{[^}]*\})?|\d{1,3})")
+
+
+def _skip_char_class(pattern, pos):
+    '''
+    @summary: Return the position right after the character class which starts at pattern[pos] == '['
+    '''
+    pos += 1
+    if pos < len(pattern) and pattern[pos] == '^':
+        pos += 1
+    # -- A ']' right after '[' or '[^' is a literal
+    if pos < len(pattern) and pattern[pos] == ']':
+        pos += 1
+    while pos < len(pattern) and pattern[pos] != ']':
+        pos += 2 if pattern[pos] == '\\' else 1
+    return pos + 1
+
+
+def _skip_group(pattern, pos):
+    '''
+    @summary: Return the position right after the group which starts at pattern[pos] == '('
+    '''
+    depth = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == '\\':
+            pos += 2
+            continue
+        if char == '[':
+            pos = _skip_char_class(pattern, pos)
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return pos
+
+
+def _split_alternatives(pattern):
+    '''
+    @summary: Split regular expression by the top level alternation operator '|'
+    '''
+    alternatives = []
+    start = pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == '\\':
+            pos += 2
+        elif char == '[':
+            pos = _skip_char_class(pattern, pos)
+        elif char == '(':
+            pos = _skip_group(pattern, pos)
+        elif char == '|':
+            alternatives.append(pattern[start:pos])
+            pos += 1
+            start = pos
+        else:
+            pos += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def _required_literal(alternative):
+    '''
+    @summary: Find the longest literal string which must be present in any string matching the
+              regular expression. Groups, character classes and escape sequences other than
+              escaped punctuation are treated as unknown content.
+
+    @return: The longest required literal, empty string if there is none.
+    '''
+    runs = []
+    current = ''
+    pos = 0
+    while pos < len(alternative):
+        char = alternative[pos]
+        if char == '\\':
+            escaped = alternative[pos + 1:pos + 2]
+            if escaped and not escaped.isalnum() and escaped != '_':
+                current += escaped
+                pos += 2
+                continue
+            # -- Any other escape is unknown content, skip its arguments as well
+            runs.append(current)
+            current = ''
+            escape = re_escape_sequence.match(alternative, pos)
+            pos = escape.end() if escape else pos + 2
+        elif char == '[':
+            runs.append(current)
+            current = ''
+            pos = _skip_char_class(alternative, pos)
+        elif char == '(':
+            runs.append(current)
+            current = ''
+            pos = _skip_group(alternative, pos)
+        elif char in '*?':
+            # -- The preceding character becomes optional
+            runs.append(current[:-1])
+            current = ''
+            pos += 1
+        elif char == '+':
+            runs.append(current)
+            current = ''
+            pos += 1
+        elif char == '{' and re_quantifier.match(alternative, pos):
+            runs.append(current[:-1])
+            current = ''
+            pos = re_quantifier.match(alternative, pos).end()
+        elif char in '.^$':
+            runs.append(current)
+            current = ''
+            pos += 1
+        else:
+            current += char
+            pos += 1
+    runs.append(current)
+    return max(runs, key=len)
+
+
+def required_literals(regex):
+    '''
+    @summary: Build the list of literals of which at least one must be present in any string
+              matching the compiled regular expression.
+
+    @param regex: compiled regular expression, or None.
+
+    @return: List of literals, or None if such list cannot be built for the expression.
+    '''
+    if regex is None:
+        return []
+    if regex.flags & (re.IGNORECASE | re.VERBOSE):
+        return None
+
+    literals = set()
+    for alternative in _split_alternatives(regex.pattern):
+        literal = _required_literal(alternative)
+        if not literal:
+            return None
+        literals.add(literal)
+
+    # -- A literal containing another literal is redundant for the prefilter
+    return sorted([literal for literal in literals
+                   if not any(other != literal and other in literal for other in literals)], key=len)
+
 
 class AnsibleLogAnalyzer:
     '''
@@ -416,8 +580,112 @@ class AnsibleLogAnalyzer:
 
         return ret_code
 
+    def read_lines_reversed(self, log_file_path, block_size=READ_BLOCK_SIZE):
+        '''
+        @summary: Generator which yields lines of the log file starting from the last one.
+                  The file is read backwards in blocks of block_size bytes, so only the part of
+                  the file which is actually consumed by the caller is read into memory.
+                  Yielded lines are the same as the ones returned by readlines() of the file
+                  opened in text mode.
+
+        @param log_file_path: Path to the log file.
+
+        @param block_size: Size of the block read from the file at once.
+        '''
+        def decode(piece):
+            line = piece.decode('utf-8', 'replace')
+            if '\r' not in line:
+                return [line]
+            # -- Universal newlines, the same as in text mode
+            return list(reversed(line.replace('\r\n', '\n').replace('\r', '\n').splitlines(True)))
+
+        with open(log_file_path, 'rb') as log_file:
+            log_file.seek(0, os.SEEK_END)
+            position = log_file.tell()
+            remainder = b''
+            last_piece = True
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                log_file.seek(position)
+                pieces = (log_file.read(read_size) + remainder).split(b'\n')
+                # -- The first piece may be the tail of a line which starts in the previous block
+                remainder = pieces.pop(0)
+                for piece in reversed(pieces):
+                    if last_piece:
+                        # -- The last line of the file is not terminated by a new line
+                        last_piece = False
+                        if not piece:
+                            continue
+                    else:
+                        piece += b'\n'
+                    for line in decode(piece):
+                        yield line
+
+            if not last_piece:
+                remainder += b'\n'
+            if remainder:
+                for line in decode(remainder):
+                    yield line
+    # ---------------------------------------------------------------------
+
+    def build_line_classifier(self, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                              engine=ENGINE_LEGACY):
+        '''
+        @summary: Build function which classifies a log line as expected, matched or neither of them.
+
+        The legacy classifier uses line_is_expected() and line_matches(). The streaming classifier
+        gives the same results, but checks first that the line contains at least one literal which
+        is required by the match or expect expressions, so most of the lines are dropped without
+        running any regular expression. Ignore expression is evaluated only for the matched lines.
+
+        @return: Function which takes a line and returns LINE_EXPECTED, LINE_MATCHED or None.
+        '''
+        if engine == ENGINE_LEGACY:
+            def classify(line):
+                if self.line_is_expected(line, expect_messages_regex):
+                    return LINE_EXPECTED
+                if self.line_matches(line, match_messages_regex, ignore_messages_regex):
+                    return LINE_MATCHED
+                return None
+            return classify
+
+        match_literals = required_literals(match_messages_regex)
+        expect_literals = required_literals(expect_messages_regex)
+        if match_literals is None or expect_literals is None:
+            literals = None
+        else:
+            literals = tuple(set(match_literals + expect_literals))
+        self.print_diagnostic_message('prefilter literals: %s' % (literals,))
+
+        match_search = match_messages_regex.search if match_messages_regex is not None else None
+        ignore_search = ignore_messages_regex.search if ignore_messages_regex is not None else None
+        expect_search = None
+        if expect_messages_regex is not None:
+            # -- See line_is_expected() for the advanced reboot case
+            if self.run_id.startswith("test_advanced_reboot_test_"):
+                expect_search = expect_messages_regex.match
+            else:
+                expect_search = expect_messages_regex.search
+
+        def classify(line):
+            if literals is not None:
+                for literal in literals:
+                    if literal in line:
+                        break
+                else:
+                    return None
+            if expect_search is not None and expect_search(line):
+                return LINE_EXPECTED
+            if match_search is not None and match_search(line):
+                if ignore_search is None or not ignore_search(line):
+                    return LINE_MATCHED
+            return None
+        return classify
+    # ---------------------------------------------------------------------
+
     def analyze_file(self, log_file_path, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-                     maximum_log_length=None):
+                     maximum_log_length=None, engine=ENGINE_LEGACY):
         '''
         @summary: Analyze input file content for messages matching input regex
                   expressions. See line_matches() for details on matching criteria.
@@ -437,6 +705,8 @@ class AnsibleLogAnalyzer:
 
         @param maximum_log_length - The long log message (length > maximum_log_length) will be dropped by LogAnalyzer.
 
+        @param engine - Analysis engine, one of ENGINES.
+
         @return: List of strings match search criteria.
         '''
 
@@ -452,15 +722,20 @@ class AnsibleLogAnalyzer:
         found_start_marker = False
         found_end_marker = False
         if stdin_as_input:
-            log_file = sys.stdin
+            rev_lines = reversed(sys.stdin.readlines())
+        elif engine == ENGINE_STREAMING:
+            rev_lines = self.read_lines_reversed(log_file_path)
         else:
             log_file = open(log_file_path, 'r')
+            rev_lines = reversed(log_file.readlines())
+        classify = self.build_line_classifier(match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                                              engine=engine)
 
         start_marker = self.create_start_marker()
         end_marker = self.create_end_marker()
 
         ignore_marker_run_ids = []
-        for rev_line in reversed(log_file.readlines()):
+        for rev_line in rev_lines:
             if stdin_as_input:
                 in_analysis_range = True
             else:
@@ -522,10 +797,11 @@ class AnsibleLogAnalyzer:
                 if not check_marker and len(rev_line) > maximum_log_length:
                     continue
 
-                if self.line_is_expected(rev_line, expect_messages_regex):
+                line_class = classify(rev_line)
+                if line_class == LINE_EXPECTED:
                     expected_lines.append(rev_line)
 
-                elif self.line_matches(rev_line, match_messages_regex, ignore_messages_regex):
+                elif line_class == LINE_MATCHED:
                     matching_lines.append(rev_line)
 
         # care about the markers only if input is not stdin or no need to check start marker
@@ -542,7 +818,7 @@ class AnsibleLogAnalyzer:
     # ---------------------------------------------------------------------
 
     def analyze_file_list(self, log_file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-                          maximum_log_length=None):
+                          maximum_log_length=None, engine=ENGINE_LEGACY):
         '''
         @summary: Analyze input files messages matching input regex expressions.
             See line_matches() for details on matching criteria.
@@ -561,6 +837,9 @@ class AnsibleLogAnalyzer:
         @param maximum_log_length
             The maximum length of the log message. If the length of the log message is greater than this value,
 
+        @param engine
+            Analysis engine, one of ENGINES. See analyze_file() for details.
+
         @return: Returns map <file_name, list_of_matching_strings>
         '''
         res = {}
@@ -570,7 +849,8 @@ class AnsibleLogAnalyzer:
                 continue
             match_strings, expect_strings = self.analyze_file(log_file, match_messages_regex, ignore_messages_regex,
                                                               expect_messages_regex,
-                                                              maximum_log_length=maximum_log_length)
+                                                              maximum_log_length=maximum_log_length,
+                                                              engine=engine)
 
             match_strings.reverse()
             expect_strings.reverse()
@@ -589,6 +869,8 @@ def usage():
     print('                                 to all log files specified in --logs parameter.')
     print('                                 analyze - perform log analysis of files specified in --logs parameter.')
     print('                                 add_end_marker - add end marker to all log files specified in --logs parameter.')           # noqa: E501
+    print('                                 analyze_json - analyze files specified in --logs parameter and print')
+    print('                                 matching and expected lines per file as JSON to stdout.')
     print('--out_dir path                   Directory path where to place output files, ')
     print('                                 must be present when --action == analyze')
     print('--logs path{,path}               List of full paths to log files to be analyzed.')
@@ -607,11 +889,17 @@ def usage():
     print('                                 All the strings from these files will be expected to present')
     print('                                 in one of specified log files during the analysis. Must be present')
     print('                                 when action == analyze.')
+    print('--regex_file path                JSON file with "match", "ignore" and "expect" lists of regular')
+    print('                                 expressions. Must be present when action == analyze_json.')
+    print('--max_log_length number          Lines longer than this are skipped by action == analyze_json.')
+    print('--engine legacy|streaming        Analysis engine for action == analyze|analyze_json, legacy by default.')
+    print('                                 streaming - read the logs backwards in blocks and prefilter')
+    print('                                 lines by literals before matching regular expressions.')
 
 # ---------------------------------------------------------------------
 
 
-def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in):
+def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in, regex_file=None):
     '''
     @summary: This function validates command line parameter 'action' and
         other related parameters.
@@ -632,6 +920,11 @@ def check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in,
             print('ERROR: missing required match_files_in for analyze action')
             ret_code = False
 
+    elif action == 'analyze_json':
+        if regex_file is None or len(regex_file) == 0:
+            print('ERROR: missing required regex_file for analyze_json action')
+            ret_code = False
+
     else:
         ret_code = False
         print(('ERROR: invalid action:%s specified' % action))
@@ -772,12 +1065,16 @@ def main(argv):
     ignore_files_in = None
     expect_files_in = None
     verbose = False
+    engine = ENGINE_LEGACY
+    regex_file = None
+    max_log_length = None
 
     try:
-        opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:vh",
+        opts, args = getopt.getopt(argv, "a:r:s:l:o:m:i:e:g:x:n:vh",
                                    ["action=", "run_id=", "start_marker=", "logs=",
                                     "out_dir=", "match_files_in=", "ignore_files_in=",
-                                    "expect_files_in=", "verbose", "help"])
+                                    "expect_files_in=", "engine=", "regex_file=",
+                                    "max_log_length=", "verbose", "help"])
 
     except getopt.GetoptError:
         print("Invalid option specified")
@@ -813,10 +1110,25 @@ def main(argv):
         elif (opt in ("-e", "--expect_files_in")):
             expect_files_in = arg
 
+        elif (opt in ("-g", "--engine")):
+            engine = arg
+
+        elif (opt in ("-x", "--regex_file")):
+            regex_file = arg
+
+        elif (opt in ("-n", "--max_log_length")):
+            max_log_length = int(arg)
+
         elif (opt in ("-v", "--verbose")):
             verbose = True
 
-    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in)
+    if engine not in ENGINES:
+        print('ERROR: invalid engine:%s specified' % engine)
+        usage()
+        sys.exit(err_invalid_input)
+
+    if not (check_action(action, log_files_in, out_dir, match_files_in, ignore_files_in, expect_files_in,
+                         regex_file)
             and check_run_id(run_id)):
         usage()
         sys.exit(err_invalid_input)
@@ -849,11 +1161,27 @@ def main(argv):
             log_file_list.append(system_log_file)
 
         result = analyzer.analyze_file_list(log_file_list, match_messages_regex,
-                                            ignore_messages_regex, expect_messages_regex)
+                                            ignore_messages_regex, expect_messages_regex, engine=engine)
         unused_regex_messages = []
         write_result_file(run_id, out_dir, result,
                           messages_regex_e, unused_regex_messages)
         write_summary_file(run_id, out_dir, result, unused_regex_messages)
+    elif action == "analyze_json":
+        with open(regex_file) as fp:
+            messages_regex = json.load(fp)
+
+        match_messages_regex, ignore_messages_regex, expect_messages_regex = [
+            re.compile('|'.join(messages_regex[key])) if messages_regex.get(key) else None
+            for key in ("match", "ignore", "expect")]
+
+        if not log_file_list:
+            log_file_list.append(system_log_file)
+
+        result = analyzer.analyze_file_list(log_file_list, match_messages_regex, ignore_messages_regex,
+                                            expect_messages_regex, maximum_log_length=max_log_length,
+                                            engine=engine)
+        print(json.dumps(result))
+        return 0
     elif action == "add_end_marker":
         analyzer.place_marker(
             log_file_list, analyzer.create_end_marker(), wait_for_marker=True)
@@ -6,6 +6,9 @@ import psutil
 import socket
 import signal
 import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
 from random import randint
 from random import Random
 from operator import itemgetter
@@ -57,6 +60,12 @@ def batch_init():
     wa.logs_path = ""
     wa.executed = SpyTestDict()
     wa.rerun_nodeids = SpyTestDict()
+    wa.report_rows = SpyTestDict()
+    wa.report_dirty = {}
+    wa.report_completed = []
+    wa.report_timer = None
+    wa.report_timer_lock = threading.Lock()
+    wa.durations_lock = threading.Lock()
     wa.trace_file = None
     wa.logger = None
     wa.reverse_run_order = False
@@ -69,6 +78,7 @@ def batch_init():
     wa.tclist_cache = {}
     wa.chip_coverate_history = {}
     wa.platform_coverate_history = {}
+    wa.module_durations = {}
 
     # None disable backup/rerun nodes
     # 0 create same number of backup/rerun nodes
@@ -116,6 +126,53 @@ def load_coverage_history():
         tcmap.read_coverage_history(csv_file)
 
 
+def read_duration_history(csv_file, durations):
+    # accepts batch_durations.csv and results_modules csv files
+    rows = utils.read_csv(csv_file)
+    if not rows:
+        warn("Failed to read duration history {}".format(csv_file))
+        return
+    for name_col, time_col in [("Module", "Duration"), ("Module Name", "Exec Time")]:
+        if name_col in rows[0] and time_col in rows[0]:
+            name_index, time_index = rows[0].index(name_col), rows[0].index(time_col)
+            break
+    else:
+        warn("No module durations in {}".format(csv_file))
+        return
+    for row in rows[1:]:
+        if len(row) <= max(name_index, time_index):
+            continue
+        # skip the total row
+        mname = os.path.basename(row[name_index])
+        secs = utils.time_parse(row[time_index])
+        if not mname.endswith(".py") or secs <= 0:
+            continue
+        # use the longest duration when the module is in multiple files
+        durations[mname] = max(secs, durations.get(mname, 0))
+
+
+def load_duration_history():
+    duration_history = env.get("SPYTEST_BATCH_DURATION_HISTORY", "")
+    if not duration_history or not is_master():
+        return
+    for index, entry in enumerate(duration_history.split(",")):
+        if os.path.isdir(entry):
+            csv_file = os.path.join(entry, "batch_durations.csv")
+            if not os.path.exists(csv_file):
+                csv_file = paths.get_modules_csv(entry, True)
+        elif os.path.isfile(entry):
+            csv_file = entry
+        else:
+            csv_file = os.path.join(wa.logs_path, "duration_history_{}.csv".format(index))
+            try:
+                utils.download_url(entry, csv_file)
+            except Exception as exp:
+                warn("Failed to download duration history {}: {}".format(entry, exp))
+                continue
+        read_duration_history(csv_file, wa.module_durations)
+    trace("Loaded duration history of {} modules".format(len(wa.module_durations)))
+
+
 def init_type_nodes():
     node_types = ["one", "two", "three", "four"]
     backup_nodes = env.get("SPYTEST_BATCH_BACKUP_NODES")
@@ -268,130 +325,139 @@ def check_worker_status(node_modules, collection):
             _show_testbed_info()
 
 
-def save_report():
-    save_running_report()
-    save_progress_report()
-    save_pending_report()
-    if wa.rerun_list:
-        save_rerun_report()
+def _report_key(nodeid, entry):
+    # report in which the test is listed
+    if not entry or is_infra_test(nodeid):
+        return None
+    node_name, status = entry
+    if not node_name:
+        return "pending"
+    if status == "Queued":
+        return "running"
+    return "progress"
 
 
-def save_running_report():
-    # prepare running rows
-    header, rows = ['#', "Module", "Function", "TestCase", "Node", "Status"], []
-    all_modules, all_functions, all_testcases, all_nodes = {}, {}, {}, {}
-    for nodeid in wa.executed:
-        [node_name, status] = wa.executed[nodeid]
-        if status != "Queued":
-            continue
-        if not node_name or is_infra_test(nodeid):
-            continue
-        module, func = paths.parse_nodeid(nodeid)
-        all_modules[module] = 1
-        all_functions[func] = 1
-        all_nodes[node_name] = 1
-        for tcid in _get_tclist(func):
-            all_testcases[tcid] = 1
-            rows.append([len(rows) + 1, module, func, tcid, node_name, status])
+def _report_rows(nodeid, node_name, status):
+    module, func = paths.parse_nodeid(nodeid)
+    return [[module, func, tcid, node_name, status] for tcid in _get_tclist(func)]
 
-    # create running links
-    links = {"Module": [], "Node": [], "Status": [], }
-    for row in rows:
-        links["Node"].append(row[4])
-        links["Status"].append(paths.get_session_log(row[4]))
 
-    # save running files
-    filepath = os.path.join(wa.logs_path, "batch_running.csv")
+def _report_update(nodeid, entry):
+    # apply the change of the test to the report rows
+    old_key = _report_key(nodeid, wa.executed.get(nodeid))
+    if entry is None:
+        wa.executed.pop(nodeid, None)
+    else:
+        wa.executed[nodeid] = entry
+    new_key = _report_key(nodeid, entry)
+
+    # running tests are also listed in progress
+    keys = {"running": ["running", "progress"], "progress": ["progress"], "pending": ["pending"]}
+    old_keys, new_keys = keys.get(old_key, []), keys.get(new_key, [])
+    for key in old_keys + new_keys:
+        wa.report_dirty[key] = True
+    for key in old_keys:
+        if key not in new_keys:
+            wa.report_rows[key].pop(nodeid, None)
+    if new_keys:
+        tc_rows = _report_rows(nodeid, entry[0], entry[1])
+        for key in new_keys:
+            wa.report_rows.setdefault(key, OrderedDict())[nodeid] = tc_rows
+        if entry[1] == "Completed":
+            wa.report_completed.extend(tc_rows)
+
+
+def save_report(full=False):
+    if full:
+        for key in ["running", "progress", "pending", "rerun"]:
+            wa.report_dirty[key] = True
+    dirty, wa.report_dirty = wa.report_dirty, {}
+    if dirty.get("running"):
+        save_running_report()
+    if dirty.get("progress"):
+        save_progress_report()
+    if dirty.get("pending"):
+        save_pending_report()
+    if wa.rerun_list and dirty.get("rerun"):
+        save_rerun_report()
+    save_completed_report()
+
+
+def _save_report_files(name, header, rows, totals, links=None, align=None):
+    filepath = os.path.join(wa.logs_path, "batch_{}.csv".format(name))
     utils.write_csv_file(header, rows, filepath)
     filepath = os.path.splitext(filepath)[0] + '.html'
-    align = {col: True for col in ["Module", "Function", "TestCase"]}
-    links["Node"].append(None)
-    links["Status"].append(None)
-    rows.append(["", len(all_modules), len(all_functions), len(all_testcases), len(all_nodes), ""])
+    rows.append(totals)
     utils.write_html_table3(header, rows, filepath, links=links, align=align)
 
 
-def save_progress_report():
-    # prepare progress rows
+def _save_node_report(name, entries):
     header, rows = ['#', "Module", "Function", "TestCase", "Node", "Status"], []
     all_modules, all_functions, all_testcases, all_nodes = {}, {}, {}, {}
-    for nodeid in wa.executed:
-        [node_name, status] = wa.executed[nodeid]
-        if not node_name or is_infra_test(nodeid):
-            continue
-        module, func = paths.parse_nodeid(nodeid)
-        all_modules[module] = 1
-        all_functions[func] = 1
-        all_nodes[node_name] = 1
-        for tcid in _get_tclist(func):
+    links = {"Module": [], "Node": [], "Status": [], }
+    for tc_rows in entries:
+        for module, func, tcid, node_name, status in tc_rows:
+            all_modules[module] = 1
+            all_functions[func] = 1
             all_testcases[tcid] = 1
+            all_nodes[node_name] = 1
             rows.append([len(rows) + 1, module, func, tcid, node_name, status])
-
-    # create progress links
-    links = {"Module": [], "Node": [], "Status": [], }
-    for row in rows:
-        links["Node"].append(row[4])
-        links["Status"].append(paths.get_session_log(row[4]))
-
-    # save progress files
-    filepath = os.path.join(wa.logs_path, "batch_progress.csv")
-    utils.write_csv_file(header, rows, filepath)
-    filepath = os.path.splitext(filepath)[0] + '.html'
-    align = {col: True for col in ["Module", "Function", "TestCase"]}
+            links["Node"].append(node_name)
+            links["Status"].append(paths.get_session_log(node_name))
     links["Node"].append(None)
     links["Status"].append(None)
-    rows.append(["", len(all_modules), len(all_functions), len(all_testcases), len(all_nodes), ""])
-    utils.write_html_table3(header, rows, filepath, links=links, align=align)
+    totals = ["", len(all_modules), len(all_functions), len(all_testcases), len(all_nodes), ""]
+    align = {col: True for col in ["Module", "Function", "TestCase"]}
+    _save_report_files(name, header, rows, totals, links, align)
 
 
-def save_pending_report():
-    # prepare pending rows
+def _save_nodes_report(name, entries):
     header, rows = ['#', "Module", "Function", "TestCase", "Nodes"], []
-    all_modules, all_functions, all_testcases = {}, {}, {}
-    for nodeid in wa.executed:
-        [node_name, _] = wa.executed[nodeid]
-        if node_name or is_infra_test(nodeid):
-            continue
-        module, func = paths.parse_nodeid(nodeid)
-        nodes = wa.sched.find_matching_nodes(module)
-        all_modules[module] = 1
-        all_functions[func] = 1
-        for tcid in _get_tclist(func):
+    all_modules, all_functions, all_testcases, module_nodes = {}, {}, {}, {}
+    for tc_rows in entries:
+        for module, func, tcid, _, _ in tc_rows:
+            if module not in module_nodes:
+                module_nodes[module] = wa.sched.find_matching_nodes(module)
+            all_modules[module] = 1
+            all_functions[func] = 1
             all_testcases[tcid] = 1
-            rows.append([len(rows) + 1, module, func, tcid, nodes])
-
-    # save pending files
-    filepath = os.path.join(wa.logs_path, "batch_pending.csv")
-    utils.write_csv_file(header, rows, filepath)
-    filepath = os.path.splitext(filepath)[0] + '.html'
+            rows.append([len(rows) + 1, module, func, tcid, module_nodes[module]])
+    totals = ["", len(all_modules), len(all_functions), len(all_testcases), ""]
     align = {col: True for col in ["Module", "Function", "TestCase", "Nodes"]}
-    rows.append(["", len(all_modules), len(all_functions), len(all_testcases), ""])
-    utils.write_html_table3(header, rows, filepath, align=align)
+    _save_report_files(name, header, rows, totals, align=align)
 
 
-def save_rerun_report():
+def save_running_report():
+    _save_node_report("running", wa.report_rows.get("running", {}).values())
 
-    # prepare rerun rows
-    header, rows = ['#', "Module", "Function", "TestCase", "Nodes"], []
-    all_modules, all_functions, all_testcases = {}, {}, {}
+
+def save_progress_report():
+    _save_node_report("progress", wa.report_rows.get("progress", {}).values())
+
+
+def save_pending_report():
+    _save_nodes_report("pending", wa.report_rows.get("pending", {}).values())
+
+
+def save_rerun_report():
+    entries = []
     for nodeid in wa.rerun_nodeids:
-        if is_infra_test(nodeid):
-            continue
-        module, func = paths.parse_nodeid(nodeid)
-        nodes = wa.sched.find_matching_nodes(module)
-        all_modules[module] = 1
-        all_functions[func] = 1
-        for tcid in _get_tclist(func):
-            all_testcases[tcid] = 1
-            rows.append([len(rows) + 1, module, func, tcid, nodes])
+        if not is_infra_test(nodeid):
+            entries.append(_report_rows(nodeid, "", ""))
+    _save_nodes_report("rerun", entries)
 
-    # save rerun files
-    filepath = os.path.join(wa.logs_path, "batch_rerun.csv")
-    utils.write_csv_file(header, rows, filepath)
-    filepath = os.path.splitext(filepath)[0] + '.html'
-    align = {col: True for col in ["Module", "Function", "TestCase", "Nodes"]}
-    rows.append(["", len(all_modules), len(all_functions), len(all_testcases), ""])
-    utils.write_html_table3(header, rows, filepath, align=align)
+
+def save_completed_report():
+    # completed tests are only appended, the file can be followed while running
+    if not wa.report_completed:
+        return
+    header = ["Time", "Module", "Function", "TestCase", "Node"]
+    filepath = os.path.join(wa.logs_path, "batch_completed.csv")
+    append = os.path.exists(filepath)
+    timestamp = get_timestamp(False)
+    rows = [[timestamp] + row[:4] for row in wa.report_completed]
+    wa.report_completed = []
+    utils.write_csv_file(header, rows, filepath, append)
 
 
 def save_finished_testbeds():
@@ -492,27 +558,50 @@ def save_finished_testbeds():
 def report(op, nodeid, node_name):
     op = op.lower()
     if op == "load":
-        wa.executed[nodeid] = ["", "Pending"]
+        _report_update(nodeid, ["", "Pending"])
         return
     elif op == "reload":
-        wa.executed[nodeid] = ["", "PendingAgain"]
+        _report_update(nodeid, ["", "PendingAgain"])
         return
     elif op == "rerun":
-        wa.executed[nodeid] = ["", "PendingReRun"]
+        _report_update(nodeid, ["", "PendingReRun"])
         wa.rerun_nodeids[nodeid] = ["", "PendingReRun"]
+        wa.report_dirty["rerun"] = True
     elif op == "nes-partial":
-        wa.executed[nodeid] = ["", "PartialNes"]
+        _report_update(nodeid, ["", "PartialNes"])
     elif op == "nes-full":
-        wa.executed[nodeid] = ["", "FullNes"]
+        _report_update(nodeid, ["", "FullNes"])
     elif op == "add":
-        wa.executed[nodeid] = [node_name, "Queued"]
+        _report_update(nodeid, [node_name, "Queued"])
         return
     elif op == "remove":
-        wa.executed.pop(nodeid, None)
+        _report_update(nodeid, None)
         return
     elif op == "finish":
         if nodeid in wa.executed:
-            wa.executed[nodeid] = [node_name, "Completed"]
+            _report_update(nodeid, [node_name, "Completed"])
+
+    # coalesce the report updates
+    interval = env.getint("SPYTEST_BATCH_REPORT_INTERVAL", "10")
+    if interval <= 0:
+        flush_report_locked()
+        return
+    _start_report_timer(interval)
+
+
+def _start_report_timer(interval):
+    with wa.report_timer_lock:
+        if wa.report_timer is None:
+            wa.report_timer = threading.Timer(interval, flush_report)
+            wa.report_timer.daemon = True
+            wa.report_timer.start()
+
+
+def flush_report_locked():
+    with wa.report_timer_lock:
+        if wa.report_timer is not None:
+            wa.report_timer.cancel()
+            wa.report_timer = None
     try:
         save_report()
         _show_testbed_info(False)
@@ -520,6 +609,17 @@ def report(op, nodeid, node_name):
         print(exp)
 
 
+def flush_report():
+    if wa.lock.acquire(timeout=120):
+        flush_report_locked()
+        wa.lock.release()
+        return
+    # the report updates are still pending, retry later
+    with wa.report_timer_lock:
+        wa.report_timer = None
+    _start_report_timer(max(env.getint("SPYTEST_BATCH_REPORT_INTERVAL", "10"), 1))
+
+
 def shutdown():
     if is_master():
         trace("batch shutdown")
@@ -553,6 +653,14 @@ class SpyTestScheduling(object):
         self.max_order = self.default_order
         self._load_buckets()
 
+        # module durations from history and completed modules
+        self.longest_first = env.match("SPYTEST_BATCH_LONGEST_FIRST", "1", "1")
+        self.default_func_time = env.getint("SPYTEST_BATCH_DEFAULT_FUNC_TIME", "60")
+        self.durations = dict(wa.module_durations)
+        self.func_time, self.func_count = 0, 0
+        self.item_modules = {}
+        self.running_modules = SpyTestDict()
+
         self.test_spytest_infra_first = None
         self.test_spytest_infra_second = None
         self.test_spytest_infra_last = None
@@ -620,15 +728,19 @@ class SpyTestScheduling(object):
         wa.lock.acquire()
         self.node_modules.pop(node, None)
         self.set_worker_node_locked(node, None)
+        self._show_projection_locked()
         wa.lock.release()
 
     def add_restarted_node(self, node):
         gid = get_gw_name(node.gateway)
         debug("================ add_restarted_node {} ===========".format(gid))
+        wa.lock.acquire()
         for minfo in self.main_modules.values():
             if gid in minfo.nodes:
                 minfo.nodes.append(gid)
         self._show_module_info()
+        self._show_projection_locked()
+        wa.lock.release()
 
     def _is_active_locked(self, node):
         gid = get_gw_name(node.gateway)
@@ -817,6 +929,7 @@ class SpyTestScheduling(object):
             debug("Collection: {} {} {}".format(mname, ",".join(minfo.nodes),
                   ",".join([str(i) for i in minfo.node_indexes])))
         self.collection_is_completed = True
+        self._show_projection_locked()
 
         # start worker monitoring
         poll_time = env.getint("SPYTEST_BATCH_POLL_STATUS_TIME", "0")
@@ -991,8 +1104,10 @@ class SpyTestScheduling(object):
         wa.lock.acquire()
         name = get_gw_name(node.gateway)
         item_list = self.collection[item_index]
+        module_completed = False
         if item_index in self.node_modules[node]:
             self.node_modules[node].remove(item_index)
+            module_completed = self._record_duration_locked(item_index, duration)
             report("finish", item_list, name)
             debug("[{}]: ===== Completed {} {}".format(name, item_index, item_list))
         else:
@@ -1000,6 +1115,8 @@ class SpyTestScheduling(object):
         self._schedule_node_locked(node)
         debug("[{}]: ===== NewList {}".format(name, self.node_modules[node]))
         wa.lock.release()
+        if module_completed:
+            self._save_durations()
 
     def _assign_pretest(self, node):
         name = get_gw_name(node.gateway)
@@ -1022,27 +1139,129 @@ class SpyTestScheduling(object):
         if env.match("SPYTEST_BATCH_ORDER_HIGH2LOW", "1", "1"):
             orders = reversed(orders)
         for order in orders:
+            candidates = []
             for mname, minfo in modules.items():
                 if name not in minfo.nodes:
                     continue
                 md = self.get_module_data(mname, minfo.used_tpref)
                 if self.order_support and md.order != order:
                     continue
-                if self._assign_pretest(node):
-                    return True
-                del modules[mname]
-                self.node_modules[node].extend(minfo.node_indexes)
-                if self.test_spytest_infra_last is not None:
-                    if env.match("SPYTEST_BATCH_APPEND_INFRA_TEST", "1", "1"):
-                        self.node_modules[node].append(self.test_spytest_infra_last)
-                worker.assigned = worker.assigned + len(minfo.node_indexes)
-                debug("[{}]: ===== Assigned order:{} {} {}".format(name, md.order, mname, minfo.node_indexes))
-                for item_index in minfo.node_indexes:
-                    report("add", self.collection[item_index], name)
-                report("save", "", "")
+                candidates.append([mname, minfo, md])
+                if not self.longest_first:
+                    break
+            if not candidates:
+                continue
+            if self._assign_pretest(node):
                 return True
+            # pick the longest module first, the first in the list on tie
+            mname, minfo, md = max(candidates, key=lambda c: self._estimate_duration(c[0], c[1]))
+            estimate = self._estimate_duration(mname, minfo)
+            del modules[mname]
+            self.node_modules[node].extend(minfo.node_indexes)
+            if self.test_spytest_infra_last is not None:
+                if env.match("SPYTEST_BATCH_APPEND_INFRA_TEST", "1", "1"):
+                    self.node_modules[node].append(self.test_spytest_infra_last)
+            worker.assigned = worker.assigned + len(minfo.node_indexes)
+            msg = "[{}]: ===== Assigned order:{} {} {} estimate:{}"
+            debug(msg.format(name, md.order, mname, minfo.node_indexes, utils.time_format(int(estimate))))
+            self._add_running_locked(name, mname, minfo, estimate)
+            for item_index in minfo.node_indexes:
+                report("add", self.collection[item_index], name)
+            report("save", "", "")
+            return True
         return False
 
+    def _estimate_duration(self, mname, minfo):
+        basename = os.path.basename(mname)
+        if basename in self.durations:
+            return self.durations[basename]
+        # average function time of completed tests in this run
+        if self.func_count:
+            func_time = float(self.func_time) / self.func_count
+        else:
+            func_time = self.default_func_time
+        return func_time * len(minfo.node_indexes)
+
+    def _add_running_locked(self, name, mname, minfo, estimate):
+        run = SpyTestDict()
+        run.node = name
+        run.pending = len(minfo.node_indexes)
+        run.elapsed = 0
+        run.estimate = estimate
+        self.running_modules[mname] = run
+        for item_index in minfo.node_indexes:
+            self.item_modules[item_index] = mname
+
+    def _drop_running_locked(self, name):
+        # the unfinished tests of the node are rescheduled as new modules
+        for mname, run in list(self.running_modules.items()):
+            if run.node == name:
+                self.running_modules.pop(mname)
+
+    def _record_duration_locked(self, item_index, duration):
+        # returns True when the module of the item is completed
+        mname = self.item_modules.pop(item_index, None)
+        if mname is None or mname not in self.running_modules:
+            return False
+        self.func_time, self.func_count = self.func_time + duration, self.func_count + 1
+        run = self.running_modules[mname]
+        run.pending = run.pending - 1
+        run.elapsed = run.elapsed + duration
+        if run.pending > 0:
+            return False
+        self.running_modules.pop(mname)
+        basename = os.path.basename(mname)
+        msg = "Module {} completed in {} estimate {}"
+        debug(msg.format(basename, utils.time_format(int(run.elapsed)), utils.time_format(int(run.estimate))))
+        self.durations[basename] = run.elapsed
+        self._show_projection_locked(False)
+        return True
+
+    def _save_durations(self):
+        # can be used as SPYTEST_BATCH_DURATION_HISTORY in the next runs
+        # written without holding wa.lock, the latest durations are copied under durations_lock
+        with wa.durations_lock:
+            durations = dict(self.durations)
+            header, rows = ["Module", "Duration"], []
+            for mname in sorted(durations):
+                rows.append([mname, utils.time_format(int(durations[mname]))])
+            filepath = os.path.join(wa.logs_path, "batch_durations.csv")
+            utils.write_csv_file(header, rows, filepath)
+
+    def _show_projection_locked(self, show=True):
+        # remaining time of the modules running on the active nodes
+        loads = {}
+        for node in self.node_modules:
+            gid = get_gw_name(node.gateway)
+            if self.wa.workers[gid].node_type != "ReRun" and self._is_active_locked(node):
+                loads[gid] = 0
+        if not loads:
+            return
+        for run in self.running_modules.values():
+            if run.node in loads:
+                loads[run.node] = loads[run.node] + max(run.estimate - run.elapsed, 0)
+
+        # simulate longest first scheduling of the pending modules
+        pending = []
+        for mname, minfo in self.main_modules.items():
+            nodes = [gid for gid in minfo.nodes if gid in loads]
+            if nodes:
+                pending.append([self._estimate_duration(mname, minfo), nodes])
+        for estimate, nodes in sorted(pending, key=itemgetter(0), reverse=True):
+            gid = min(nodes, key=lambda n: loads[n])
+            loads[gid] = loads[gid] + estimate
+
+        remaining = max(loads.values())
+        ideal = sum(loads.values()) / len(loads)
+        finish = get_timestamp(False, get_timenow() + timedelta(seconds=remaining))
+        msg = "Projected Finish Time {} Remaining {} Ideal {} Nodes {} Pending Modules {}"
+        msg = msg.format(finish, utils.time_format(int(remaining)), utils.time_format(int(ideal)),
+                         len(loads), len(pending))
+        if show:
+            trace(msg)
+        else:
+            debug(msg)
+
     def _pending_count(self, worker, modules=None, dbg=False):
         count, modules = 0, modules or self.main_modules
         for mname, minfo in modules.items():
@@ -1162,6 +1381,8 @@ class SpyTestScheduling(object):
                 continue
             funcs = self.unfinished_tests(node)[1]
             debug("handle finished {} assigned {} running {}".format(gid, worker.assigned, len(funcs)))
+            self._drop_running_locked(gid)
+            self._show_projection_locked()
             if not funcs:
                 debug("schedule: no applicable tests for {}".format(gid))
                 continue
@@ -1626,6 +1847,7 @@ def configure(config, logs_path, root_logs_path):
     wa.tcmap = dict()
     load_module_csv()
     load_coverage_history()
+    load_duration_history()
     init_stdout(config, logs_path)
     dist.configure(config, logs_path, is_worker(), wa)
     create_dashboard()
@@ -2011,7 +2233,7 @@ def finish_node_locked(gw, gid, error, reader, status=None):
 
     # update the reports
     _show_testbed_info()
-    save_report()
+    save_report(True)
     try:
         save_finished_testbeds()
     except Exception as exp:
@@ -89,6 +89,10 @@ defaults = {
     "SPYTEST_BATCH_POLL_STATUS_TIME": "0",
     "SPYTEST_BATCH_SAVE_FREE_DEVICES": "1",
     "SPYTEST_BATCH_TOPO_PREF": "0",
+    "SPYTEST_BATCH_LONGEST_FIRST": "1",
+    "SPYTEST_BATCH_DURATION_HISTORY": "",
+    "SPYTEST_BATCH_DEFAULT_FUNC_TIME": "60",
+    "SPYTEST_BATCH_REPORT_INTERVAL": "10",
     "SPYTEST_TECH_SUPPORT_DELETE_ON_DUT": "0",
     "SPYTEST_SHOWTECH_MAXTIME": "1200",
     "SPYTEST_ABORT_ON_APPLY_BASE_CONFIG_FAIL": "1",
@@ -117,6 +121,8 @@ dev_defaults = {
     "SPYTEST_CMDLINE_ARGS": "",
     "SPYTEST_SUITE_ARGS": "",
     "SPYTEST_TEXTFSM_DUMP_INDENT_JSON": None,
+    "SPYTEST_TEXTFSM_CACHE": "1",
+    "SPYTEST_TEXTFSM_CACHE_TRACE": "0",
     "SPYTEST_TESTBED_EXCLUDE_DEVICES": None,
     "SPYTEST_TESTBED_INCLUDE_DEVICES": None,
     "SPYTEST_LOGS_PATH": None,
@@ -4858,6 +4858,7 @@ def _delete_work_area():
     wa._session_clean()
 
     if batch.is_master():
+        batch.flush_report()
         consolidate_results(add_nes=True, ident="master")
     elif not batch.is_member():
         consolidate_results(ident="standalone")
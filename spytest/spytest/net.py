@@ -2858,6 +2858,9 @@ class Net(object):
             msg = self._trace_tmpl(cmd, tmpl)
             self.dut_log(devname, msg, lvl=LEVEL_TXTFSM)
             self.dut_log(devname, str(parsed), lvl=LEVEL_TXTFSM)
+            if env.get("SPYTEST_TEXTFSM_CACHE_TRACE", "0") != "0":
+                msg = "TEMPLATE CACHE: {}".format(self.tmpl[devname].get_cache_stats())
+                self.dut_log(devname, msg, lvl=LEVEL_TXTFSM)
             if env.get("SPYTEST_SAVE_TEMPLATE_SAMPLES", "0") != "0":
                 path = self.get_logs_path(devname, "templates")
                 self.tmpl[devname].save_sample(tmpl, cmd, output, parsed, path)
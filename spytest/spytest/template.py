@@ -2,6 +2,7 @@ import sys
 import os
 import re
 import json
+import threading
 from collections import OrderedDict
 
 bundled_parser = os.getenv("SPYTEST_TEXTFSM_USE_BUNDLED_PARSER")
@@ -19,6 +20,118 @@ from spytest import env  # noqa: E402
 import utilities.common as utils  # noqa: E402
 
 
+class FsmCache(object):
+    """
+    Per-process cache of compiled TextFSM objects keyed by template path and mtime.
+    Idle FSMs are kept per template and reset before reuse, so each call gets its
+    own FSM without reading and compiling the template again.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.hits = 0
+        self.misses = 0
+
+    def enabled(self):
+        return env.get("SPYTEST_TEXTFSM_CACHE", "1") != "0"
+
+    def acquire(self, path):
+        mtime = os.path.getmtime(path)
+        fsm = None
+        if self.enabled():
+            with self.lock:
+                entry = self.idle.get(path)
+                if entry and entry[0] == mtime and entry[1]:
+                    fsm = entry[1].pop()
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        if fsm is None:
+            with open(path, "r") as tmpl_fp:
+                fsm = textfsm.TextFSM(tmpl_fp)
+        else:
+            fsm.Reset()
+        return mtime, fsm
+
+    def release(self, path, mtime, fsm):
+        if not self.enabled():
+            return
+        with self.lock:
+            entry = self.idle.get(path)
+            if not entry or entry[0] != mtime:
+                # first FSM of the template or the template is modified
+                entry = [mtime, []]
+                self.idle[path] = entry
+            entry[1].append(fsm)
+
+    def parse(self, path, data):
+        mtime, fsm = self.acquire(path)
+        try:
+            out = fsm.ParseText(data)
+            return fsm.header, fsm.GetValuesByAttrib('Key'), out
+        finally:
+            self.release(path, mtime, fsm)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "templates": len(self.idle)}
+
+
+fsm_cache = FsmCache()
+
+
+class CachedCliTable(clitable.CliTable):
+    """
+    CliTable which caches the command to template lookup and
+    parses using the compiled FSMs from fsm_cache.
+    Both caches are disabled by SPYTEST_TEXTFSM_CACHE=0.
+    """
+
+    def __init__(self, index_file=None, template_dir=None):
+        super(CachedCliTable, self).__init__(index_file, template_dir)
+        self.templates_cache = {}
+
+    def get_templates(self, attributes):
+        key = tuple(sorted(attributes.items()))
+        if fsm_cache.enabled() and key in self.templates_cache:
+            return self.templates_cache[key]
+        row_idx = self.index.GetRowMatch(attributes)
+        if not row_idx:
+            raise clitable.CliTableError(
+                'No template found for attributes: "%s"' % attributes)
+        templates = self.index.index[row_idx]['Template']
+        if fsm_cache.enabled():
+            self.templates_cache[key] = templates
+        return templates
+
+    def ParseCmd(self, cmd_input, attributes=None, templates=None):
+        self.raw = cmd_input
+        if not templates:
+            templates = self.get_templates(attributes)
+        template_files = [os.path.join(self.template_dir, tmplt)
+                          for tmplt in templates.split(':')]
+
+        # Re-initialise the table.
+        self.Reset()
+        self._keys = set()
+        self.table = self._ParseCmdItem(self.raw, template_file=template_files[0])
+
+        # Add additional columns from any additional tables.
+        for tmplt in template_files[1:]:
+            self.extend(self._ParseCmdItem(self.raw, template_file=tmplt), set(self._keys))
+
+    def _ParseCmdItem(self, cmd_input, template_file=None):
+        header, keys, records = fsm_cache.parse(template_file, cmd_input)
+        if not self._keys:
+            self._keys = set(keys)
+        table = clitable.texttable.TextTable()
+        table.header = header
+        for record in records:
+            table.Append(record)
+        return table
+
+
 class Template(object):
 
     def __init__(self, platform=None, cli=None, root=None):
@@ -38,26 +151,37 @@ class Template(object):
         for index in index.split(","):
             if not os.path.exists(os.path.join(self.root, index)):
                 index = "index"
-            self.cli_tables[index] = clitable.CliTable(index, self.root)
+            self.cli_tables[index] = CachedCliTable(index, self.root)
         self.platform = platform
         self.cli = cli
+        self.cmd_cache = {}
 
-    # find the template given command
-    def get_tmpl(self, cmd):
+    # find the template and the table given command
+    def lookup(self, cmd):
+        if cmd in self.cmd_cache:
+            return self.cmd_cache[cmd]
+        retval = [None, None]
         attrs = dict(Command=cmd)
         for cli_table in self.cli_tables.values():
             row_idx = cli_table.index.GetRowMatch(attrs)
             if row_idx != 0:
-                return cli_table.index.index[row_idx]['Template']
-        return None
+                retval = [cli_table.index.index[row_idx]['Template'], cli_table]
+                break
+        if fsm_cache.enabled():
+            self.cmd_cache[cmd] = retval
+        return retval
+
+    # find the template given command
+    def get_tmpl(self, cmd):
+        return self.lookup(cmd)[0]
 
     def get_table(self, cmd):
-        attrs = dict(Command=cmd)
-        for cli_table in self.cli_tables.values():
-            row_idx = cli_table.index.GetRowMatch(attrs)
-            if row_idx != 0:
-                return cli_table
-        return None
+        return self.lookup(cmd)[1]
+
+    def get_cache_stats(self):
+        retval = fsm_cache.stats()
+        retval["commands"] = len(self.cmd_cache)
+        return retval
 
     # retrieve template and sample file given the command
     def read_sample(self, cmd):
@@ -90,11 +214,10 @@ class Template(object):
         if self.cli:
             attrs["cli"] = self.cli
 
-        tmpl_file = self.get_tmpl(cmd)
+        tmpl_file, cli_table = self.lookup(cmd)
         if not tmpl_file:
             raise ValueError('Unknown command "%s"' % (cmd))
 
-        cli_table = self.get_table(cmd)
         if not cli_table:
             raise ValueError('Unable to parse command "%s"' % (cmd))
 
@@ -160,12 +283,9 @@ class Template(object):
     # apply the given template on given data
     def apply_textfsm(self, tmpl_file, data):
         tmpl_file2 = os.path.join(self.root, tmpl_file)
-        tmpl_fp = open(tmpl_file2, "r")
-        re_table = textfsm.TextFSM(tmpl_fp)
-        out = re_table.ParseText(data)
-        tmpl_fp.close()
-        objs = self.result(re_table.header, out)
-        return re_table.header, objs
+        header, _, out = fsm_cache.parse(tmpl_file2, data)
+        objs = self.result(header, out)
+        return header, objs
 
 
 if __name__ == "__main__":
@@ -6,8 +6,14 @@ in the data returned by recv. Instead, it delivers the VLAN TCI in a control
 message. Python 2.x doesn't have built-in support for recvmsg, so we have to
 use ctypes to call it. The recv function exported by this module reconstructs
 the VLAN tag if it was offloaded.
+
+For high packet rates the RxRing class receives the packets through a memory
+mapped PACKET_RX_RING (TPACKET_V2) and the sendmmsg function sends a batch of
+packets with one system call.
 """
 
+import mmap
+import select
 import struct
 from ctypes import sizeof
 from ctypes import get_errno
@@ -27,7 +33,12 @@ from ctypes import c_uint32
 
 ETH_P_8021Q = 0x8100
 SOL_PACKET = 263
+PACKET_RX_RING = 5
 PACKET_AUXDATA = 8
+PACKET_VERSION = 10
+TPACKET_V2 = 1
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1 << 0
 TP_STATUS_VLAN_VALID = 1 << 4
 
 
@@ -70,10 +81,20 @@ class struct_tpacket_auxdata(Structure):
     ]
 
 
-libc = CDLL("libc.so.6")
+class struct_mmsghdr(Structure):
+    _fields_ = [
+        ("msg_hdr", struct_msghdr),
+        ("msg_len", c_uint),
+    ]
+
+
+libc = CDLL("libc.so.6", use_errno=True)
 recvmsg = libc.recvmsg
 recvmsg.argtypes = [c_int, POINTER(struct_msghdr), c_int]
 recvmsg.retype = c_int
+libc_sendmmsg = libc.sendmmsg
+libc_sendmmsg.argtypes = [c_int, POINTER(struct_mmsghdr), c_uint, c_int]
+libc_sendmmsg.restype = c_int
 
 
 def enable_auxdata(sk):
@@ -125,9 +146,98 @@ def recv(sk, bufsize):
 
     auxdata = struct_tpacket_auxdata.from_buffer(ctrl_buf, sizeof(struct_cmsghdr))  # pylint: disable=E1101
 
-    if auxdata.tp_vlan_tci != 0 or auxdata.tp_status & TP_STATUS_VLAN_VALID:
-        # Insert VLAN tag
-        tag = struct.pack("!HH", ETH_P_8021Q, auxdata.tp_vlan_tci)
-        return buf.raw[:12] + tag + buf.raw[12:rv]
-    else:
-        return buf.raw[:rv]
+    # Insert VLAN tag
+    return add_vlan_tag(buf.raw[:rv], auxdata.tp_status, auxdata.tp_vlan_tci)
+
+
+def add_vlan_tag(data, status, vlan_tci):
+    if vlan_tci != 0 or status & TP_STATUS_VLAN_VALID:
+        tag = struct.pack("!HH", ETH_P_8021Q, vlan_tci)
+        return data[:12] + tag + data[12:]
+    return data
+
+
+def sendmmsg(sk, frames):
+    """
+    Send the packets with sendmmsg system call
+    @sk Socket bound to the interface
+    @frames List of packets
+    Returns number of packets sent, raises RuntimeError if none sent
+    """
+    count = len(frames)
+    bufs = [create_string_buffer(data, len(data)) for data in frames]
+    iovs = (struct_iovec * count)()
+    msgs = (struct_mmsghdr * count)()
+    for index, buf in enumerate(bufs):
+        iovs[index].iov_base = cast(buf, c_void_p)
+        iovs[index].iov_len = len(frames[index])
+        msgs[index].msg_hdr.msg_iov = pointer(iovs[index])
+        msgs[index].msg_hdr.msg_iovlen = 1
+
+    sent = 0
+    while sent < count:
+        rv = libc_sendmmsg(sk.fileno(), cast(byref(msgs, sent * sizeof(struct_mmsghdr)),
+                                             POINTER(struct_mmsghdr)), count - sent, 0)
+        if rv <= 0:
+            if sent:
+                break
+            msg = "sendmmsg failed: rv={} errno={}".format(rv, get_errno())
+            raise RuntimeError(msg)
+        sent = sent + rv
+    return sent
+
+
+class RxRing(object):
+    """
+    Memory mapped PACKET_RX_RING on an AF_PACKET socket
+
+    The kernel copies the packets into the ring frames and the recv method
+    returns all the packets available in the ring without a system call per
+    packet. The VLAN tag is reconstructed like in the recv function.
+    """
+    # struct tpacket2_hdr: status, len, snaplen, mac, net, sec, nsec, vlan_tci, vlan_tpid
+    hdr = struct.Struct("IIIHHIIHH")
+
+    def __init__(self, sk, frame_size=16 * 1024, frame_count=256):
+        self.sk = sk
+        self.frame_size = frame_size
+        self.frame_count = frame_count
+        sk.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V2)
+        # one frame per block, the frame size is a multiple of the page size
+        req = struct.pack("IIII", frame_size, frame_count, frame_size, frame_count)
+        sk.setsockopt(SOL_PACKET, PACKET_RX_RING, req)
+        self.ring = mmap.mmap(sk.fileno(), frame_size * frame_count,
+                              mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self.poller = select.poll()
+        self.poller.register(sk.fileno(), select.POLLIN | select.POLLERR)
+        self.index = 0
+
+    def close(self):
+        try:
+            self.ring.close()
+        except Exception:
+            pass
+
+    def recv(self, timeout=1000, max_count=None):
+        """
+        Receive the packets available in the ring
+        @timeout Time to wait for a packet in milliseconds
+        @max_count Maximum number of packets returned
+        """
+        max_count = max_count or self.frame_count
+        offset = self.index * self.frame_size
+        if not self.hdr.unpack_from(self.ring, offset)[0] & TP_STATUS_USER:
+            self.poller.poll(timeout)
+
+        frames = []
+        while len(frames) < max_count:
+            offset = self.index * self.frame_size
+            status, _, snaplen, mac, _, _, _, vlan_tci, _ = self.hdr.unpack_from(self.ring, offset)
+            if not status & TP_STATUS_USER:
+                break
+            data = self.ring[offset + mac:offset + mac + snaplen]
+            frames.append(add_vlan_tag(data, status, vlan_tci))
+            # give the frame back to the kernel
+            struct.pack_into("I", self.ring, offset, TP_STATUS_KERNEL)
+            self.index = (self.index + 1) % self.frame_count
+        return frames
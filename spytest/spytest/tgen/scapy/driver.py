@@ -121,8 +121,7 @@ class ScapyDriver(object):
             # read packets
             while self.rx_any_enable():
                 try:
-                    packet = self.packet.readp(self.iface, self.port)
-                    if packet:
+                    for packet in self.packet.readp_batch(self.iface, self.port):
                         self.handle_recv(packet)
                 except Exception as e:
                     if str(e) != "[Errno 100] Network is down":
@@ -407,42 +406,55 @@ class ScapyDriver(object):
             for pwa in pwa_list:
                 if not pwa.stream.enable or not pwa.stream.enable2:
                     continue
+                if pwa.tx_time > self.utils.clock():
+                    # send the batched packets before waiting
+                    self.packet.send_flush(self.iface)
                 self.pwa_wait(pwa)
-                try:
-                    send_start_time = self.utils.clock()
-                    pkt = self.send_packet(pwa, pwa.stream.stream_id)
-                    bytesSent = len(pkt)
-                    send_time = self.utils.clock() - send_start_time
-
-                    # increment port counters
-                    framesSent = self.port.incrStat('framesSent')
-                    self.port.incrStat('bytesSent', bytesSent)
-                    if self.dbg > 2:
-                        self.logger.debug("{} framesSent: {}".format(self.iface, framesSent))
-                    pwa.stream.incrStat('framesSent')
-                    pwa.stream.incrStat('bytesSent', bytesSent)
-                    tx_count = tx_count + 1
-
-                    # increment stream counters
-                    stream_tx = self.stream_pkts[pwa.stream.stream_id] + 1
-                    self.stream_pkts[pwa.stream.stream_id] = stream_tx
-                    if self.dbg > 2 or (self.dbg > 1 and stream_tx % 100 == 99):
-                        self.logger.debug("{}/{} framesSent: {}".format(self.iface,
-                                          pwa.stream.stream_id, stream_tx))
-                except Exception as e:
-                    self.logger.log_exception(e, traceback.format_exc())
-                    pwa.stream.enable2 = False
-                else:
+                burst_count = 0
+                while pwa:
+                    try:
+                        send_start_time = self.utils.clock()
+                        pkt = self.send_packet(pwa, pwa.stream.stream_id)
+                        bytesSent = len(pkt)
+                        send_time = self.utils.clock() - send_start_time
+
+                        # increment port counters
+                        framesSent = self.port.incrStat('framesSent')
+                        self.port.incrStat('bytesSent', bytesSent)
+                        if self.dbg > 2:
+                            self.logger.debug("{} framesSent: {}".format(self.iface, framesSent))
+                        pwa.stream.incrStat('framesSent')
+                        pwa.stream.incrStat('bytesSent', bytesSent)
+                        tx_count = tx_count + 1
+
+                        # increment stream counters
+                        stream_tx = self.stream_pkts[pwa.stream.stream_id] + 1
+                        self.stream_pkts[pwa.stream.stream_id] = stream_tx
+                        if self.dbg > 2 or (self.dbg > 1 and stream_tx % 100 == 99):
+                            self.logger.debug("{}/{} framesSent: {}".format(self.iface,
+                                              pwa.stream.stream_id, stream_tx))
+                    except Exception as e:
+                        self.logger.log_exception(e, traceback.format_exc())
+                        pwa.stream.enable2 = False
+                        break
                     build_start_time = self.utils.clock()
                     pwa_next = self.packet.build_next(pwa)
                     if not pwa_next:
                         pwa.stream.enable2 = False
                         self.logger.debug("{} {} Completed Stream {}".format(func, self.iface, pwa.stream.stream_id))
-                        continue
+                        break
                     build_time = self.utils.clock() - build_start_time
                     ipg = self.packet.build_ipg(pwa_next)
+                    burst_count = burst_count + 1
+                    if ipg == 0 and burst_count < self.packet.tx_batch_size and self.get_tx_state() \
+                            and pwa_next.stream.enable and pwa_next.stream.enable2:
+                        # rest of the burst is due now, batch it with this packet
+                        pwa = pwa_next
+                        continue
                     pwa_next.tx_time = self.utils.clock() + ipg - build_time - send_time
                     pwa_next_list.append(pwa_next)
+                    pwa = None
+            self.packet.send_flush(self.iface)
             pwa_list = pwa_next_list
         self.logger.debug("{} {} Completed {}".format(func, self.iface, tx_count))
 
@@ -0,0 +1,200 @@
+import socket
+import struct
+import binascii
+
+from scapy.compat import raw
+from scapy.layers.l2 import Ether, Dot1Q, ARP
+from scapy.layers.inet import IP, UDP, TCP
+from scapy.layers.inet6 import IPv6
+
+ETH_P_IP = 0x0800
+ETH_P_8021Q = 0x8100
+ETH_P_EAPOL = 0x888e
+IPPROTO_IGMP = 2
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+IPPROTO_OSPF = 89
+BOOTP_PORTS = [67, 68]
+
+# offset of the checksum in the L4 headers covering the IP pseudo header
+L4_CHKSUM_OFFSET = {IPPROTO_TCP: 16, IPPROTO_UDP: 6, IPPROTO_ICMPV6: 2}
+
+
+def pack_mac(value):
+    return binascii.unhexlify(value.replace(":", ""))
+
+
+def pack_ipv4(value):
+    return socket.inet_aton(value)
+
+
+def pack_ipv6(value):
+    return socket.inet_pton(socket.AF_INET6, value)
+
+
+def pack_port(value):
+    return struct.pack("!H", value)
+
+
+def checksum_update(chksum, old, new):
+    # incremental update of internet checksum RFC 1624: HC' = ~(~HC + ~m + m')
+    total = ~chksum & 0xFFFF
+    for index in range(0, len(old), 2):
+        total += (~((old[index] << 8) | old[index + 1]) & 0xFFFF)
+        total += (new[index] << 8) | new[index + 1]
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def is_protocol_frame(data):
+    """
+    Check if the frame needs to be processed by PacketProtocol
+    i.e. it may carry OSPF, BOOTP, IGMP or EAPOL packet
+    """
+    offset = 12
+    eth_type = struct.unpack_from("!H", data, offset)[0]
+    while eth_type == ETH_P_8021Q and len(data) >= offset + 6:
+        offset = offset + 4
+        eth_type = struct.unpack_from("!H", data, offset)[0]
+    offset = offset + 2
+    if eth_type == ETH_P_EAPOL:
+        return True
+    if eth_type != ETH_P_IP or len(data) < offset + 20:
+        return False
+    proto = bytearray(data[offset + 9:offset + 10])[0]
+    if proto in [IPPROTO_IGMP, IPPROTO_OSPF]:
+        return True
+    if proto != IPPROTO_UDP:
+        return False
+    ihl = (bytearray(data[offset:offset + 1])[0] & 0x0F) * 4
+    if len(data) < offset + ihl + 4:
+        return False
+    sport, dport = struct.unpack_from("!HH", data, offset + ihl)
+    return sport in BOOTP_PORTS or dport in BOOTP_PORTS
+
+
+class FieldPatch(object):
+    def __init__(self, layer, name, offset, pack, chksums):
+        self.layer = layer
+        self.name = name
+        self.offset = offset
+        self.pack = pack
+        self.chksums = chksums
+        self.value = getattr(layer, name)
+
+
+class FrameTemplate(object):
+    """
+    Serialized frame of a stream
+
+    The frame is built by scapy once. The fields modified by build_next_dma
+    (MAC/IP addresses, VLAN, L4 ports) are patched in the frame buffer and
+    the checksums covering them are updated incrementally, so that the next
+    frames of the stream are not built by scapy.
+    """
+
+    def __init__(self, pkt, data):
+        self.buf = bytearray(data)
+        self.patches = []
+        self.add(pkt, "dst", 0, pack_mac)
+        self.add(pkt, "src", 6, pack_mac)
+
+        dot1q = pkt.getlayer(Dot1Q)
+        if dot1q is not None:
+            if pkt.getlayer(Dot1Q, 2) is not None:
+                raise ValueError("multiple VLAN tags")
+            self.add(dot1q, "vlan", self.offset(dot1q, data), self.pack_tci(dot1q))
+
+        arp = pkt.getlayer(ARP)
+        if arp is not None:
+            arp_offset = self.offset(arp, data)
+            self.add(arp, "hwsrc", arp_offset + 8, pack_mac)
+            self.add(arp, "hwdst", arp_offset + 18, pack_mac)
+
+        ip4, ip6 = pkt.getlayer(IP), pkt.getlayer(IPv6)
+        if ip4 is not None and ip6 is not None:
+            raise ValueError("IPv4 and IPv6 headers")
+        l3, l4_chksums = ip4 or ip6, []
+        if l3 is not None:
+            if pkt.getlayer(type(l3), 2) is not None:
+                raise ValueError("multiple IP headers")
+            l3_offset = self.offset(l3, data)
+            if ip4 is not None:
+                proto = self.buf[l3_offset + 9]
+                l4_offset = l3_offset + (self.buf[l3_offset] & 0x0F) * 4
+            else:
+                proto = self.buf[l3_offset + 6]
+                l4_offset = l3_offset + 40
+                # the L4 checksum after extension headers is not located
+                if proto not in L4_CHKSUM_OFFSET:
+                    raise ValueError("IPv6 next header {}".format(proto))
+            if proto in L4_CHKSUM_OFFSET and (proto != IPPROTO_ICMPV6 or ip6 is not None):
+                chksum_offset = l4_offset + L4_CHKSUM_OFFSET[proto]
+                # zero UDP checksum is not used
+                if proto != IPPROTO_UDP or self.buf[chksum_offset:chksum_offset + 2] != b"\0\0":
+                    l4_chksums.append(chksum_offset)
+            if ip4 is not None:
+                chksums = [l3_offset + 10] + l4_chksums
+                self.add(ip4, "src", l3_offset + 12, pack_ipv4, chksums)
+                self.add(ip4, "dst", l3_offset + 16, pack_ipv4, chksums)
+            else:
+                self.add(ip6, "src", l3_offset + 8, pack_ipv6, l4_chksums)
+                self.add(ip6, "dst", l3_offset + 24, pack_ipv6, l4_chksums)
+
+        for l4_type in [TCP, UDP]:
+            l4 = pkt.getlayer(l4_type)
+            if l4 is None:
+                continue
+            if l3 is None or pkt.getlayer(l4_type, 2) is not None or self.offset(l4, data) != l4_offset:
+                raise ValueError("unsupported L4 header")
+            self.add(l4, "sport", l4_offset, pack_port, l4_chksums)
+            self.add(l4, "dport", l4_offset + 2, pack_port, l4_chksums)
+
+    @staticmethod
+    def offset(layer, data):
+        return len(data) - len(raw(layer))
+
+    @staticmethod
+    def pack_tci(dot1q):
+        def pack(vlan):
+            return struct.pack("!H", (dot1q.prio << 13) | (dot1q.id << 12) | vlan)
+        return pack
+
+    def add(self, layer, name, offset, pack, chksums=None):
+        patch = FieldPatch(layer, name, offset, pack, chksums or [])
+        if bytes(self.buf[offset:offset + len(pack(patch.value))]) != pack(patch.value):
+            raise ValueError("field {} not found in the frame".format(name))
+        self.patches.append(patch)
+
+    def update(self):
+        """
+        Patch the frame with the current packet field values and return it
+        """
+        buf = self.buf
+        for patch in self.patches:
+            value = getattr(patch.layer, patch.name)
+            if value == patch.value:
+                continue
+            new = bytearray(patch.pack(value))
+            old = buf[patch.offset:patch.offset + len(new)]
+            for offset in patch.chksums:
+                chksum = (buf[offset] << 8) | buf[offset + 1]
+                chksum = checksum_update(chksum, old, new) or 0xFFFF
+                buf[offset:offset + 2] = struct.pack("!H", chksum)
+            buf[patch.offset:patch.offset + len(new)] = new
+            patch.value = value
+        return bytes(buf)
+
+    @staticmethod
+    def create(pkt, data):
+        """
+        Returns the template for the frame or None if the packet is not supported
+        """
+        if not isinstance(pkt, Ether):
+            return None
+        try:
+            return FrameTemplate(pkt, data)
+        except Exception:
+            return None
@@ -2,6 +2,7 @@ import os
 import zlib
 import time
 import copy
+import struct
 import random
 import binascii
 import socket
@@ -31,6 +32,8 @@ from interface import PacketInterface
 from bgp_exabgp import ExaBgp
 from dot1x import Dot1x
 from dhcps import Dhcps
+from fastpath import FrameTemplate
+from fastpath import is_protocol_frame
 
 try:
     print("SCAPY VERSION = {}".format(Conf().version))
@@ -143,13 +146,19 @@ class ScapyPacket(object):
         self.dbg = dbg
         self.show_summary = bool(self.dbg > 2)
         self.hex = bool(os.getenv("SPYTEST_SCAPY_HEXDUMP", "0") != "0")
+        # the fast path sends the frames of a stream in batches, the frames of the streams
+        # are not interleaved one by one as in the per packet path, hence it is opt-in
+        self.fast_path = bool(os.getenv("SPYTEST_SCAPY_FAST_PATH", "0") != "0")
+        self.tx_batch_size = self.utils.get_env_int("SPYTEST_SCAPY_TX_BATCH", 32) if self.fast_path else 1
         self.iface = iface
         self.is_vde = not dry and iface.startswith("vde")
         self.stats_lock = Lock()
         self.tx_count = 0
         self.rx_count = 0
         self.rx_sock = None
+        self.rx_ring = None
         self.tx_sock = None
+        self.tx_frames = []
         self.tx_sock_failed = False
         self.finished = False
         self.mtu = 9194
@@ -261,7 +270,9 @@ class ScapyPacket(object):
         self.dot1x.cleanup()
         self.dhcps.cleanup()
         self.finished = True
+        self.rx_ring = self.close_sock(self.rx_ring)
         self.rx_sock = self.close_sock(self.rx_sock)
+        self.tx_frames = []
         self.tx_sock = self.close_sock(self.tx_sock)
         self.tx_sock_failed = False
         self.init_bridge(self.iface)
@@ -282,6 +293,11 @@ class ScapyPacket(object):
                 raise exp
             raise RunTimeException(exp, msg)
         afpacket.enable_auxdata(self.rx_sock)
+        if self.fast_path:
+            try:
+                self.rx_ring = afpacket.RxRing(self.rx_sock)
+            except Exception as exp:
+                self.logger.info("RX ring not used on {}: {}".format(self.iface, exp))
 
     def set_link(self, status):
         msg = "link:{} status:{}".format(self.iface, status)
@@ -302,12 +318,35 @@ class ScapyPacket(object):
             if self.finished:
                 return None
             raise exp
-        packet = Ether(data)
+        return self.rx_process(data, iface, port)
+
+    def readp_batch(self, iface, port):
+
+        if not self.rx_ring:
+            packet = self.readp(iface, port)
+            return [packet] if packet else []
+
+        try:
+            frames = self.rx_ring.recv()
+        except Exception as exp:
+            if self.finished:
+                return []
+            raise exp
+        return [self.rx_process(data, iface, port) for data in frames]
+
+    def rx_process(self, data, iface, port):
         self.stats_lock.acquire()
         self.rx_count = self.rx_count + 1
         self.stats_lock.release()
         self.trace_stats()
 
+        # stats and captures need only the frame bytes
+        # dissect the packet only for protocols and tracing
+        if self.fast_path and self.dbg <= 1 and not is_protocol_frame(data):
+            self.pp.process_periodic(port)
+            return data
+
+        packet = Ether(data)
         if self.dbg > 1:
             cmd = "" if not self.show_summary else packet.command()
             msg = "readp:{} len:{} count:{} {}".format
@@ -335,8 +374,31 @@ class ScapyPacket(object):
         if self.dbg > 3:
             self.trace_packet(pkt, self.hex)
 
+        if self.tx_batch_size > 1 and not self.dry:
+            self.tx_frames.append(data)
+            if len(self.tx_frames) >= self.tx_batch_size:
+                self.send_flush(iface)
+            return None
+
         return self.send(data, iface)
 
+    def send_flush(self, iface):
+        frames, self.tx_frames = self.tx_frames, []
+        if not frames:
+            return
+        if len(frames) > 1 and self.tx_open(iface):
+            try:
+                sent = afpacket.sendmmsg(self.tx_sock.outs, frames)
+                if sent >= len(frames):
+                    return
+                frames = frames[sent:]
+            except Exception as exp:
+                self.logger.debug("Failed to send batch {} {}".format(iface, exp))
+
+        # send the remaining frames one by one
+        for data in frames:
+            self.send(data, iface)
+
     def mkcmd(self, data):
         try:
             pkt = Ether(data)
@@ -359,14 +421,7 @@ class ScapyPacket(object):
         if self.dry:
             return
 
-        if not self.tx_sock:
-            try:
-                self.tx_sock = L2Socket(iface)
-                self.tx_sock_failed = False
-            except Exception as exp:
-                func = self.logger.debug if self.tx_sock_failed else self.error
-                self.tx_sock_failed = True
-                func("Failed to create L2Socket {} {}".format(iface, exp))
+        self.tx_open(iface)
 
         err1, err2 = "", ""
 
@@ -389,6 +444,17 @@ class ScapyPacket(object):
         self.logger.error("Failed to send normal {}".format(err1))
         self.logger.error("Failed to send legacy {}".format(err2))
 
+    def tx_open(self, iface):
+        if not self.tx_sock:
+            try:
+                self.tx_sock = L2Socket(iface)
+                self.tx_sock_failed = False
+            except Exception as exp:
+                func = self.logger.debug if self.tx_sock_failed else self.error
+                self.tx_sock_failed = True
+                func("Failed to create L2Socket {} {}".format(iface, exp))
+        return self.tx_sock
+
     def trace_stats(self):
         # self.logger.debug("Name: {} RX: {} TX: {}".format(self.iface, self.rx_count, self.tx_count))
         pass
@@ -414,26 +480,39 @@ class ScapyPacket(object):
             self.logger.debug(hexdump(pkt, dump=True))
 
     def send_packet(self, pwa, iface, stream_name, left):
-        if pwa.padding:
-            strpkt = self.utils.tobytes(pwa.pkt / pwa.padding)
-        else:
-            strpkt = self.utils.tobytes(pwa.pkt)
+        strpkt = None
+        if pwa.get("template"):
+            try:
+                strpkt = pwa.template.update()
+            except Exception as exp:
+                self.logger.debug("Frame template {} disabled: {}".format(stream_name, exp))
+                pwa.template = None
+
+        if strpkt is None:
+            if pwa.padding:
+                strpkt = self.utils.tobytes(pwa.pkt / pwa.padding)
+            else:
+                strpkt = self.utils.tobytes(pwa.pkt)
+
+            # insert stream id before CRC
+            if pwa.add_signature:
+                sid = pwa.stream.get_sid()
+                sid = sid or "DeadBeef"
+                if sid:
+                    sid = binascii.unhexlify(sid)
+                    strpkt = strpkt[:-len(sid)] + sid
 
-        # insert stream id before CRC
-        if pwa.add_signature:
-            sid = pwa.stream.get_sid()
-            sid = sid or "DeadBeef"
-            if sid:
-                sid = binascii.unhexlify(sid)
-                strpkt = strpkt[:-len(sid)] + sid
+            # the frame size and padding are constant only in fixed length mode
+            if self.fast_path and "template" not in pwa and pwa.length_mode == "fixed":
+                pwa.template = FrameTemplate.create(pwa.pkt, strpkt)
 
         try:
-            crc1 = '{:08x}'.format(socket.htonl(zlib.crc32(strpkt) & 0xFFFFFFFF))
-            crc = binascii.unhexlify(crc1)
+            crc = struct.pack("!I", socket.htonl(zlib.crc32(strpkt) & 0xFFFFFFFF))
         except Exception:
             crc = binascii.unhexlify('00' * 4)
-        bstr = strpkt + self.utils.tobytes(crc)
-        self.sendp(Ether(bstr), bstr, iface, stream_name, left)
+        bstr = strpkt + crc
+        pkt = Ether(bstr) if self.dbg > 2 else None
+        self.sendp(pkt, bstr, iface, stream_name, left)
         return bstr
 
     def check(self, pkt):
@@ -1229,11 +1308,13 @@ class ScapyPacket(object):
         sid = binascii.unhexlify(sid)
         strpkt = self.utils.tobytes(pkt)
         sig = strpkt[-len(sid) - 4:-4]
-        msg = "{} {}".format(binascii.hexlify(sid), binascii.hexlify(sig))
         if sid == sig:
-            self.logger.debug("{}: CMP0: {}".format(self.iface, msg))
+            if self.dbg > 1:
+                msg = "{} {}".format(binascii.hexlify(sid), binascii.hexlify(sig))
+                self.logger.debug("{}: CMP0: {}".format(self.iface, msg))
             return True
         if self.dbg > 2:
+            msg = "{} {}".format(binascii.hexlify(sid), binascii.hexlify(sig))
             self.logger.debug("{}: CMP1: {}".format(self.iface, msg))
             self.trace_packet(pkt, hex=True, force=True)
         return False
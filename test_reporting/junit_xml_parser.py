@@ -26,10 +26,12 @@ python3 junit_xml_parser.py tests/files/sample_tr.xml
 import argparse
 import glob
 import json
+import shutil
 import sys
 import os
 
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from utilities import TestResultJSONValidationError
 from utilities import validate_json_file
@@ -178,10 +180,7 @@ def validate_junit_xml_archive(directory_name, strict=False):
     roots = []
     metadata_source = None
     metadata = {}
-    doc_list = glob.glob(os.path.join(directory_name, "tr.xml"))
-    doc_list += glob.glob(os.path.join(directory_name, "*test*.xml"))
-    doc_list += glob.glob(os.path.join(directory_name, "**", "*test*.xml"), recursive=True)
-    doc_list = set(doc_list)
+    doc_list = _find_junit_xml_documents(directory_name)
 
     total_size = 0
     for document in doc_list:
@@ -220,6 +219,13 @@ def validate_junit_xml_archive(directory_name, strict=False):
     return roots
 
 
+def _find_junit_xml_documents(directory_name):
+    doc_list = glob.glob(os.path.join(directory_name, "tr.xml"))
+    doc_list += glob.glob(os.path.join(directory_name, "*test*.xml"))
+    doc_list += glob.glob(os.path.join(directory_name, "**", "*test*.xml"), recursive=True)
+    return sorted(set(doc_list))
+
+
 def validate_junit_xml_path(path, strict=False):
     if os.path.isfile(path):
         roots = [validate_junit_xml_file(path)]
@@ -247,6 +253,10 @@ def _validate_test_summary(root):
     else:
         raise JUnitXMLValidationError(f"Either {TESTSUITES_TAG} or {TESTSUITE_TAG} tag are not found on root element")
 
+    _validate_testsuite_attributes(testsuit_element)
+
+
+def _validate_testsuite_attributes(testsuit_element):
     for xml_field, expected_type in REQUIRED_TESTSUITE_ATTRIBUTES:
         if xml_field not in testsuit_element.keys():
             raise JUnitXMLValidationError(f"{xml_field} not found in <{TESTSUITE_TAG}> element")
@@ -262,8 +272,10 @@ def _validate_test_summary(root):
 
 
 def _validate_test_metadata(root):
-    properties_element = root.find(PROPERTIES_TAG)
+    _validate_metadata_properties(root.find(PROPERTIES_TAG))
+
 
+def _validate_metadata_properties(properties_element):
     if not properties_element:
         return
 
@@ -330,16 +342,17 @@ def _validate_test_case_properties(root):
         print("missing testcase property: {}".format(list(missing_testcase_property)))
 
 
-def _validate_test_cases(root):
-    def _validate_test_case(test_case):
-        for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
-            if attribute not in test_case.keys():
-                raise JUnitXMLValidationError(
-                    f'"{attribute}" not found in test case '
-                    f"\"{test_case.get('name', 'Name Not Found')}\""
-                )
-        _validate_test_case_properties(test_case)
+def _validate_test_case(test_case):
+    for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
+        if attribute not in test_case.keys():
+            raise JUnitXMLValidationError(
+                f'"{attribute}" not found in test case '
+                f"\"{test_case.get('name', 'Name Not Found')}\""
+            )
+    _validate_test_case_properties(test_case)
+
 
+def _validate_test_cases(root):
     cases = root.findall(TESTCASE_TAG)
 
     for test_case in cases:
@@ -384,39 +397,48 @@ def _parse_test_summary(root):
 
 def _extract_test_summary(test_cases):
     test_result_summary = defaultdict(int)
+    case = None
     for _, cases in test_cases.items():
         for case in cases:
-            # Error may occur along with other test results, to count error separately.
-            # The result field is unique per test case, either error or failure.
-            # xfails is the counter for all kinds of xfail results (include success/failure/error/skipped)
-            test_result_summary["tests"] += 1
-            test_result_summary["failures"] += case["result"] == "failure"
-            test_result_summary["skipped"] += case["result"] == "skipped"
-            test_result_summary["errors"] += case["error"]
-            test_result_summary["time"] += float(case["time"])
-            test_result_summary["xfails"] += \
-                case["result"] == "xfail_failure" or case["result"] == \
-                "xfail_error" or case["result"] == "xfail_skipped" or case["result"] == "xfail_success"
+            _count_test_case(test_result_summary, case)
 
     test_result_summary = {k: str(v) for k, v in test_result_summary.items()}
+    if case is None:
+        return test_result_summary
+    REPORT_LIST.append(_test_summary_report(test_result_summary, case['file']))
+    return test_result_summary
+
+
+def _count_test_case(test_result_summary, case):
+    # Error may occur along with other test results, to count error separately.
+    # The result field is unique per test case, either error or failure.
+    # xfails is the counter for all kinds of xfail results (include success/failure/error/skipped)
+    test_result_summary["tests"] += 1
+    test_result_summary["failures"] += case["result"] == "failure"
+    test_result_summary["skipped"] += case["result"] == "skipped"
+    test_result_summary["errors"] += case["error"]
+    test_result_summary["time"] += float(case["time"])
+    test_result_summary["xfails"] += \
+        case["result"] == "xfail_failure" or case["result"] == \
+        "xfail_error" or case["result"] == "xfail_skipped" or case["result"] == "xfail_success"
+
+
+def _test_summary_report(test_result_summary, name):
     total = int(test_result_summary["failures"]) + int(test_result_summary["skipped"]) \
         + int(test_result_summary["errors"]) + int(test_result_summary["xfails"])
     passed = int(test_result_summary["tests"]) - int(total)
     passed = max(0, passed)
-    if case is None:
-        return test_result_summary
-    name = case['file']
-    REPORT_LIST.append("{}, {}, {}, {}, {}, {}, {}, {}".
-                       format(name, test_result_summary["tests"],
-                              passed, test_result_summary["failures"],
-                              test_result_summary["skipped"], test_result_summary["errors"],
-                              test_result_summary["xfails"], test_result_summary["time"]))
-    return test_result_summary
+    return "{}, {}, {}, {}, {}, {}, {}, {}".format(name, test_result_summary["tests"],
+                                                   passed, test_result_summary["failures"],
+                                                   test_result_summary["skipped"], test_result_summary["errors"],
+                                                   test_result_summary["xfails"], test_result_summary["time"])
 
 
 def _parse_test_metadata(root):
-    properties_element = root.find(PROPERTIES_TAG)
+    return _parse_metadata_properties(root.find(PROPERTIES_TAG))
 
+
+def _parse_metadata_properties(properties_element):
     if not properties_element:
         return {}
 
@@ -449,62 +471,63 @@ def _parse_testcase_properties(root):
     return testcase_properties
 
 
-def _parse_test_cases(root):
-    test_case_results = defaultdict(list)
-
-    def _parse_test_case(test_case):
-        result = {}
+def _parse_test_case(test_case):
+    result = {}
+
+    # FIXME: This is specific to pytest, needs to be extended to support spytest.
+    test_class_tokens = test_case.get("classname").split(".")
+    feature = test_class_tokens[0]
+
+    for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
+        result[attribute] = test_case.get(attribute)
+    for attribute in REQUIRED_TESTCASE_PROPERTIES:
+        testcase_properties = _parse_testcase_properties(test_case)
+        if attribute in testcase_properties:
+            result[attribute] = testcase_properties[attribute]
+
+    # NOTE: "if failure" and "if error" does not work with the ETree library.
+    failure = test_case.find("failure")
+    error = test_case.find("error")
+    skipped = test_case.find("skipped")
+
+    # Any test which marked as xfail will drop out a property to the report xml file.
+    # Add prefix "xfail_" to tests which are marked with xfail
+    properties_element = test_case.find(PROPERTIES_TAG)
+    xfail_case = ""
+    if properties_element:
+        for prop in properties_element.iterfind(PROPERTY_TAG):
+            if prop.get("name") == "xfail":
+                xfail_case = "xfail_"
+                break
+
+    # NOTE: "error" is unique in that it can occur alongside a succesful, failed, or skipped test result.
+    # Because of this, we track errors separately so that the error can be correlated with the stage it
+    # occurred.
+    # By looking into test results from past 300 days, error only occur with skipped test result.
+    #
+    # If there is *only* an error tag we note that as well, as this indicates that the framework
+    # errored out during setup or teardown.
+    if failure is not None:
+        result["result"] = "{}failure".format(xfail_case)
+        summary = failure.get("message", "")
+    elif skipped is not None:
+        result["result"] = "{}skipped".format(xfail_case)
+        summary = skipped.get("message", "")
+    elif error is not None:
+        result["result"] = "{}error".format(xfail_case)
+        summary = error.get("message", "")
+    else:
+        result["result"] = "{}success".format(xfail_case)
+        summary = ""
 
-        # FIXME: This is specific to pytest, needs to be extended to support spytest.
-        test_class_tokens = test_case.get("classname").split(".")
-        feature = test_class_tokens[0]
+    result["summary"] = summary[:min(len(summary), MAXIMUM_SUMMARY_SIZE)]
+    result["error"] = error is not None
 
-        for attribute in REQUIRED_TESTCASE_ATTRIBUTES:
-            result[attribute] = test_case.get(attribute)
-        for attribute in REQUIRED_TESTCASE_PROPERTIES:
-            testcase_properties = _parse_testcase_properties(test_case)
-            if attribute in testcase_properties:
-                result[attribute] = testcase_properties[attribute]
-
-        # NOTE: "if failure" and "if error" does not work with the ETree library.
-        failure = test_case.find("failure")
-        error = test_case.find("error")
-        skipped = test_case.find("skipped")
-
-        # Any test which marked as xfail will drop out a property to the report xml file.
-        # Add prefix "xfail_" to tests which are marked with xfail
-        properties_element = test_case.find(PROPERTIES_TAG)
-        xfail_case = ""
-        if properties_element:
-            for prop in properties_element.iterfind(PROPERTY_TAG):
-                if prop.get("name") == "xfail":
-                    xfail_case = "xfail_"
-                    break
-
-        # NOTE: "error" is unique in that it can occur alongside a succesful, failed, or skipped test result.
-        # Because of this, we track errors separately so that the error can be correlated with the stage it
-        # occurred.
-        # By looking into test results from past 300 days, error only occur with skipped test result.
-        #
-        # If there is *only* an error tag we note that as well, as this indicates that the framework
-        # errored out during setup or teardown.
-        if failure is not None:
-            result["result"] = "{}failure".format(xfail_case)
-            summary = failure.get("message", "")
-        elif skipped is not None:
-            result["result"] = "{}skipped".format(xfail_case)
-            summary = skipped.get("message", "")
-        elif error is not None:
-            result["result"] = "{}error".format(xfail_case)
-            summary = error.get("message", "")
-        else:
-            result["result"] = "{}success".format(xfail_case)
-            summary = ""
+    return feature, result
 
-        result["summary"] = summary[:min(len(summary), MAXIMUM_SUMMARY_SIZE)]
-        result["error"] = error is not None
 
-        return feature, result
+def _parse_test_cases(root):
+    test_case_results = defaultdict(list)
 
     for test_case in root.findall("testcase"):
         feature, result = _parse_test_case(test_case)
@@ -566,6 +589,175 @@ def _update_test_cases(current, update):
     return new_cases
 
 
+def stream_junit_xml_file(document_name, case_handler):
+    """Validate and parse a JUnit XML file incrementally.
+
+    The file is read with iterparse and every test case is dropped from the document once it is validated
+    and parsed, so the memory usage is bounded by the size of one test case instead of the whole file.
+    Like parse_test_result, only the first testsuite of a testsuites document is parsed.
+
+    Args:
+        document_name: The name of the document.
+        case_handler: A function called with the feature and the parsed test case dict of each test case.
+
+    Returns:
+        A tuple of the test metadata dict, the test summary dict and the line of the test summary report.
+
+    Raises:
+        JUnitXMLValidationError: if the file doesn't exist, is unparseable or is missing required fields.
+    """
+    if not os.path.isfile(document_name):
+        raise JUnitXMLValidationError("file not found")
+
+    metadata = {}
+    test_result_summary = defaultdict(int)
+    last_case = None
+    testsuite = None
+    stack = []
+    try:
+        for event, element in ET.iterparse(document_name, events=("start", "end"), forbid_dtd=True):
+            if event == "start":
+                if not stack and element.tag not in (TESTSUITES_TAG, TESTSUITE_TAG):
+                    raise JUnitXMLValidationError(
+                        f"Either {TESTSUITES_TAG} or {TESTSUITE_TAG} tag are not found on root element")
+                if testsuite is None and element.tag == TESTSUITE_TAG and \
+                        (not stack or (len(stack) == 1 and stack[0].tag == TESTSUITES_TAG)):
+                    _validate_testsuite_attributes(element)
+                    testsuite = element
+                stack.append(element)
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if parent is None or parent.tag not in (TESTSUITES_TAG, TESTSUITE_TAG):
+                continue
+
+            if parent is testsuite:
+                if element.tag == PROPERTIES_TAG:
+                    _validate_metadata_properties(element)
+                    metadata = _parse_metadata_properties(element)
+                elif element.tag == TESTCASE_TAG:
+                    _validate_test_case(element)
+                    feature, last_case = _parse_test_case(element)
+                    _count_test_case(test_result_summary, last_case)
+                    case_handler(feature, last_case)
+            # The element is parsed, drop it from the document
+            parent.remove(element)
+    except JUnitXMLValidationError:
+        raise
+    except Exception as e:
+        raise JUnitXMLValidationError(f"could not parse {document_name}: {e}") from e
+
+    if testsuite is None:
+        raise JUnitXMLValidationError(f"{TESTSUITE_TAG} tag not found")
+
+    test_result_summary = {k: str(v) for k, v in test_result_summary.items()}
+    report = _test_summary_report(test_result_summary, last_case["file"]) if last_case else None
+    return metadata, test_result_summary, report
+
+
+def _stream_junit_xml_document(document_name, output_file):
+    """Stream the test cases of a JUnit XML file into a JSON lines file, one test case per line."""
+    with open(output_file, "w") as f:
+        def _write_test_case(feature, case):
+            case["feature"] = feature
+            f.write(json.dumps(case) + "\n")
+
+        return stream_junit_xml_file(document_name, _write_test_case)
+
+
+def parse_junit_xml_path(path, test_cases_file, strict=False, processes=None):
+    """Validate and parse a JUnit XML file or a directory of JUnit XML files, streaming the test cases into a file.
+
+    The files of a directory are parsed in parallel by a process pool. The test cases are written to
+    the JSON lines file as they are parsed, with the feature in the "feature" field, in the format ingested
+    by KustoConnector. There is no limit on the size of the files.
+
+    Args:
+        path: The name of the file or the directory containing XML documents.
+        test_cases_file: The name of the JSON lines file to write the test cases to.
+        strict: Fail if any file in the directory is not valid, otherwise the invalid files are skipped.
+            A single file is always validated strictly.
+        processes: The maximum number of processes parsing the files, the number of CPUs by default.
+
+    Returns:
+        A dict containing the test metadata and the test summary, like parse_test_result but without
+        the test cases, or None if there isn't any valid file.
+
+    Raises:
+        JUnitXMLValidationError: if the file, or any file in the directory with strict, is not valid.
+    """
+    if os.path.isdir(path):
+        doc_list = _find_junit_xml_documents(path)
+    elif os.path.isfile(path):
+        doc_list = [path]
+        strict = True
+    else:
+        raise JUnitXMLValidationError("file not found")
+
+    part_files = ["{}.{}".format(test_cases_file, index) for index in range(len(doc_list))]
+    try:
+        if len(doc_list) > 1 and processes != 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(_stream_junit_xml_document, document, part_file)
+                           for document, part_file in zip(doc_list, part_files)]
+                results = [_document_result(future.result) for future in futures]
+        else:
+            results = [_document_result(_stream_junit_xml_document, document, part_file)
+                       for document, part_file in zip(doc_list, part_files)]
+
+        test_result_json = defaultdict(dict)
+        metadata_source = None
+        metadata = {}
+        with open(test_cases_file, "w") as output:
+            for document, part_file, (result, error) in zip(doc_list, part_files, results):
+                if not error:
+                    doc_metadata, doc_summary, report = result
+                    root_metadata = {k: v for k, v in doc_metadata.items()
+                                     if k in REQUIRED_METADATA_PROPERTIES and k != "timestamp"}
+                    if root_metadata:
+                        # All metadata from a single test run should be identical, so we
+                        # just use the first one we see to validate the rest.
+                        if not metadata_source:
+                            metadata_source = document
+                            metadata = root_metadata
+
+                        if root_metadata != metadata:
+                            error = JUnitXMLValidationError(f"{document} metadata differs from {metadata_source}\n"
+                                                            f"{document}: {root_metadata}\n"
+                                                            f"{metadata_source}: {metadata}")
+                if error:
+                    if strict:
+                        raise JUnitXMLValidationError(f"could not parse {document}: {error}") from error
+                    print(f"could not parse {document}: {error} - skipping")
+                    continue
+
+                test_result_json["test_metadata"] = _update_test_metadata(test_result_json["test_metadata"],
+                                                                          doc_metadata)
+                test_result_json["test_summary"] = _update_test_summary(test_result_json["test_summary"],
+                                                                        doc_summary)
+                if report:
+                    REPORT_LIST.append(report)
+                with open(part_file) as part:
+                    shutil.copyfileobj(part, output)
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+    if not test_result_json:
+        print("provided path {} does not contain any valid XML files".format(path))
+        return None
+    return dict(test_result_json)
+
+
+def _document_result(function, *args):
+    try:
+        return function(*args), None
+    except Exception as e:
+        return None, e
+
+
 def validate_junit_json_file(path):
     """Validate that a JSON file is a valid test report.
 
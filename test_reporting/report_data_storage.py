@@ -4,6 +4,7 @@ import os
 import tempfile
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from azure.kusto.data import KustoConnectionStringBuilder
 
 try:
@@ -187,7 +188,8 @@ class KustoConnector(ReportDBConnector):
                       external_tracking_id: str = "",
                       report_guid: str = "",
                       testbed: str = "",
-                      os_version: str = "") -> None:
+                      os_version: str = "",
+                      test_cases_file: str = "") -> None:
         """Upload a report to the back-end data store.
 
         Args:
@@ -196,6 +198,8 @@ class KustoConnector(ReportDBConnector):
                 to some external system of their choosing (e.g. Jenkins, Travis CI, JIRA, etc.).
                 This id does not have to be unique.
             report_guid: A randomly generated UUID that is used to query for a specific test run across tables.
+            test_cases_file: A JSON lines file of the test cases written by junit_xml_parser.parse_junit_xml_path,
+                used instead of the test cases in report_json.
         """
         if not report_json:
             print(
@@ -208,7 +212,7 @@ class KustoConnector(ReportDBConnector):
             external_tracking_id, report_guid, testbed, os_version)
         self._upload_metadata(report_json, external_tracking_id, report_guid)
         self._upload_summary(report_json, report_guid)
-        self._upload_test_cases(report_json, report_guid)
+        self._upload_test_cases(report_json, report_guid, test_cases_file)
 
     def upload_reachability_data(self, ping_output: List) -> None:
         ping_time = str(datetime.utcnow())
@@ -333,18 +337,32 @@ class KustoConnector(ReportDBConnector):
         print("Upload summary")
         self._ingest_data(self.SUMMARY_TABLE, summary)
 
-    def _upload_test_cases(self, report_json, report_guid):
-        test_cases = []
-        for feature, cases in report_json["test_cases"].items():
-            for case in cases:
-                case.update({
-                    "id": report_guid,
-                    "feature": feature
-                })
-                test_cases.append(case)
+    def _upload_test_cases(self, report_json, report_guid, test_cases_file=""):
+        if test_cases_file:
+            test_cases = self._read_test_cases_file(test_cases_file, report_guid)
+        else:
+            test_cases = []
+            for feature, cases in report_json["test_cases"].items():
+                for case in cases:
+                    case.update({
+                        "id": report_guid,
+                        "feature": feature
+                    })
+                    test_cases.append(case)
         print("Upload test case")
         self._ingest_data(self.TEST_CASE_TABLE, test_cases)
 
+    @staticmethod
+    def _read_test_cases_file(test_cases_file, report_guid):
+        # Read the test cases one by one, the file of a full run can be large
+        with open(test_cases_file) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                case = json.loads(line)
+                case["id"] = report_guid
+                yield case
+
     def _ingest_data(self, table, data):
         props = IngestionProperties(
             database=self.db_name,
@@ -357,6 +375,9 @@ class KustoConnector(ReportDBConnector):
             if isinstance(data, list):
                 temp.writelines(
                     '\n'.join([json.dumps(entry) for entry in data]))
+            elif isinstance(data, Iterator):
+                for index, entry in enumerate(data):
+                    temp.write(('\n' if index else '') + json.dumps(entry))
             else:
                 temp.write(json.dumps(data))
             temp.seek(0)
@@ -1,14 +1,14 @@
 import argparse
 import json
 import sys
+import tempfile
 import uuid
 import re
 import os
 
 from junit_xml_parser import (
     validate_junit_json_file,
-    validate_junit_xml_path,
-    parse_test_result
+    parse_junit_xml_path
 )
 from report_data_storage import KustoConnector
 
@@ -86,10 +86,14 @@ python3 report_uploader.py tests/files/sample_tr.xml -e TRACKING_ID#22
                 else:
                     if args.json:
                         test_result_json = validate_junit_json_file(path_name)
+                        kusto_db.upload_report(test_result_json, tracking_id, report_guid, testbed, version)
                     else:
-                        roots = validate_junit_xml_path(path_name)
-                        test_result_json = parse_test_result(roots)
-                    kusto_db.upload_report(test_result_json, tracking_id, report_guid, testbed, version)
+                        # Test cases are streamed through a JSON lines file instead of being kept in memory
+                        with tempfile.TemporaryDirectory() as temp_dir:
+                            test_cases_file = os.path.join(temp_dir, "test_cases.json")
+                            test_result_json = parse_junit_xml_path(path_name, test_cases_file)
+                            kusto_db.upload_report(test_result_json, tracking_id, report_guid, testbed, version,
+                                                   test_cases_file)
             except Exception as e:
                 print("Failed to upload report '{}', exception: {}".format(path_name, repr(e)))
     elif args.category == "reachability":
@@ -1,9 +1,11 @@
 """Tests for the JUnit XML parser."""
+import json
 import os
 import pytest
 
 from test_reporting.junit_xml_parser import validate_junit_xml_stream, validate_junit_xml_file
 from test_reporting.junit_xml_parser import validate_junit_xml_archive, parse_test_result, JUnitXMLValidationError
+from test_reporting.junit_xml_parser import stream_junit_xml_file, parse_junit_xml_path
 
 
 VALID_TEST_RESULT = """<?xml version="1.0" encoding="utf-8"?>
@@ -247,6 +249,90 @@ def test_xml_file_not_found():
         validate_junit_xml_file("nonexistent.xml")
 
 
+def _read_test_cases_file(path):
+    test_cases = {}
+    with open(path) as f:
+        for line in f:
+            case = json.loads(line)
+            test_cases.setdefault(case.pop("feature"), []).append(case)
+    return test_cases
+
+
+def test_stream_junit_xml_file():
+    test_cases = {}
+    metadata, summary, report = stream_junit_xml_file(
+        VALID_TEST_RESULT_FILE, lambda feature, case: test_cases.setdefault(feature, []).append(case))
+
+    expected = parse_test_result([validate_junit_xml_file(VALID_TEST_RESULT_FILE)])
+    assert metadata == expected["test_metadata"]
+    assert summary == expected["test_summary"]
+    assert ordered(test_cases) == ordered(expected["test_cases"])
+    assert report.startswith("acl/test_acl.py, 4, ")
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_parse_junit_xml_path_archive(tmp_path, processes):
+    test_cases_file = str(tmp_path / "test_cases.json")
+    test_result = parse_junit_xml_path(VALID_TEST_RESULT_ARCHIVE, test_cases_file, processes=processes)
+
+    expected = parse_test_result(validate_junit_xml_archive(VALID_TEST_RESULT_ARCHIVE))
+    assert test_result == {"test_metadata": expected["test_metadata"], "test_summary": expected["test_summary"]}
+    assert ordered(_read_test_cases_file(test_cases_file)) == ordered(expected["test_cases"])
+    assert os.listdir(str(tmp_path)) == ["test_cases.json"]
+
+
+def test_parse_junit_xml_path_no_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("test_reporting.junit_xml_parser.MAXIMUM_XML_SIZE", 1024)
+    with pytest.raises(JUnitXMLValidationError, match="provided directory is too large"):
+        validate_junit_xml_archive(VALID_TEST_RESULT_ARCHIVE, strict=True)
+
+    test_cases_file = str(tmp_path / "test_cases.json")
+    test_result = parse_junit_xml_path(VALID_TEST_RESULT_ARCHIVE, test_cases_file)
+    assert test_result["test_summary"]["tests"] == "4"
+
+
+@pytest.mark.parametrize(
+    "token,replacement,message",
+    [
+        ("</", "<", "could not parse"),
+        ("testsuite", "fail", ".* tag are not found on root element"),
+        ("errors", "bunnies", ".* not found in .* element"),
+        ("hwsku", "host", "duplicate metadata element: .*"),
+        ("classname", "hehe", ".* not found in test case .*"),
+    ],
+)
+def test_stream_junit_xml_file_invalid(tmp_path, token, replacement, message):
+    document = tmp_path / "test_invalid.xml"
+    document.write_text(VALID_TEST_RESULT.replace(token, replacement))
+    with pytest.raises(JUnitXMLValidationError, match=message):
+        stream_junit_xml_file(str(document), lambda feature, case: None)
+
+
+@pytest.mark.parametrize(
+    "exploit_string", ["billion laughs", "quadratic blowup", "external entity", "dtd retrieval"]
+)
+def test_stream_junit_xml_file_exploits(tmp_path, exploit_string):
+    document = tmp_path / "test_exploit.xml"
+    document.write_text(exploits[exploit_string])
+    with pytest.raises(JUnitXMLValidationError, match="could not parse"):
+        stream_junit_xml_file(str(document), lambda feature, case: None)
+
+
+def test_parse_junit_xml_path_invalid_file(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    (archive / "test_valid.xml").write_text(VALID_TEST_RESULT)
+    (archive / "test_invalid.xml").write_text(VALID_TEST_RESULT.replace("</", "<"))
+    test_cases_file = str(tmp_path / "test_cases.json")
+
+    with pytest.raises(JUnitXMLValidationError, match="could not parse .*test_invalid.xml"):
+        parse_junit_xml_path(str(archive), test_cases_file, strict=True)
+
+    test_result = parse_junit_xml_path(str(archive), test_cases_file)
+    assert test_result["test_summary"]["tests"] == "4"
+    assert sum(len(cases) for cases in _read_test_cases_file(test_cases_file).values()) == 4
+
+
 # credit to: https://stackoverflow.com/questions/25851183/
 def ordered(obj):
     if isinstance(obj, dict):
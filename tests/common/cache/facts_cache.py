@@ -4,12 +4,12 @@ import inspect
 import logging
 import os
 import pickle
-import random
 import shutil
+import sqlite3
 import sys
-import time
+import tempfile
 
-from collections import defaultdict
+from collections import OrderedDict
 from pickle import UnpicklingError
 from threading import Lock
 from six import with_metaclass
@@ -22,8 +22,18 @@ CACHE_LOCATION = os.path.join(CURRENT_PATH, '../../../_cache')
 
 SIZE_LIMIT = 1000000000  # 1G bytes, max disk usage allowed by cache
 ENTRY_LIMIT = 1000000    # Max number of pickle files allowed in cache.
+MEMORY_LIMIT = 500000000  # 500M bytes, max total pickled size of the facts held in memory
 DISABLE_CACHE_PARAM = "disable_cache"
 
+BACKEND_PICKLE = "pickle"   # One pickle file per facts, <cache location>/<zone>/<key>.pickle
+BACKEND_SQLITE = "sqlite"   # All facts in a single SQLite database, <cache location>/facts_cache.db
+BACKENDS = [BACKEND_PICKLE, BACKEND_SQLITE]
+
+# Environment variables for choosing the backend and the memory limit. Environment variables are used because the
+# cache is instantiated at import time, and they are inherited by the xdist and parallel run workers.
+BACKEND_ENV = "FACTS_CACHE_BACKEND"
+MEMORY_LIMIT_ENV = "FACTS_CACHE_MEMORY_LIMIT"
+
 
 class Singleton(type):
 
@@ -38,6 +48,197 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class LruCache(object):
+    """In memory cache of facts, the least recently used facts are evicted when the memory limit is exceeded.
+
+    Size of the facts is the size of their pickled data, which is known when the facts are loaded or stored.
+    """
+
+    def __init__(self, size_limit):
+        self._entries = OrderedDict()   # (zone, key) -> (value, size)
+        self._size_limit = size_limit
+        self._size = 0
+
+    def get(self, zone, key, default):
+        entry = self._entries.get((zone, key))
+        if entry is None:
+            return default
+        self._entries.move_to_end((zone, key))
+        return entry[0]
+
+    def put(self, zone, key, value, size):
+        self.remove(zone, key)
+        self._entries[(zone, key)] = (value, size)
+        self._size += size
+        # The facts just put are always kept, even if they alone exceed the limit
+        while self._size > self._size_limit and len(self._entries) > 1:
+            (evicted_zone, evicted_key), (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            logger.debug('[Cache] Evicted "{}.{}" from memory'.format(evicted_zone, evicted_key))
+
+    def remove(self, zone, key=None):
+        if key is not None:
+            entry = self._entries.pop((zone, key), None)
+            if entry:
+                self._size -= entry[1]
+            return
+        for entry_zone, entry_key in list(self._entries.keys()):
+            if entry_zone == zone:
+                self.remove(entry_zone, entry_key)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+class PickleFileStore(object):
+    """Store facts in pickle files <location>/<zone>/<key>.pickle.
+
+    A file is written to a temporary file first and then renamed to its name, so readers in other processes
+    never see a partially written file. Disk usage is counted by walking the location once, then it is maintained
+    by the following writes and removals of this process.
+    """
+
+    def __init__(self, location):
+        self.location = location
+        self._usage = None
+
+    def _facts_file(self, zone, key):
+        return os.path.join(self.location, zone, '{}.pickle'.format(key))
+
+    def describe(self, zone, key):
+        return self._facts_file(zone, key)
+
+    def usage(self):
+        """Get disk usage of the store as tuple (total size, total entries)."""
+        if self._usage is None:
+            total_size = 0
+            total_entries = 0
+            for root, _, files in os.walk(self.location):
+                for f in files:
+                    try:
+                        total_size += os.path.getsize(os.path.join(root, f))
+                    except OSError:
+                        # Renamed or removed by another process meanwhile
+                        continue
+                    total_entries += 1
+            self._usage = [total_size, total_entries]
+        return tuple(self._usage)
+
+    def _count(self, size_delta, entries_delta):
+        if self._usage is not None:
+            self._usage[0] += size_delta
+            self._usage[1] += entries_delta
+
+    def load(self, zone, key):
+        """Load pickled data of facts, return None if the facts are not stored."""
+        try:
+            with open(self._facts_file(zone, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def dump(self, zone, key, data):
+        facts_file = self._facts_file(zone, key)
+        cache_subfolder = os.path.dirname(facts_file)
+        if not os.path.exists(cache_subfolder):
+            logger.info('[Cache] Create cache dir {}'.format(cache_subfolder))
+            os.makedirs(cache_subfolder, exist_ok=True)
+
+        fd, tmp_file = tempfile.mkstemp(prefix='.{}.'.format(key), suffix='.tmp', dir=cache_subfolder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                old_size = os.path.getsize(facts_file)
+            except OSError:
+                old_size = None
+            os.replace(tmp_file, facts_file)
+        except BaseException:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+            raise
+        if old_size is None:
+            self._count(len(data), 1)
+        else:
+            self._count(len(data) - old_size, 0)
+
+    def remove(self, zone, key):
+        facts_file = self._facts_file(zone, key)
+        size = os.path.getsize(facts_file)
+        os.remove(facts_file)
+        self._count(-size, -1)
+
+    def remove_zone(self, zone):
+        cache_subfolder = os.path.join(self.location, zone)
+        shutil.rmtree(cache_subfolder)
+        # Count the whole location again when needed, the zone may have been partially removed
+        self._usage = None
+
+    def remove_all(self):
+        self._usage = None
+        shutil.rmtree(self.location)
+
+
+class SqliteStore(object):
+    """Store facts in a single SQLite database <location>/facts_cache.db.
+
+    The database is safely shared by the processes of parallel runs, SQLite serializes the writes and readers
+    always see completely written facts. Every process opens its own connection, including forked processes.
+    """
+    DB_FILE = 'facts_cache.db'
+    TIMEOUT = 60
+
+    def __init__(self, location):
+        self.location = location
+        self.db_file = os.path.join(location, self.DB_FILE)
+        self._connection = None
+        self._pid = None
+
+    def _get_connection(self):
+        if self._connection is None or self._pid != os.getpid():
+            if not os.path.exists(self.location):
+                os.makedirs(self.location, exist_ok=True)
+            connection = sqlite3.connect(self.db_file, timeout=self.TIMEOUT, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS facts '
+                               '(zone TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (zone, key))')
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def describe(self, zone, key):
+        return '{}[{}.{}]'.format(self.db_file, zone, key)
+
+    def usage(self):
+        """Get disk usage of the store as tuple (total size, total entries)."""
+        total_entries, total_size = self._get_connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM facts').fetchone()
+        return total_size, total_entries
+
+    def load(self, zone, key):
+        """Load pickled data of facts, return None if the facts are not stored."""
+        row = self._get_connection().execute(
+            'SELECT value FROM facts WHERE zone = ? AND key = ?', (zone, key)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def dump(self, zone, key, data):
+        self._get_connection().execute(
+            'INSERT OR REPLACE INTO facts (zone, key, value) VALUES (?, ?, ?)', (zone, key, sqlite3.Binary(data)))
+
+    def remove(self, zone, key):
+        self._get_connection().execute('DELETE FROM facts WHERE zone = ? AND key = ?', (zone, key))
+
+    def remove_zone(self, zone):
+        self._get_connection().execute('DELETE FROM facts WHERE zone = ?', (zone,))
+
+    def remove_all(self):
+        self._get_connection().execute('DELETE FROM facts')
+
+
 class FactsCache(with_metaclass(Singleton, object)):
     """Singleton class for reading from cache and write to cache.
 
@@ -49,33 +250,38 @@ class FactsCache(with_metaclass(Singleton, object)):
 
     NOTEXIST = object()
 
-    def __init__(self, cache_location=CACHE_LOCATION):
+    def __init__(self, cache_location=CACHE_LOCATION, backend=None, memory_limit=None):
+        """
+        Args:
+            cache_location (str): Folder for storing the cached facts.
+            backend (str): Storage of the cached facts, one of BACKENDS. Default to the value of environment
+                variable FACTS_CACHE_BACKEND, or BACKEND_PICKLE if it is not set.
+            memory_limit (int): Max total pickled size of the facts held in memory. Default to the value of
+                environment variable FACTS_CACHE_MEMORY_LIMIT, or MEMORY_LIMIT if it is not set.
+        """
         self._cache_location = os.path.abspath(cache_location)
-        self._cache = defaultdict(dict)
-        self._write_lock = Lock()
+        backend = backend or os.environ.get(BACKEND_ENV, BACKEND_PICKLE)
+        if backend == BACKEND_SQLITE:
+            self._store = SqliteStore(self._cache_location)
+        elif backend == BACKEND_PICKLE:
+            self._store = PickleFileStore(self._cache_location)
+        else:
+            raise ValueError("Unknown facts cache backend '{}', supported: {}".format(backend, BACKENDS))
+        if memory_limit is None:
+            memory_limit = int(os.environ.get(MEMORY_LIMIT_ENV, MEMORY_LIMIT))
+        self._cache = LruCache(memory_limit)
+        self._lock = Lock()
 
     def _check_usage(self):
         """Check cache usage, raise exception if usage exceeds the limitations.
         """
-        total_size = 0
-        total_entries = 0
-        for root, _, files in os.walk(self._cache_location):
-            for f in files:
-                fp = os.path.join(root, f)
-                total_size += os.path.getsize(fp)
-                total_entries += 1
+        total_size, total_entries = self._store.usage()
 
         if total_size > SIZE_LIMIT or total_entries > ENTRY_LIMIT:
             msg = 'Cache usage exceeds limitations. total_size={}, SIZE_LIMIT={}, total_entries={}, ENTRY_LIMIT={}' \
                 .format(total_size, SIZE_LIMIT, total_entries, ENTRY_LIMIT)
             raise Exception(msg)
 
-    def _read_facts_file(self, facts_file, z, k):
-        with open(facts_file, 'rb') as f:
-            self._cache[z][k] = pickle.load(f)
-            logger.debug('[Cache] Loaded cached facts "{}.{}" from {}'.format(z, k, facts_file))
-            return self._cache[z][k]
-
     def read(self, zone, key):
         """Read cached facts.
 
@@ -87,43 +293,39 @@ class FactsCache(with_metaclass(Singleton, object)):
         Returns:
             obj: Cached object, usually a dictionary.
         """
-        # Lazy load
-        if zone in self._cache and key in self._cache[zone]:
-            logger.debug('[Cache] Read cached facts "{}.{}"'.format(zone, key))
-            return self._cache[zone][key]
-        else:
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+        with self._lock:
+            value = self._cache.get(zone, key, self.NOTEXIST)
+            if value is not self.NOTEXIST:
+                logger.debug('[Cache] Read cached facts "{}.{}"'.format(zone, key))
+                return value
+
+            # Lazy load
+            facts_file = self._store.describe(zone, key)
             try:
-                return self._read_facts_file(facts_file, zone, key)
-            except (IOError, ValueError) as e:
+                data = self._store.load(zone, key)
+                if data is None:
+                    logger.info('[Cache] No cached facts "{}.{}" in {}'.format(zone, key, facts_file))
+                    return self.NOTEXIST
+                value = pickle.loads(data)
+            except (IOError, ValueError, sqlite3.Error) as e:
                 logger.info('[Cache] Load cache file "{}" failed with IOError or ValueError: {}'
-                            .format(os.path.abspath(facts_file), repr(e)))
+                            .format(facts_file, repr(e)))
                 return self.NOTEXIST
             except (EOFError, UnpicklingError) as e:
-                # When parallel run is enabled, multiple processes may try to read/write the same cache file,
-                # so there will be a chance that
-                #   - a file is being written by process1 while process2 is reading it, causing EOFError in process2
-                #   - a file is being read by multiple processes at the same time, causing UnpicklingError in some of
-                #     the processes
-                # In these cases, we will retry to read the file after a short random sleep. If we still get the same
-                # error after retrying, we will return NOTEXIST to overwrite the file.
-                retry_attempts = 3
-                for attempt in range(retry_attempts):
-                    time.sleep(random.randint(3, 6))
-                    try:
-                        return self._read_facts_file(facts_file, zone, key)
-                    except (EOFError, UnpicklingError):
-                        logger.warning('[Cache] Retry {}/{} failed for file "{}"'
-                                       .format(attempt + 1, retry_attempts, facts_file))
-
+                # Facts are stored atomically, so the data is not being written by another process. It is corrupted,
+                # return NOTEXIST to overwrite it.
                 logger.error('[Cache] Load cache file "{}" failed with EOFError or UnpicklingError: {}'
                              .format(facts_file, repr(e)))
                 return self.NOTEXIST
             except Exception as e:
                 logger.info('[Cache] Load cache file "{}" failed with unknown exception: {}'
-                            .format(os.path.abspath(facts_file), repr(e)))
+                            .format(facts_file, repr(e)))
                 return self.NOTEXIST
 
+            self._cache.put(zone, key, value, len(data))
+            logger.debug('[Cache] Loaded cached facts "{}.{}" from {}'.format(zone, key, facts_file))
+            return value
+
     def write(self, zone, key, value):
         """Store facts to cache.
 
@@ -136,21 +338,16 @@ class FactsCache(with_metaclass(Singleton, object)):
         Returns:
             boolean: Caching facts is successful or not.
         """
-        with self._write_lock:
+        with self._lock:
             self._check_usage()
-            facts_file = os.path.join(self._cache_location, '{}/{}.pickle'.format(zone, key))
+            facts_file = self._store.describe(zone, key)
             try:
-                cache_subfolder = os.path.join(self._cache_location, zone)
-                if not os.path.exists(cache_subfolder):
-                    logger.info('[Cache] Create cache dir {}'.format(cache_subfolder))
-                    os.makedirs(cache_subfolder)
-
-                with open(facts_file, 'wb') as f:
-                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-                    self._cache[zone][key] = value
-                    logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
-                    return True
-            except (IOError, ValueError) as e:
+                data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                self._store.dump(zone, key, data)
+                self._cache.put(zone, key, value, len(data))
+                logger.info('[Cache] Cached facts "{}.{}" to {}'.format(zone, key, facts_file))
+                return True
+            except (IOError, ValueError, sqlite3.Error) as e:
                 logger.error('[Cache] Dump cache file "{}" failed with exception: {}'.format(facts_file, repr(e)))
                 return False
 
@@ -163,36 +360,34 @@ class FactsCache(with_metaclass(Singleton, object)):
                 will be cleaned up.
             key (str): Name of cached facts. Default is None.
         """
-        if zone:
-            if key:
-                if zone in self._cache and key in self._cache[zone]:
-                    del self._cache[zone][key]
+        with self._lock:
+            if zone:
+                if key:
+                    self._cache.remove(zone, key)
                     logger.debug('[Cache] Removed "{}.{}" from cache.'.format(zone, key))
-                try:
-                    cache_file = os.path.join(self._cache_location, zone, '{}.pickle'.format(key))
-                    os.remove(cache_file)
-                    logger.debug('[Cache] Removed cache file "{}.pickle"'.format(cache_file))
-                except OSError as e:
-                    logger.error('[Cache] Cleanup cache {}.{}.pickle failed with exception: {}'
-                                 .format(zone, key, repr(e)))
-            else:
-                if zone in self._cache:
-                    del self._cache[zone]
+                    try:
+                        self._store.remove(zone, key)
+                        logger.debug('[Cache] Removed cache file "{}"'.format(self._store.describe(zone, key)))
+                    except (OSError, sqlite3.Error) as e:
+                        logger.error('[Cache] Cleanup cache {}.{}.pickle failed with exception: {}'
+                                     .format(zone, key, repr(e)))
+                else:
+                    self._cache.remove(zone)
                     logger.debug('[Cache] Removed zone "{}" from cache'.format(zone))
+                    try:
+                        self._store.remove_zone(zone)
+                        logger.debug('[Cache] Removed cache zone "{}"'.format(zone))
+                    except (OSError, sqlite3.Error) as e:
+                        logger.error('[Cache] Remove cache subfolder "{}" failed with exception: {}'
+                                     .format(zone, repr(e)))
+            else:
+                self._cache.clear()
                 try:
-                    cache_subfolder = os.path.join(self._cache_location, zone)
-                    shutil.rmtree(cache_subfolder)
-                    logger.debug('[Cache] Removed cache subfolder "{}"'.format(cache_subfolder))
-                except OSError as e:
-                    logger.error('[Cache] Remove cache subfolder "{}" failed with exception: {}'.format(zone, repr(e)))
-        else:
-            self._cache = defaultdict(dict)
-            try:
-                shutil.rmtree(self._cache_location)
-                logger.debug('[Cache] Removed all cache files under "{}"'.format(self._cache_location))
-            except OSError as e:
-                logger.error('[Cache] Remove cache folder "{}" failed with exception: {}'
-                             .format(self._cache_location, repr(e)))
+                    self._store.remove_all()
+                    logger.debug('[Cache] Removed all cache files under "{}"'.format(self._cache_location))
+                except (OSError, sqlite3.Error) as e:
+                    logger.error('[Cache] Remove cache folder "{}" failed with exception: {}'
+                                 .format(self._cache_location, repr(e)))
 
 
 def _get_default_zone(function, func_args, func_kargs):
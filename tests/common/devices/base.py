@@ -38,6 +38,9 @@ class AnsibleHostBase(object):
                 return obj.decode('utf-8')
             return super().default(obj)
 
+    # Code objects of the methods wrapping _run, they are skipped when logging the caller of the module
+    _run_wrappers = ()
+
     def __init__(self, ansible_adhoc, hostname, *args, **kwargs):
         if hostname == 'localhost':
             self.host = ansible_adhoc(connection='local', host_pattern=hostname)[hostname]
@@ -63,6 +66,8 @@ class AnsibleHostBase(object):
     def _run(self, *module_args, **complex_args):
 
         previous_frame = inspect.currentframe().f_back
+        while previous_frame.f_code in self._run_wrappers:
+            previous_frame = previous_frame.f_back
         filename, line_number, function_name, lines, index = inspect.getframeinfo(previous_frame)
 
         verbose = complex_args.pop('verbose', True)
@@ -2,6 +2,7 @@ import logging
 import sys
 
 from tests.common.devices.multi_asic import MultiAsicSonicHost
+from tests.common.helpers.multi_thread_utils import run_concurrently
 from tests.common.helpers.parallel_utils import is_initial_checks_active
 
 logger = logging.getLogger(__name__)
@@ -19,9 +20,23 @@ class DutHosts(object):
     """
     class _Nodes(list):
         """ Internal class representing a list of MultiAsicSonicHosts """
+        # Default maximum number of nodes the call is delegated to concurrently, 1 means one after another
+        concurrency = 1
+
         def _run_on_nodes(self, *module_args, **complex_args):
-            """ Delegate the call to each of the nodes, return the results in a dict."""
-            return {node.hostname: getattr(node, self.attr)(*module_args, **complex_args) for node in self}
+            """ Delegate the call to each of the nodes, return the results in a dict.
+
+            The call is delegated to up to 'concurrency' nodes at the same time. It can be overridden for
+            a single call by the 'concurrency' keyword argument, which is not passed to the nodes.
+            """
+            attr = self.attr
+            concurrency = complex_args.pop("concurrency", self.concurrency)
+            if concurrency <= 1 or len(self) <= 1:
+                return {node.hostname: getattr(node, attr)(*module_args, **complex_args) for node in self}
+
+            results = run_concurrently(lambda node: getattr(node, attr)(*module_args, **complex_args), self,
+                                       concurrency, describe=lambda node: node.hostname)
+            return {node.hostname: result for node, result in zip(self, results)}
 
         def __getattr__(self, attr):
             """ To support calling ansible modules on a list of MultiAsicSonicHost
@@ -226,3 +241,13 @@ class DutHosts(object):
 
     def reset(self):
         self.__initialize_nodes()
+
+    @staticmethod
+    def set_concurrency(dut_concurrency=None, asic_concurrency=None):
+        """ Set default maximum number of concurrent calls when calling ansible modules on all the DUTs
+        and on all the ASICs (asic_index="all") of a DUT. 1 means calling them one after another.
+        """
+        if dut_concurrency is not None:
+            DutHosts._Nodes.concurrency = dut_concurrency
+        if asic_concurrency is not None:
+            MultiAsicSonicHost.asic_concurrency = asic_concurrency
@@ -8,6 +8,7 @@ from tests.common.devices.sonic import SonicHost
 from tests.common.devices.sonic_asic import SonicAsic
 from tests.common.helpers.assertions import pytest_assert
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE, ASICS_PRESENT
+from tests.common.helpers.multi_thread_utils import run_concurrently
 from tests.common.platform.interface_utils import get_dut_interfaces_status
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,8 @@ class MultiAsicSonicHost(object):
     """
 
     _DEFAULT_SERVICES = ["pmon", "snmp", "database"]
+    # Default maximum number of asics an ansible module runs on concurrently with asic_index="all"
+    asic_concurrency = 1
 
     def __init__(self, ansible_adhoc, hostname, duthosts, topo_type):
         """ Initializing a MultiAsicSonicHost.
@@ -123,6 +126,7 @@ class MultiAsicSonicHost(object):
         Args:
             module_args: other ansible module args passed from the caller
             complex_args: other ansible keyword args
+                'concurrency' keyword overrides asic_concurrency for this call and isn't passed to the module
 
         Raises:
             ValueError:  if asic_index is specified and it is neither an int or string 'all'.
@@ -141,10 +145,12 @@ class MultiAsicSonicHost(object):
         """
         if "asic_index" not in complex_args:
             # Default ASIC/namespace
+            complex_args.pop("concurrency", None)
             return getattr(self.sonichost, self.multi_asic_attr)(*module_args, **complex_args)
         else:
             asic_complex_args = copy.deepcopy(complex_args)
             asic_index = asic_complex_args.pop("asic_index")
+            concurrency = asic_complex_args.pop("concurrency", self.asic_concurrency)
             if type(asic_index) == int:
                 # Specific ASIC/namespace
                 if self.sonichost.facts['num_asic'] == 1:
@@ -154,7 +160,12 @@ class MultiAsicSonicHost(object):
                 return getattr(self.asic_instance(asic_index), self.multi_asic_attr)(*module_args, **asic_complex_args)
             elif type(asic_index) == str and asic_index.lower() == "all":
                 # All ASICs/namespace
-                return [getattr(asic, self.multi_asic_attr)(*module_args, **asic_complex_args) for asic in self.asics]
+                attr = self.multi_asic_attr
+                if concurrency <= 1 or len(self.asics) <= 1:
+                    return [getattr(asic, attr)(*module_args, **asic_complex_args) for asic in self.asics]
+                return run_concurrently(lambda asic: getattr(asic, attr)(*module_args, **asic_complex_args),
+                                        self.asics, concurrency,
+                                        describe=lambda asic: "{} asic{}".format(self.hostname, asic.asic_index))
             else:
                 raise ValueError("Argument 'asic_index' must be an int or string 'all'.")
 
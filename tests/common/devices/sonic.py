@@ -1,9 +1,12 @@
 
+import copy
+import functools
 import ipaddress
 import json
 import logging
 import os
 import re
+import shlex
 import socket
 import time
 import sys
@@ -12,13 +15,17 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 
 from ansible import constants as ansible_constants
+from ansible.parsing.dataloader import DataLoader
 from ansible.plugins.loader import connection_loader
+from ansible.template import Templar
 
 from tests.common.devices.base import AnsibleHostBase
 from tests.common.devices.constants import ACL_COUNTERS_UPDATE_INTERVAL_IN_SEC
+from tests.common.devices.ssh_command_channel import SshCommandChannel
 from tests.common.helpers.dut_utils import is_supervisor_node, is_macsec_capable_node
 from tests.common.str_utils import str2bool
 from tests.common.utilities import get_host_visible_vars
+from tests.common.utilities import DbEvent
 from tests.common.cache import cached
 from tests.common.helpers.constants import DEFAULT_ASIC_ID, DEFAULT_NAMESPACE
 from tests.common.helpers.platform_api.chassis import is_inband_port
@@ -33,6 +40,55 @@ PROCESS_TO_CONTAINER_MAP = {
     "syncd": "syncd"
 }
 UNKNOWN_ASIC = "unknown"
+# Echoed by the persistent SSH session before it is used, so that a broken session falls back to ansible
+FAST_SHELL_PROBE = "sonic-mgmt-fast-shell"
+
+# Show commands which can print JSON, and the option asking them for JSON output
+SHOW_JSON_OPTIONS = [
+    (re.compile(r"^(sudo\s+)?show\s+ip(v6)?\s+route\b"), "json"),
+    (re.compile(r"^(sudo\s+)?show\s+(muxcable|mux)\s+(status|metric|config|tunnel-route)\b"), "--json"),
+    (re.compile(r"^(sudo\s+)?(portstat|intfstat)\b"), "-j"),
+]
+
+# Run on the DUT by SonicHost.subscribe_db_events. Prints one JSON object per line: first the subscription status,
+# then the keyspace events with the DUT time of the event.
+DB_EVENTS_SCRIPT = """
+import json, sys, time
+import redis
+from swsscommon.swsscommon import SonicDBConfig
+args = json.loads(sys.argv[1])
+if args["namespace"]:
+    if not SonicDBConfig.isGlobalInit():
+        SonicDBConfig.initializeGlobalConfig()
+    db_id = SonicDBConfig.getDbId(args["db"], args["namespace"])
+    db_sock = SonicDBConfig.getDbSock(args["db"], args["namespace"])
+else:
+    if not SonicDBConfig.isInit():
+        SonicDBConfig.initialize()
+    db_id = SonicDBConfig.getDbId(args["db"])
+    db_sock = SonicDBConfig.getDbSock(args["db"])
+conn = redis.Redis(unix_socket_path=db_sock, db=db_id, decode_responses=True)
+flags = conn.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+if "K" not in flags or not set("Ag$hsz").intersection(flags):
+    print(json.dumps({"error": "keyspace events are not enabled: '%s'" % flags}))
+    sys.exit(2)
+prefix = "__keyspace@%d__:" % db_id
+pubsub = conn.pubsub()
+pubsub.psubscribe(*[prefix + pattern for pattern in args["patterns"]])
+confirmed, deadline = 0, time.time() + 10
+while confirmed < len(args["patterns"]) and time.time() < deadline:
+    msg = pubsub.get_message(timeout=1)
+    if msg and msg["type"] == "psubscribe":
+        confirmed += 1
+print(json.dumps({"subscribed": time.time()}))
+sys.stdout.flush()
+deadline = time.time() + args["timeout"]
+while time.time() < deadline:
+    msg = pubsub.get_message(timeout=min(1.0, max(deadline - time.time(), 0.01)))
+    if msg and msg["type"] == "pmessage":
+        print(json.dumps({"time": time.time(), "key": msg["channel"][len(prefix):], "event": msg["data"]}))
+        sys.stdout.flush()
+"""
 
 
 class SonicHost(AnsibleHostBase):
@@ -44,6 +100,14 @@ class SonicHost(AnsibleHostBase):
     """
     DEFAULT_ASIC_SERVICES = ["bgp", "database", "lldp", "swss", "syncd", "teamd"]
 
+    # Run plain 'shell' and 'command' calls over a persistent SSH session instead of ansible
+    fast_shell_enabled = False
+    # Keyword arguments of 'shell'/'command' supported by the fast path, any other argument needs ansible
+    FAST_SHELL_ARGS = {"module_ignore_errors", "verbose"}
+    _command_channel = None
+    _command_channel_failed = False
+    _config_facts_cache = None
+
     """
     setting either one of shell_user/shell_pw or ssh_user/ssh_passwd pair should yield the same result.
     """
@@ -87,7 +151,8 @@ class SonicHost(AnsibleHostBase):
         self._facts = self._gather_facts()
         self._os_version = self._get_os_version()
 
-        device_metadata = self.get_running_config_facts().get('DEVICE_METADATA', {}).get('localhost', {})
+        device_metadata = self.get_config_tables(tables=['DEVICE_METADATA']).get('DEVICE_METADATA', {}) \
+            .get('localhost', {})
         device_type = device_metadata.get('type')
         device_subtype = device_metadata.get('subtype')
         if (device_type == 'UpperSpineRouter') or (device_subtype in ['UpstreamLC', 'DownstreamLC']):
@@ -197,6 +262,77 @@ class SonicHost(AnsibleHostBase):
 
         self.critical_services = service_list
 
+    def __getattr__(self, module_name):
+        # Only wrap 'shell' and 'command' when fast shell is enabled, so that the ansible path keeps
+        # logging the real caller of the module
+        if module_name in ("shell", "command") and self.fast_shell_enabled:
+            return functools.partial(self._run_command, module_name)
+        return super(SonicHost, self).__getattr__(module_name)
+
+    def _get_command_channel(self):
+        """
+        Get the persistent SSH session to this device, create it on first use.
+
+        Returns:
+            SshCommandChannel or None if the session cannot be established.
+        """
+        if self._command_channel is None and not self._command_channel_failed:
+            try:
+                im = self.host.options['inventory_manager']
+                vm = self.host.options['variable_manager']
+                hostvars = vm.get_vars(host=im.get_host(self.hostname))
+                templar = Templar(loader=DataLoader(), variables=hostvars)
+
+                def host_var(*names):
+                    for name in names:
+                        if hostvars.get(name):
+                            return templar.template(hostvars[name])
+                    return None
+
+                passwords = [host_var("ansible_ssh_pass", "ansible_password"), host_var("ansible_altpassword")]
+                passwords.extend(host_var("ansible_altpasswords") or [])
+                channel = SshCommandChannel(self.hostname, self.mgmt_ip,
+                                            host_var("ansible_ssh_user", "ansible_user"), passwords,
+                                            port=int(host_var("ansible_ssh_port", "ansible_port") or 22))
+                res = channel.run("echo {}".format(FAST_SHELL_PROBE))
+                if res["rc"] != 0 or res["stdout"].strip() != FAST_SHELL_PROBE:
+                    channel.close()
+                    raise RuntimeError("probe command failed, rc={}, stdout={}, stderr={}".format(
+                        res["rc"], res["stdout"], res["stderr"]))
+                self._command_channel = channel
+            except Exception as e:
+                logger.warning("[{}] Fast shell is not available, using ansible: {}".format(self.hostname, repr(e)))
+                self._command_channel_failed = True
+        return self._command_channel
+
+    def _run_command(self, module_name, *module_args, **complex_args):
+        """
+        Run a plain command over the persistent SSH session and return the result in the same shape as the
+        ansible module does. Fall back to the ansible module if fast shell is disabled, the session is not
+        available or the call uses module arguments other than the command line.
+        """
+        plain_command = len(module_args) == 1 and isinstance(module_args[0], str) and \
+            not set(complex_args) - self.FAST_SHELL_ARGS
+        channel = self._get_command_channel() if self.fast_shell_enabled and plain_command else None
+        if channel is None:
+            return AnsibleHostBase.__getattr__(self, module_name)(*module_args, **complex_args)
+
+        cmd = module_args[0]
+        verbose = complex_args.get("verbose", True)
+        logger.debug("[{}] FastShell::{}, cmd={}".format(self.hostname, module_name, cmd if verbose else "..."))
+        res = channel.run(cmd, use_shell=(module_name == "shell"))
+        if verbose:
+            logger.debug("[{}] FastShell::{} Result => {}".format(self.hostname, module_name, json.dumps(res)))
+        else:
+            logger.debug("[{}] FastShell::{} done, is_failed={}, rc={}".format(
+                self.hostname, module_name, res.is_failed, res["rc"]))
+
+        if res.is_failed and not complex_args.get("module_ignore_errors", False):
+            raise RunAnsibleModuleFail("run module {} failed".format(module_name), res)
+        return res
+
+    _run_wrappers = (_run_command.__code__,)
+
     @cached(name='basic_facts')
     def _gather_facts(self):
         """
@@ -581,16 +717,25 @@ class SonicHost(AnsibleHostBase):
         @return: A dictionary in which key is the service name and values are service status
                  and service type.
         """
-        monit_services_status = {}
         services_status_result = self.shell("sudo monit status", module_ignore_errors=True, verbose=True)
 
         exit_code = services_status_result["rc"]
         if exit_code != 0:
-            return monit_services_status
+            return {}
+
+        return self.parse_monit_services_status(services_status_result["stdout_lines"])
 
-        for index, service_info in enumerate(services_status_result["stdout_lines"]):
+    @staticmethod
+    def parse_monit_services_status(stdout_lines):
+        """
+        @summary: Parse output of command "sudo monit status".
+        @return: A dictionary in which key is the service name and values are service status
+                 and service type.
+        """
+        monit_services_status = {}
+        for index, service_info in enumerate(stdout_lines):
             if service_info.strip().startswith("status"):
-                service_type_name = services_status_result["stdout_lines"][index - 1]
+                service_type_name = stdout_lines[index - 1]
                 service_type = service_type_name.split("'")[0].strip()
                 service_name = service_type_name.split("'")[1].strip()
                 service_status = service_info.split("status", 1)[1].strip()
@@ -658,16 +803,28 @@ class SonicHost(AnsibleHostBase):
 
         return critical_group_list, critical_process_list, succeeded
 
-    def critical_group_process(self):
-        # Get critical group and process definitions by running cmds in batch to save overhead
+    def critical_group_process_cmds(self):
+        """
+        @summary: Get commands for reading critical group and process definitions of all critical services.
+        """
         cmds = []
         for service in self.critical_services:
             cmd = 'docker exec {} bash -c "[ -f /etc/supervisor/critical_processes ]' \
                   ' && cat /etc/supervisor/critical_processes"'.format(service)
 
             cmds.append(cmd)
+        return cmds
+
+    def critical_group_process(self):
+        # Get critical group and process definitions by running cmds in batch to save overhead
+        cmds = self.critical_group_process_cmds()
         results = self.shell_cmds(cmds=cmds, continue_on_fail=True, module_ignore_errors=True, timeout=30)['results']
+        return self.parse_critical_group_process(results)
 
+    def parse_critical_group_process(self, results):
+        """
+        @summary: Parse results of the commands returned by critical_group_process_cmds.
+        """
         # Extract service name of each command result, transform results list to a dict keyed by service name
         service_results = {}
         for res in results:
@@ -742,6 +899,12 @@ class SonicHost(AnsibleHostBase):
             critical_process_list=critical_process_list
         )
 
+    def critical_process_status_cmds(self):
+        """
+        @summary: Get commands for reading process status of all critical services.
+        """
+        return ['docker exec {} supervisorctl status'.format(service) for service in self.critical_services]
+
     def all_critical_process_status(self):
         """
         @summary: Check whether all critical processes status for all critical services
@@ -750,12 +913,16 @@ class SonicHost(AnsibleHostBase):
         group_process_results = self.critical_group_process()
 
         # Get process status of all services. Run cmds in batch to save overhead
-        cmds = []
-        for service in self.critical_services:
-            cmd = 'docker exec {} supervisorctl status'.format(service)
-            cmds.append(cmd)
+        cmds = self.critical_process_status_cmds()
         results = self.shell_cmds(cmds=cmds, continue_on_fail=True, module_ignore_errors=True, timeout=60)['results']
+        return self.parse_all_critical_process_status(group_process_results, results)
 
+    def parse_all_critical_process_status(self, group_process_results, results):
+        """
+        @summary: Parse results of the commands returned by critical_process_status_cmds.
+        @param group_process_results: Critical group and process definitions returned by critical_group_process.
+        @param results: Results of the commands returned by critical_process_status_cmds.
+        """
         # Extract service name of each command result, transform results list to a dict keyed by service name
         service_results = {}
         for res in results:
@@ -1656,22 +1823,21 @@ Totals               6450                 6449
             Returns a list. Each item is a tuple with two elements. The first element is start position of a column.
             The second element is the end position of the column.
         """
-        prev = ' ',
-        positions = []
-        for pos, char in enumerate(sep_line + ' '):
-            if char == sep_char:
-                if char != prev:
-                    left = pos
-            else:
-                if char != prev:
-                    right = pos
-                    positions.append((left, right))
-            prev = char
-        return positions
+        return [match.span() for match in re.finditer(re.escape(sep_char) + '+', sep_line)]
 
-    def _parse_show(self, output_lines, header_len=1):
+    def _parse_show(self, output_lines, header_len=1, as_columns=False):
+        """Parse output of a show command in the format of 'show interface status'.
 
-        result = []
+        Args:
+            output_lines: Lines of the show command output.
+            header_len: Number of header lines above the separation line.
+            as_columns: Return dict of column header to list of column values, instead of list of row dicts.
+
+        Returns:
+            List of dicts, one for each content line, keyed by lowercase column headers. Or dict of lists if
+            as_columns is True.
+        """
+        result = {} if as_columns else []
 
         sep_line_pattern = re.compile(r"^( *-+ *)+$")
         sep_line_found = False
@@ -1698,21 +1864,27 @@ Totals               6450                 6449
             header = " ".join([header_line[left:right].strip().lower() for header_line in header_lines]).strip()
             headers.append(header)
 
+        # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
+        # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
+        if "" in content_lines:
+            content_lines = content_lines[:content_lines.index("")]
+
+        # Column boundaries are computed once, every row is split with the same slices
+        columns = [(header, slice(left, right)) for header, (left, right) in zip(headers, positions)]
+        if as_columns:
+            for header, column in columns:
+                result[header] = list(map(str.strip, [content_line[column] for content_line in content_lines]))
+            return result
+
         for content_line in content_lines:
-            # When an empty line is encountered while parsing the tabulate content, it is highly possible that the
-            # tabulate content has been drained. The empty line and rest of the lines should not be parsed.
-            if len(content_line) == 0:
-                break
             item = {}
-            for idx, (left, right) in enumerate(positions):
-                k = headers[idx]
-                v = content_line[left:right].strip()
-                item[k] = v
+            for header, column in columns:
+                item[header] = content_line[column].strip()
             result.append(item)
 
         return result
 
-    def show_and_parse(self, show_cmd, header_len=1, **kwargs):
+    def show_and_parse(self, show_cmd, header_len=1, as_columns=False, **kwargs):
         """Run a show command and parse the output using a generic pattern.
 
         This method can adapt to the column changes as long as the output format follows the pattern of
@@ -1776,11 +1948,15 @@ Totals               6450                 6449
 
         Args:
             show_cmd: The show command that will be executed.
+            header_len: Number of header lines above the separation line.
+            as_columns: Return the columns instead of the rows, see below.
 
         Returns:
             Return the parsed output of the show command in a list of dictionary. Each list item is a dictionary,
             corresponding to one content line under the header in the output. Keys of the dictionary are the column
             headers in lowercase.
+            If as_columns is True, return a dictionary. Keys are the column headers in lowercase, values are lists of
+            the column content of every content line.
         """
         start_line_index = kwargs.pop("start_line_index", 0)
         end_line_index = kwargs.pop("end_line_index", None)
@@ -1789,7 +1965,33 @@ Totals               6450                 6449
             output = output[start_line_index:]
         else:
             output = output[start_line_index:end_line_index]
-        return self._parse_show(output, header_len)
+        return self._parse_show(output, header_len, as_columns)
+
+    def show_and_parse_json(self, show_cmd, **kwargs):
+        """Run a show command asking for JSON output and return the loaded JSON.
+
+        The option for JSON output is added to the command according to SHOW_JSON_OPTIONS, unless the command already
+        has it. Structure of the result is the JSON structure printed by the command, not the structure returned by
+        show_and_parse.
+
+        Args:
+            show_cmd: The show command that will be executed.
+
+        Returns:
+            The loaded JSON output of the command.
+
+        Raises:
+            ValueError: The command does not support JSON output.
+        """
+        for pattern, json_option in SHOW_JSON_OPTIONS:
+            if pattern.match(show_cmd):
+                break
+        else:
+            raise ValueError("Command '{}' does not support JSON output".format(show_cmd))
+
+        if json_option not in show_cmd.split():
+            show_cmd = "{} {}".format(show_cmd, json_option)
+        return json.loads(self.shell(show_cmd, **kwargs)["stdout"])
 
     @cached(name='mg_facts')
     def get_extended_minigraph_facts(self, tbinfo, namespace=DEFAULT_NAMESPACE):
@@ -1836,6 +2038,77 @@ Totals               6450                 6449
         cmd = "/usr/bin/redis-cli {}".format(redis_cmd)
         return self.command(cmd, verbose=False)
 
+    def subscribe_db_events(self, db, key_patterns, timeout, namespace=DEFAULT_NAMESPACE):
+        """
+        @summary: Subscribe to the keyspace events of the keys in a DB.
+
+        The events are streamed over the persistent SSH session, the subscription ends after timeout seconds or
+        when the returned generator is closed.
+
+        @param db: DB name, e.g. 'STATE_DB'.
+        @param key_patterns: List of glob-style key patterns, e.g. ['PORT_TABLE|Ethernet*'].
+        @param timeout: Maximum time in seconds of the subscription.
+        @param namespace: Namespace of the DB on multi ASIC DUT.
+        @return: Generator of lists of DbEvent received together, an empty list is yielded when no event was
+                 received in one second. None if the subscription is not possible, e.g. SSH session is not available
+                 or keyspace events are not enabled in the DB.
+        """
+        channel = self._get_command_channel()
+        if channel is None:
+            return None
+        args = {"db": db, "patterns": list(key_patterns), "timeout": timeout, "namespace": namespace or ""}
+        cmd = "python3 -c {} {}".format(shlex.quote(DB_EVENTS_SCRIPT), shlex.quote(json.dumps(args)))
+
+        def parse(line):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                logger.debug("[{}] Unexpected output of {} events: {}".format(self.hostname, db, line))
+                return {}
+            return message
+
+        # Wait for the subscription status, the lines after it are events
+        stream = channel.stream(cmd)
+        status, first_lines = None, []
+        try:
+            for lines in stream:
+                for index, line in enumerate(lines):
+                    message = parse(line)
+                    if "subscribed" in message or "error" in message:
+                        status, first_lines = message, lines[index + 1:]
+                        break
+                if status is not None:
+                    break
+        except Exception as e:
+            status = {"error": repr(e)}
+        if not status or "subscribed" not in status:
+            logger.info("[{}] Cannot subscribe to {} events: {}".format(
+                self.hostname, db, (status or {}).get("error", "no subscription status")))
+            stream.close()
+            return None
+        logger.debug("[{}] Subscribed to {} events of keys {}".format(self.hostname, db, key_patterns))
+
+        def events():
+            try:
+                lines = first_lines
+                while True:
+                    batch = []
+                    for line in lines:
+                        message = parse(line)
+                        if "time" in message:
+                            batch.append(DbEvent(message["time"], message["key"], message["event"]))
+                    if batch or not lines:
+                        yield batch
+                    lines = next(stream)
+            except StopIteration:
+                return
+            finally:
+                stream.close()
+
+        return events()
+
     def _try_get_brcm_asic_name(self, output):
         search_sets = {
             "td2": {"b85", "BCM5685"},
@@ -1885,7 +2158,37 @@ Totals               6450                 6449
         return self.facts
 
     def get_running_config_facts(self):
-        return self.config_facts(host=self.hostname, source='running', verbose=False)['ansible_facts']
+        return self.get_config_tables()
+
+    def get_config_tables(self, tables=None, source="running", namespace=None):
+        """
+        @summary: Get config facts by the config_facts module. The facts are cached, the module returns the facts
+                  only if the config is changed since they were cached.
+        @param tables: List of config DB table names, None for all the tables.
+        @param source: "running" for running config or "persistent" for persistent config.
+        @param namespace: Namespace of the config DB, None for the default namespace.
+        @return: Dict of config facts, the same as 'ansible_facts' returned by the config_facts module.
+        """
+        if self._config_facts_cache is None:
+            self._config_facts_cache = {}
+        cache_key = (source, namespace, tuple(sorted(tables)) if tables is not None else None)
+        cached_hash, cached_facts = self._config_facts_cache.get(cache_key, (None, None))
+
+        module_args = {"host": self.hostname, "source": source, "verbose": False}
+        if tables is not None:
+            module_args["tables"] = list(tables)
+        if namespace is not None:
+            module_args["namespace"] = namespace
+        if cached_hash is not None:
+            module_args["config_hash"] = cached_hash
+        result = self.config_facts(**module_args)
+
+        if not result.get("not_modified"):
+            cached_facts = result["ansible_facts"]
+            if result.get("config_hash"):
+                self._config_facts_cache[cache_key] = (result["config_hash"], cached_facts)
+        # Callers may modify the facts, don't let them modify the cached facts
+        return copy.deepcopy(cached_facts)
 
     def get_vlan_intfs(self):
         '''
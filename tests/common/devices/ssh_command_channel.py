@@ -0,0 +1,195 @@
+import logging
+import select
+import shlex
+import threading
+
+from datetime import datetime
+
+import paramiko
+from paramiko.ssh_exception import AuthenticationException, SSHException
+
+logger = logging.getLogger(__name__)
+
+
+class CommandResult(dict):
+    """
+    @summary: Result of a command run over SshCommandChannel.
+
+    It has the same keys as the result of the ansible 'shell'/'command' modules and the same
+    is_failed/is_successful/is_changed properties as the ansible module result object.
+    """
+
+    @property
+    def is_failed(self):
+        return bool(self.get('failed', False))
+
+    @property
+    def is_successful(self):
+        return not self.is_failed
+
+    @property
+    def is_changed(self):
+        return bool(self.get('changed', False))
+
+
+class SshCommandChannel(object):
+    """
+    @summary: Persistent SSH session to a host for running plain shell commands.
+
+    Every command is run in its own SSH channel multiplexed over one SSH connection, so running a command
+    costs one channel round trip instead of an ansible module execution. The connection is established
+    on first use and re-established if it was lost, e.g. after reboot of the host.
+    """
+    RECV_SIZE = 65536
+
+    def __init__(self, hostname, address, username, passwords, port=22, become=True, connect_timeout=10):
+        """
+        @param hostname: Name of the host, used in logs.
+        @param address: IP address of the host.
+        @param username: SSH user name.
+        @param passwords: List of candidate passwords, tried in order.
+        @param port: SSH port.
+        @param become: Run commands as root via sudo, the same as ansible become does.
+        @param connect_timeout: Timeout in seconds for establishing the SSH connection.
+        """
+        self.hostname = hostname
+        self.address = address
+        self.username = username
+        self.passwords = [password for password in passwords if password]
+        self.port = port
+        self.become = become and username != "root"
+        self.connect_timeout = connect_timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        for password in self.passwords:
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                client.connect(self.address, port=self.port, username=self.username, password=password,
+                               allow_agent=False, look_for_keys=False, timeout=self.connect_timeout)
+            except AuthenticationException:
+                client.close()
+                continue
+            # Detect a dead connection between the commands
+            client.get_transport().set_keepalive(30)
+            logger.debug("[{}] SSH command channel connected to {}".format(self.hostname, self.address))
+            return client
+        raise AuthenticationException("Authentication to {} as {} failed".format(self.address, self.username))
+
+    def _get_client(self, reconnect=False):
+        with self._lock:
+            transport = self._client.get_transport() if self._client else None
+            if reconnect or transport is None or not transport.is_active():
+                self.close()
+                self._client = self._connect()
+            return self._client
+
+    def close(self):
+        if self._client:
+            self._client.close()
+            self._client = None
+
+    def _open_channel(self):
+        try:
+            return self._get_client().get_transport().open_session()
+        except (SSHException, EOFError, OSError):
+            # Nothing was executed yet, so it is safe to reconnect and try again
+            logger.debug("[{}] SSH command channel is broken, reconnecting".format(self.hostname))
+            return self._get_client(reconnect=True).get_transport().open_session()
+
+    def run(self, cmd, use_shell=True):
+        """
+        @summary: Run command on the host.
+
+        @param cmd: Command line.
+        @param use_shell: Run the command by /bin/sh like the ansible 'shell' module does. Otherwise the command
+                          is split into arguments and executed directly like the ansible 'command' module does.
+        @return: CommandResult with 'cmd', 'rc', 'stdout', 'stderr', 'stdout_lines', 'stderr_lines', 'start',
+                 'end', 'delta', 'changed' and 'failed' keys.
+        """
+        if use_shell:
+            remote_cmd = "/bin/sh -c {}".format(shlex.quote(cmd))
+        else:
+            remote_cmd = " ".join(shlex.quote(arg) for arg in shlex.split(cmd))
+        if self.become:
+            remote_cmd = "sudo -H -n {}".format(remote_cmd)
+
+        start = datetime.now()
+        channel = self._open_channel()
+        stdout, stderr = [], []
+        try:
+            channel.exec_command(remote_cmd)
+            # Read stdout and stderr together, so that neither of them can stall the command
+            while True:
+                select.select([channel], [], [], 1)
+                while channel.recv_ready():
+                    stdout.append(channel.recv(self.RECV_SIZE))
+                while channel.recv_stderr_ready():
+                    stderr.append(channel.recv_stderr(self.RECV_SIZE))
+                if (channel.exit_status_ready() and channel.eof_received or channel.closed) and \
+                        not channel.recv_ready() and not channel.recv_stderr_ready():
+                    break
+            rc = channel.recv_exit_status()
+        finally:
+            channel.close()
+        end = datetime.now()
+
+        # The same as ansible 'command' module, trailing new lines are removed
+        stdout = b"".join(stdout).decode("utf-8", "replace").rstrip("\r\n")
+        stderr = b"".join(stderr).decode("utf-8", "replace").rstrip("\r\n")
+        result = CommandResult(
+            cmd=cmd,
+            rc=rc,
+            stdout=stdout,
+            stderr=stderr,
+            stdout_lines=stdout.splitlines(),
+            stderr_lines=stderr.splitlines(),
+            start=str(start),
+            end=str(end),
+            delta=str(end - start),
+            changed=True,
+            failed=rc != 0
+        )
+        if rc != 0:
+            result["msg"] = "non-zero return code"
+        return result
+
+    def stream(self, cmd, idle_timeout=1):
+        """
+        @summary: Run a long running shell command on the host and stream its output.
+
+        The command is run with a pseudo terminal, so it is terminated when the generator is closed.
+
+        @param cmd: Command line, run by /bin/sh.
+        @param idle_timeout: Maximum time in seconds to wait for output before yielding an empty list.
+        @return: Generator of lists of the output lines received together. An empty list is yielded when no
+                 output was received in idle_timeout seconds. The generator ends when the command exits.
+        """
+        remote_cmd = "/bin/sh -c {}".format(shlex.quote(cmd))
+        if self.become:
+            remote_cmd = "sudo -H -n {}".format(remote_cmd)
+
+        channel = self._open_channel()
+        try:
+            channel.get_pty()
+            channel.exec_command(remote_cmd)
+            pending = b""
+            while True:
+                select.select([channel], [], [], idle_timeout)
+                data = []
+                while channel.recv_ready():
+                    data.append(channel.recv(self.RECV_SIZE))
+                if data:
+                    lines = (pending + b"".join(data)).split(b"\n")
+                    pending = lines.pop()
+                    yield [line.decode("utf-8", "replace").rstrip("\r") for line in lines]
+                elif channel.exit_status_ready() or channel.closed:
+                    break
+                else:
+                    yield []
+            if pending:
+                yield [pending.decode("utf-8", "replace").rstrip("\r")]
+        finally:
+            channel.close()
@@ -1,6 +1,10 @@
+import logging
+
 from concurrent.futures import Future, as_completed
 from concurrent.futures.thread import ThreadPoolExecutor
-from typing import Optional, List
+from typing import Any, Callable, Iterable, Optional, List
+
+logger = logging.getLogger(__name__)
 
 
 class SafeThreadPoolExecutor(ThreadPoolExecutor):
@@ -25,3 +29,31 @@ class SafeThreadPoolExecutor(ThreadPoolExecutor):
             _ = future.result()
         self.shutdown(wait=True)
         return False
+
+
+def run_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int,
+                     describe: Callable[[Any], str] = str) -> List[Any]:
+    """Call func for each of the items using a thread pool of at most max_workers threads
+
+    All the calls are completed before returning. The results are returned in the order of items.
+    If some calls raised an exception, the exception of the first failed item is re-raised
+    and the exceptions of the other failed items are logged.
+
+    Args:
+        func: function taking one item
+        items: items to call func for
+        max_workers: maximum number of concurrent calls
+        describe: function returning item description used in logs, e.g. hostname
+    """
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        # Wait for all the calls, even if some of them failed
+        errors = [(item, future.exception()) for item, future in zip(items, futures)]
+
+    failed = [(item, error) for item, error in errors if error is not None]
+    for item, error in failed[1:]:
+        logger.error("Concurrent call on {} failed: {}".format(describe(item), repr(error)))
+    if failed:
+        raise failed[0][1]
+    return [future.result() for future in futures]
@@ -1,17 +1,15 @@
 import datetime
 import logging
-import math
 import os
 import shutil
 import signal
 import tempfile
 import time
 import traceback
-from multiprocessing import Process, Manager, Pipe, TimeoutError
+from multiprocessing import Process, Pipe, TimeoutError
+from multiprocessing.connection import wait as wait_connections
 from multiprocessing.pool import ThreadPool
 
-from psutil import wait_procs
-
 from tests.common.helpers.assertions import pytest_assert as pt_assert
 
 logger = logging.getLogger(__name__)
@@ -24,199 +22,216 @@ class SonicProcess(Process):
 
     This exception (including backtrace) can be logged in test log
     to provide better info of why a particular Process failed.
+
+    The 'results' dict in the kwargs of the target function is sent back to the parent process together with the
+    exception, so the target function can return results without a shared Manager dict.
     """
     def __init__(self, *args, **kwargs):
         Process.__init__(self, *args, **kwargs)
         self._pconn, self._cconn = Pipe(duplex=False)  # unidirectional: child_conn can send, parent_conn can recv
         self._exception = None
+        self._results = None
         self._exception_read = False  # Flag to track read status
+        self.start_time = None
+        self.deadline = None
+
+    def start(self):
+        Process.start(self)
+        self.start_time = time.time()
+        # Only the child sends, close the parent copy of the child-side pipe to get EOF if the child dies
+        self._cconn.close()
 
     def run(self):
+        exception = None
         try:
             Process.run(self)
-            self._cconn.send(None)
         except Exception as e:
-            tb = traceback.format_exc()
-            self._cconn.send((e, tb))
+            exception = (e, traceback.format_exc())
             raise e
         finally:
+            results = self._kwargs.get('results')
+            try:
+                self._cconn.send((results, exception))
+            except Exception as e:
+                # Results or exception cannot be pickled
+                self._cconn.send((None, (Exception(repr(e)), traceback.format_exc())))
             self._cconn.close()  # Close the child-side pipe
 
-    # for wait_procs
-    def wait(self, timeout):
-        return self.join(timeout=timeout)
-
-    # for wait_procs
-    def is_running(self):
-        return self.is_alive()
+    @property
+    def message_pending(self):
+        return not self._exception_read
 
     @property
-    def exception(self):
-        """Read exception data once and close parent-side pipe."""
+    def connection(self):
+        return self._pconn
+
+    def read_message(self):
+        """Read results and exception data once, if they are sent, and close parent-side pipe."""
         if not self._exception_read:
             try:
                 if self._pconn.poll():
-                    self._exception = self._pconn.recv()
+                    self._results, self._exception = self._pconn.recv()
             except (EOFError, OSError):
                 pass
             finally:
                 self._pconn.close()
                 self._exception_read = True
+
+    @property
+    def exception(self):
+        self.read_message()
         return self._exception
 
+    @property
+    def results(self):
+        self.read_message()
+        return self._results
+
 
 def parallel_run(
     target, args, kwargs, nodes_list, timeout=None, concurrent_tasks=24, init_result=None
 ):
     """Run target function on nodes in parallel
 
+    A new process is started as soon as a running one exits, so at most 'concurrent_tasks' processes are running
+    at any time.
+
     Args:
         target (function): The target function to be executed in parallel.
         args (list of tuple): List of arguments for the target function.
         kwargs (dict): Keyword arguments for the target function. It will be extended with two keys: 'node' and
-            'results'. The 'node' key will hold an item of the nodes list. The 'result' key will hold an instance of
-            multiprocessing.Manager().dict(). It is a proxy of the shared dict that will be used by each process for
-            returning execution results.
+            'results'. The 'node' key will hold an item of the nodes list. The 'result' key will hold a dict for
+            returning execution results. Content of the dict is sent back to the parent process when the target
+            function returns, and merged into the returned results.
         nodes (list of nodes): List of nodes to be used by the target function
-        timeout (int or float, optional): Total time allowed for the spawned multiple processes to run. Defaults to
-            None. When timeout is specified, this function will wait at most 'timeout' seconds for the processes to
-            run. When time is up, this function will try to terminate or even kill all the processes.
+        timeout (int or float, optional): Time allowed for each of the spawned processes to run. Defaults to
+            None. When timeout is specified, a process running longer than 'timeout' seconds is terminated or even
+            killed, and its result is marked as failed.
 
     Raises:
         flag.: In case any of the spawned process cannot be terminated, fail the test.
 
     Returns:
-        dict: An instance of multiprocessing.Manager().dict(). It is a proxy to the shared dict that is used by all the
-            spawned processes.
+        dict: The merged results of all the spawned processes.
     """
     nodes = [node for node in nodes_list]
 
-    # Callback API for wait_procs
-    def on_terminate(worker):
-        logger.info("process {} terminated with exit code {}".format(
-            worker.name, worker.returncode)
-        )
+    def node_name(node):
+        return getattr(node, "hostname", None) or str(node)
+
+    def start_worker(node):
+        task_results = {}
+        # For sanity check process, initial results in case of timeout.
+        if init_result:
+            node_init_result = dict(init_result)
+            node_init_result["host"] = node_name(node)
+            results[node_name(node)] = node_init_result
+            task_results[node_name(node)] = dict(node_init_result)
+        task_kwargs = dict(kwargs)
+        task_kwargs['node'] = node
+        task_kwargs['results'] = task_results
+        process_name = "{}--{}".format(target.__name__, node)
+        worker = SonicProcess(
+                    name=process_name, target=target, args=args,
+                    kwargs=task_kwargs
+                )
+        worker.node = node
+        worker.start()
+        if timeout:
+            worker.deadline = worker.start_time + timeout
+        logger.debug('Started process {} running target "{}"'.format(
+            worker.pid, process_name
+        ))
+        return worker
 
-    def force_terminate(workers, init_result):
+    def mark_failed(worker):
+        # If sanity check process is killed, it still has init results.
+        # set its failed to True.
+        if init_result:
+            results[node_name(worker.node)]['failed'] = True
+        else:
+            results[worker.name] = {'failed': True}
+
+    def force_terminate(worker):
+        worker.terminate()
+        worker.join(5)
+        if not worker.is_alive():
+            return
         # Some processes cannot be terminated. Try to kill them and raise flag.
-        running_processes = [worker for worker in workers if worker.is_alive()]
-        if len(running_processes) > 0:
-            logger.info(
-                'Found processes still running: {}. Try to kill them.'.format(str(running_processes))
+        logger.info('Found process still running: {}. Try to kill it.'.format(worker.name))
+        try:
+            os.kill(worker.pid, signal.SIGKILL)
+            worker.join(5)
+        except OSError as err:
+            logger.error("Unable to kill {}:{}, error:{}".format(
+                worker.pid, worker.name, err
+            ))
+
+            pt_assert(
+                False,
+                """Processes running target "{}" could not be terminated.
+                Unable to kill {}:{}, error:{}""".format(target.__name__, worker.pid, worker.name, err)
             )
-            for p in running_processes:
-                # If sanity check process is killed, it still has init results.
-                # set its failed to True.
-                if init_result:
-                    init_result['failed'] = True
-                    results[list(results.keys())[0]] = init_result
-                else:
-                    results[p.name] = {'failed': True}
-                try:
-                    os.kill(p.pid, signal.SIGKILL)
-                except OSError as err:
-                    logger.error("Unable to kill {}:{}, error:{}".format(
-                        p.pid, p.name, err
-                    ))
-
-                    pt_assert(
-                        False,
-                        """Processes running target "{}" could not be terminated.
-                        Unable to kill {}:{}, error:{}""".format(target.__name__, p.pid, p.name, err)
-                    )
+
+    def finish_worker(worker):
+        # Sometimes the child processes finished run but still alive, causing exception hidden.
+        # Therefore, explicitly check the processes exception to prevent any error miss.
+        worker_exception = worker.exception
+        if worker.results:
+            results.update(worker.results)
+        if worker_exception is not None:
+            logger.info(f"Process {worker.name} has exception, is_alive={worker.is_alive()}, record the error.")
+            failed_processes[worker.name] = {
+                'exit_code': worker.exitcode,
+                'exception': worker_exception
+            }
+        elapsed = time.time() - worker.start_time
+        timings[node_name(worker.node)] = elapsed
+        logger.info("process {} terminated with exit code {} in {:.1f} seconds".format(
+            worker.name, worker.exitcode, elapsed)
+        )
 
     workers = []
-    results = Manager().dict()
+    results = {}
+    timings = {}
     start_time = datetime.datetime.now()
-    tasks_done = 0
-    total_tasks = len(nodes)
-    tasks_running = 0
-    total_timeout = timeout * math.ceil(
-        len(nodes)/float(concurrent_tasks)
-    ) if timeout else None
     failed_processes = {}
 
-    while tasks_done < total_tasks:
-        # If execution time of processes exceeds timeout, need to force
-        # terminate them all.
-        if total_timeout is not None:
-            if (datetime.datetime.now() - start_time).seconds > total_timeout:
-                logger.error('Process execution time exceeds {} seconds.'.format(
-                    str(total_timeout)
+    while nodes or workers:
+        while nodes and len(workers) < concurrent_tasks:
+            workers.append(start_worker(nodes.pop(0)))
+
+        # Wait for any process to send its results or exit, or to reach its deadline. Pipes are read while waiting,
+        # the child processes would hang on send() if the parent doesn't read from the pipe.
+        wait_timeout = None
+        if timeout:
+            wait_timeout = max(0, min(worker.deadline for worker in workers) - time.time())
+        wait_connections([worker.connection for worker in workers if worker.message_pending] +
+                         [worker.sentinel for worker in workers], timeout=wait_timeout)
+
+        for worker in list(workers):
+            if worker.message_pending and worker.connection.poll():
+                worker.read_message()
+            if not worker.is_alive():
+                worker.join()
+                finish_worker(worker)
+                workers.remove(worker)
+            elif timeout and time.time() >= worker.deadline:
+                logger.error('Process {} execution time exceeds {} seconds, force terminate it.'.format(
+                    worker.name, timeout
                 ))
-                break
-
-        while len(nodes) and tasks_running < concurrent_tasks:
-            node = nodes.pop(0)
-            # For sanity check process, initial results in case of timeout.
-            if init_result:
-                init_result["host"] = node.hostname
-                results[node.hostname] = init_result
-            kwargs['node'] = node
-            kwargs['results'] = results
-            process_name = "{}--{}".format(target.__name__, node)
-            worker = SonicProcess(
-                        name=process_name, target=target, args=args,
-                        kwargs=kwargs
-                    )
-            worker.start()
-            tasks_running += 1
-            logger.debug('Started process {} running target "{}"'.format(
-                worker.pid, process_name
-            ))
-            workers.append(worker)
-
-        gone, alive = wait_procs(workers, timeout=timeout, callback=on_terminate)
-        workers = alive
+                force_terminate(worker)
+                finish_worker(worker)
+                mark_failed(worker)
+                workers.remove(worker)
 
         logger.debug("task completed {}, running {}".format(
-            len(gone), len(alive)
+            len(timings), len(workers)
         ))
 
-        # Sometimes the child processes finished run but still alive, causing exception hidden.
-        # It mainly caused by child processes hang on send() if parent doesn't read from the pipe.
-        # Therefore, explicitly check the processes exception to prevent any error miss.
-        logger.info("Force read exception regardless of whether the process exited normally.")
-        for worker in gone + alive:
-            worker_exception = worker.exception  # Force-read to prevent pipe hangs
-            if worker_exception is not None:
-                logger.info(f"Process {worker.name} has exception, is_alive={worker.is_running()}, record the error.")
-                failed_processes[worker.name] = {
-                    'exit_code': worker.exitcode,
-                    'exception': worker_exception
-                }
-
-        if len(gone) == 0:
-            logger.debug("all processes have timedout")
-            tasks_running -= len(workers)
-            tasks_done += len(workers)
-            force_terminate(workers, init_result)
-            del workers[:]
-        else:
-            tasks_running -= len(gone)
-            tasks_done += len(gone)
-
-    # In case of timeout force terminate spawned processes
-    for worker in workers:
-        if worker.is_alive():
-            logger.error('Process {} is alive, force terminate it.'.format(
-                worker.name
-            ))
-            worker.terminate()
-            # If sanity check process is killed, it still has init results.
-            # set its failed to True.
-            if init_result:
-                init_result['failed'] = True
-                results[list(results.keys())[0]] = init_result
-            else:
-                results[worker.name] = {'failed': True}
-
     end_time = datetime.datetime.now()
     delta_time = end_time - start_time
 
-    # force terminate any workers still running
-    force_terminate(workers, init_result)
-
     # if we have failed processes, we should log the exception and exit code
     # of each Process and fail
     if len(list(failed_processes.keys())):
@@ -239,8 +254,9 @@ def parallel_run(
             pt_assert(False, failure_message)
 
     logger.info(
-        'Completed running processes for target "{}" in {} seconds'.format(
-            target.__name__, str(delta_time)
+        'Completed running processes for target "{}" in {} seconds, time of each node: {}'.format(
+            target.__name__, str(delta_time),
+            ", ".join("{}: {:.1f}s".format(name, elapsed) for name, elapsed in timings.items())
         )
     )
 
@@ -1,5 +1,6 @@
 import logging
 import json
+import shlex
 import six
 import ast
 from tests.common.helpers.constants import DEFAULT_NAMESPACE
@@ -16,10 +17,48 @@ class SonicDbCli(object):
             database: database number.
         """
 
+    # Lua scripts run by EVAL, so that many keys are read in one request and in one round trip to the DUT.
+    # Both return JSON object {key: {field: value}} of the hash keys.
+    SCAN_HGETALL_SCRIPT = (
+        "local result = {} "
+        "local cursor = '0' "
+        "repeat "
+        "local reply = redis.call('SCAN', cursor, 'MATCH', ARGV[1], 'COUNT', ARGV[2]) "
+        "cursor = reply[1] "
+        "for _, key in ipairs(reply[2]) do "
+        "if redis.call('TYPE', key)['ok'] == 'hash' then "
+        "local fields = redis.call('HGETALL', key) "
+        "local hash = {} "
+        "for i = 1, #fields, 2 do hash[fields[i]] = fields[i + 1] end "
+        "result[key] = hash "
+        "end "
+        "end "
+        "until cursor == '0' "
+        "return cjson.encode(result)"
+    )
+    HGETALL_KEYS_SCRIPT = (
+        "local result = {} "
+        "for _, key in ipairs(KEYS) do "
+        "local fields = redis.call('HGETALL', key) "
+        "if #fields > 0 then "
+        "local hash = {} "
+        "for i = 1, #fields, 2 do hash[fields[i]] = fields[i + 1] end "
+        "result[key] = hash "
+        "end "
+        "end "
+        "return cjson.encode(result)"
+    )
+    # Max number of keys in one HGETALL_KEYS_SCRIPT request, to limit length of the command line
+    BULK_KEYS_CHUNK_SIZE = 500
+    # COUNT hint of SCAN in SCAN_HGETALL_SCRIPT
+    SCAN_COUNT = 1000
+
     def __init__(self, host, database='APPL_DB'):
         """Initializes base class with defaults"""
         self.host = host
         self.database = database
+        # Table snapshots taken by get_table_snapshot(), keyed by key pattern
+        self.table_snapshots = {}
 
     def _cli_prefix(self):
         """Builds opening of sonic-db-cli command for other methods."""
@@ -119,6 +158,77 @@ class SonicDbCli(object):
             v_dict = ast.literal_eval(v_sanitized)
             return v_dict
 
+    def _eval_json(self, script, keys, args):
+        """
+        Executes a Lua script returning JSON by sonic-db-cli EVAL.
+
+        Args:
+            script: The Lua script.
+            keys: List of key names passed to the script as KEYS.
+            args: List of arguments passed to the script as ARGV.
+
+        Returns:
+            The loaded JSON returned by the script.
+        """
+        cmd = self._cli_prefix() + "EVAL {} {} {}".format(
+            shlex.quote(script), len(keys), " ".join(shlex.quote(str(arg)) for arg in list(keys) + list(args)))
+        result = self._run_and_raise(cmd)
+        return json.loads(result["stdout"])
+
+    def hget_all_bulk(self, keys):
+        """
+        Gets all fields of many hash keys, BULK_KEYS_CHUNK_SIZE keys in one request.
+
+        Args:
+            keys: Full names of the keys to get.
+
+        Returns:
+            Dictionary of key to dictionary of its fields. Keys which are not present are not included.
+        """
+        keys = list(keys)
+        result = {}
+        for idx in range(0, len(keys), self.BULK_KEYS_CHUNK_SIZE):
+            chunk = keys[idx:idx + self.BULK_KEYS_CHUNK_SIZE]
+            result.update(self._eval_json(self.HGETALL_KEYS_SCRIPT, chunk, []))
+        return result
+
+    def scan_hget_all(self, pattern):
+        """
+        Gets all fields of all the hash keys matching a pattern, by SCAN and HGETALL in one request.
+
+        Args:
+            pattern: Redis key pattern, like "ASIC_STATE:SAI_OBJECT_TYPE_NEIGHBOR_ENTRY:*".
+
+        Returns:
+            Dictionary of key to dictionary of its fields.
+        """
+        return self._eval_json(self.SCAN_HGETALL_SCRIPT, [], [pattern, self.SCAN_COUNT])
+
+    def get_table_snapshot(self, pattern, refresh=False):
+        """
+        Returns snapshot of all the hash keys matching a pattern. The snapshot is taken by scan_hget_all() on first
+        call and re-used until it is invalidated by invalidate_table_snapshot() or refresh.
+
+        Args:
+            pattern: Redis key pattern, like "ASIC_STATE:SAI_OBJECT_TYPE_HOSTIF:*".
+            refresh: If True, take a fresh snapshot from the DUT.
+
+        Returns:
+            Dictionary of key to dictionary of its fields.
+        """
+        if refresh or pattern not in self.table_snapshots:
+            self.table_snapshots[pattern] = self.scan_hget_all(pattern)
+        return self.table_snapshots[pattern]
+
+    def invalidate_table_snapshot(self, pattern=None):
+        """
+        Drops the snapshot of a key pattern, or all the snapshots if pattern is None.
+        """
+        if pattern is None:
+            self.table_snapshots.clear()
+        else:
+            self.table_snapshots.pop(pattern, None)
+
     def get_and_check_key_value(self, key, value, field=None):
         """
         Executes a sonic-db CLI get or hget and validates the response against a provided field.
@@ -14,6 +14,7 @@ import pytest
 
 from tests.common.testbed import TestbedInfo
 from .issue import check_issues
+from .condition_index import ConditionIndex
 from tests.common.utilities import get_duts_from_host_pattern
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,12 @@ logger = logging.getLogger(__name__)
 DEFAULT_CONDITIONS_FILE = 'common/plugins/conditional_mark/tests_mark_conditions*.yaml'
 ASIC_NAME_PATH = '/../../../../ansible/group_vars/sonic/variables'
 
+# Index of the loaded conditions list, see get_condition_index()
+_condition_index = None
+# Results of the raw condition strings evaluated against the basic facts of _condition_results_owner
+_condition_results = {}
+_condition_results_owner = None
+
 
 def pytest_addoption(parser):
     """Add options for the conditional mark plugin.
@@ -408,6 +415,23 @@ def load_basic_facts(dut_name, session):
     return results
 
 
+def get_condition_index(conditions):
+    """Get index of the conditions list.
+
+    The index is built on first use and re-used while the same conditions list is passed in.
+
+    Args:
+        conditions (list): List of conditions
+
+    Returns:
+        ConditionIndex: Index of the conditions list.
+    """
+    global _condition_index
+    if _condition_index is None or _condition_index.conditions is not conditions:
+        _condition_index = ConditionIndex(conditions)
+    return _condition_index
+
+
 def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, basic_facts):
     """Find all matches of the given test case name in the conditions list.
 
@@ -418,35 +442,11 @@ def find_all_matches(nodeid, conditions, session, dynamic_update_skip_reason, ba
     Returns:
         list: All match test case name or None if not found
     """
-    all_matches = []
     max_length = -1
     conditional_marks = {}
     matches = []
 
-    for condition in conditions:
-        # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
-        condition_entry = list(condition.keys())[0]
-        condition_items = condition[condition_entry]
-        if "regex" in condition_items.keys():
-            assert isinstance(condition_items["regex"], bool), \
-                "The value of 'regex' in the mark conditions yaml should be bool type."
-            if condition_items["regex"] is True:
-                match = re.search(condition_entry, nodeid)
-            else:
-                match = None
-
-        elif "use_longest" in condition_items.keys():
-            assert isinstance(condition_items["use_longest"], bool), \
-                "The value of 'use_longest' in the mark conditions yaml should be bool type."
-            if nodeid.startswith(condition_entry) and condition_items["use_longest"] is True:
-                all_matches = []
-
-            match = nodeid.startswith(condition_entry)
-        else:
-            match = nodeid.startswith(condition_entry)
-
-        if match:
-            all_matches.append(condition)
+    all_matches = get_condition_index(conditions).find_matches(nodeid)
 
     for match in all_matches:
         case_starting_substring = list(match.keys())[0]
@@ -546,16 +546,27 @@ def evaluate_condition(dynamic_update_skip_reason, mark_details, condition, basi
     if condition is None or condition.strip() == '':
         return True    # Empty condition item will be evaluated as True. Equivalent to be ignored.
 
-    condition_str = update_issue_status(condition, session)
-    try:
-        condition_result = bool(eval(condition_str, basic_facts))
-        if condition_result and dynamic_update_skip_reason:
-            mark_details['reason'].append(condition)
-        return condition_result
-    except Exception:
-        raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
-            condition,
-            condition_str))
+    global _condition_results_owner
+    if _condition_results_owner is None or _condition_results_owner[0] is not basic_facts \
+            or _condition_results_owner[1] is not session:
+        _condition_results.clear()
+        _condition_results_owner = (basic_facts, session)
+
+    # The same raw condition string is shared by many test cases, evaluate it only once
+    condition_result = _condition_results.get(condition)
+    if condition_result is None:
+        condition_str = update_issue_status(condition, session)
+        try:
+            condition_result = bool(eval(compile(condition_str, '<condition>', 'eval'), basic_facts))
+        except Exception:
+            raise RuntimeError('Failed to evaluate condition, raw_condition={}, condition_str={}'.format(
+                condition,
+                condition_str))
+        _condition_results[condition] = condition_result
+
+    if condition_result and dynamic_update_skip_reason:
+        mark_details['reason'].append(condition)
+    return condition_result
 
 
 def evaluate_conditions(dynamic_update_skip_reason, mark_details, conditions, basic_facts,
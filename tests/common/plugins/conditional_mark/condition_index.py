@@ -0,0 +1,126 @@
+"""Index of the mark conditions for fast lookup of the entries matching a test case name.
+
+Entries of the mark conditions files are test case name prefixes, or regular expressions if the entry has
+'regex: True'. Prefix entries are kept in a radix trie, so all the prefixes of a test case name are found by
+walking the name once instead of checking every entry. Regular expression entries are compiled once.
+"""
+import re
+
+
+class PrefixTrie(object):
+    """Radix trie mapping string keys to lists of values.
+
+    Every node keeps its children in a dict keyed by the first character of the edge label, so the number
+    of nodes is bounded by twice the number of keys.
+    """
+
+    class _Node(object):
+        __slots__ = ('children', 'values')
+
+        def __init__(self):
+            # first character of edge label -> (edge label, child node)
+            self.children = {}
+            self.values = []
+
+    def __init__(self):
+        self.root = self._Node()
+
+    def insert(self, key, value):
+        """Add value for the key."""
+        node = self.root
+        rest = key
+        while rest:
+            child_entry = node.children.get(rest[0])
+            if child_entry is None:
+                child = self._Node()
+                node.children[rest[0]] = (rest, child)
+                node = child
+                break
+
+            edge, child = child_entry
+            common = 0
+            max_common = min(len(edge), len(rest))
+            while common < max_common and edge[common] == rest[common]:
+                common += 1
+
+            if common < len(edge):
+                # Split the edge at the end of the common part
+                middle = self._Node()
+                middle.children[edge[common]] = (edge[common:], child)
+                node.children[rest[0]] = (edge[:common], middle)
+                child = middle
+
+            node = child
+            rest = rest[common:]
+
+        node.values.append(value)
+
+    def find_prefixes(self, string):
+        """Get values of all the keys which are prefixes of the string, from the shortest key to the longest."""
+        values = list(self.root.values)
+        node = self.root
+        pos = 0
+        while pos < len(string):
+            child_entry = node.children.get(string[pos])
+            if child_entry is None:
+                break
+            edge, node = child_entry
+            if not string.startswith(edge, pos):
+                break
+            pos += len(edge)
+            values.extend(node.values)
+        return values
+
+
+class ConditionIndex(object):
+    """Index of the list of mark conditions loaded from the mark conditions files."""
+
+    def __init__(self, conditions):
+        """
+        Args:
+            conditions (list): List of one item dicts {entry: {mark: details, ...}}, in the order of the files.
+        """
+        self.conditions = conditions
+        self.prefix_trie = PrefixTrie()
+        self.regex_entries = []
+        self.use_longest_positions = set()
+
+        for position, condition in enumerate(conditions):
+            # condition is a dict which has only one item, so we use condition.keys()[0] to get its key.
+            condition_entry = list(condition.keys())[0]
+            condition_items = condition[condition_entry]
+            if "regex" in condition_items.keys():
+                assert isinstance(condition_items["regex"], bool), \
+                    "The value of 'regex' in the mark conditions yaml should be bool type."
+                if condition_items["regex"] is True:
+                    self.regex_entries.append((position, re.compile(condition_entry)))
+                continue
+
+            if "use_longest" in condition_items.keys():
+                assert isinstance(condition_items["use_longest"], bool), \
+                    "The value of 'use_longest' in the mark conditions yaml should be bool type."
+                if condition_items["use_longest"] is True:
+                    self.use_longest_positions.add(position)
+            self.prefix_trie.insert(condition_entry, position)
+
+    def find_matches(self, nodeid):
+        """Find the conditions matching the test case name.
+
+        A matching entry with 'use_longest: True' drops the matching entries which are before it in the
+        conditions list.
+
+        Args:
+            nodeid (str): Full test case name
+
+        Returns:
+            list: Matching conditions in the order of the conditions list.
+        """
+        positions = self.prefix_trie.find_prefixes(nodeid)
+        positions.extend(position for position, regex in self.regex_entries if regex.search(nodeid))
+
+        all_matches = []
+        for position in sorted(positions):
+            if position in self.use_longest_positions:
+                all_matches = []
+            all_matches.append(self.conditions[position])
+        return all_matches
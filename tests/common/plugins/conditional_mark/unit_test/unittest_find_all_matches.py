@@ -2,6 +2,7 @@ import logging
 import unittest
 from unittest.mock import MagicMock
 from tests.common.plugins.conditional_mark import find_all_matches, load_conditions
+from tests.common.plugins.conditional_mark.condition_index import PrefixTrie
 
 logger = logging.getLogger(__name__)
 
@@ -292,6 +293,31 @@ class TestFindAllMatches(unittest.TestCase):
         self.assertEqual(len(marks_found), 1)
         self.assertIn('xfail', marks_found)
 
+    # Test case: the index of the conditions is re-used, the same conditions list gives the same matches
+    def test_repeated_lookups(self):
+        conditions, session_mock = load_test_conditions()
+        nodeids = ["test_conditional_mark.py::test_mark", "test_conditional_mark.py::test_mark_1",
+                   "test_conditional_mark.py::test_mark_9_2", "test_conditional_mark.py::test_mark_no_match"]
+
+        first_matches = [find_all_matches(nodeid, conditions, session_mock, DYNAMIC_UPDATE_SKIP_REASON,
+                                          CUSTOM_BASIC_FACTS) for nodeid in nodeids]
+        for nodeid, matches in zip(nodeids, first_matches):
+            self.assertEqual(
+                find_all_matches(nodeid, conditions, session_mock, DYNAMIC_UPDATE_SKIP_REASON, CUSTOM_BASIC_FACTS),
+                matches)
+
+    # Test case: prefix trie returns all the keys which are prefixes of the string, from the shortest one
+    def test_prefix_trie(self):
+        trie = PrefixTrie()
+        for position, key in enumerate(["test_a.py", "test_a.py::test_1", "test_ab.py", "test_a.py::test_10",
+                                        "test_a.py::test_1"]):
+            trie.insert(key, position)
+
+        self.assertEqual(trie.find_prefixes("test_a.py::test_10[param]"), [0, 1, 4, 3])
+        self.assertEqual(trie.find_prefixes("test_a.py::test_2"), [0])
+        self.assertEqual(trie.find_prefixes("test_ab.py::test_1"), [2])
+        self.assertEqual(trie.find_prefixes("test_b.py"), [])
+
 
 if __name__ == "__main__":
     unittest.main()
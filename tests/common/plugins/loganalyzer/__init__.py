@@ -2,6 +2,7 @@ import logging
 import pytest
 
 from .loganalyzer import LogAnalyzer, DisableLogrotateCronContext
+from .system_msg_handler import ENGINES, ENGINE_LEGACY
 from tests.common.errors import RunAnsibleModuleFail
 from tests.common.helpers.parallel import parallel_run, reset_ansible_local_tmp
 
@@ -22,6 +23,13 @@ def pytest_addoption(parser):
     parser.addoption("--force_load_err_list", action="store_true", default=False,
                      help="Load the user defined err msgs which is not included in the common ignore file,"
                           "even when disable_loganalyzer is true")
+    parser.addoption("--loganalyzer_engine", action="store", default=ENGINE_LEGACY, choices=ENGINES,
+                     help="engine used to analyze the extracted logs. 'streaming' reads the logs backwards in "
+                          "blocks and prefilters lines by literals, which is faster and uses less memory on "
+                          "large logs")
+    parser.addoption("--loganalyzer_on_dut", action="store_true", default=False,
+                     help="analyze logs on the DUT and fetch only the matching lines, the full logs are "
+                          "downloaded only if analysis fails or --store_la_logs is set")
 
 
 @reset_ansible_local_tmp
@@ -87,7 +95,9 @@ def loganalyzer(duthosts, request, log_rotate_modular_chassis):
     if should_rotate_log and not is_modular_chassis:
         parallel_run(analyzer_logrotate, [], {}, duthosts, timeout=120)
     for duthost in duthosts:
-        analyzer = LogAnalyzer(ansible_host=duthost, marker_prefix=request.node.name, request=request)
+        analyzer = LogAnalyzer(ansible_host=duthost, marker_prefix=request.node.name, request=request,
+                               engine=request.config.getoption("--loganalyzer_engine"),
+                               analyze_on_dut=request.config.getoption("--loganalyzer_on_dut"))
         analyzer.load_common_config()
         analyzers[duthost.hostname] = analyzer
     markers = parallel_run(analyzer_add_marker, [analyzers], {}, duthosts, timeout=120)
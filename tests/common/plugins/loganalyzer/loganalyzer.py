@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import re
+import shlex
 import time
 import pprint
 
@@ -74,7 +75,7 @@ class LogAnalyzerError(Exception):
 
 class LogAnalyzer:
     def __init__(self, ansible_host, marker_prefix, request=None, dut_run_dir="/tmp", start_marker=None,
-                 additional_files={}):
+                 additional_files={}, engine=system_msg_handler.ENGINE_LEGACY, analyze_on_dut=False):
         self.ansible_host = ansible_host
         ansible_host.loganalyzer = self
         self.dut_run_dir = dut_run_dir
@@ -94,6 +95,8 @@ class LogAnalyzer:
         self.additional_files = list(additional_files.keys())
         self.additional_start_str = list(additional_files.values())
         self.request = request
+        self.engine = engine
+        self.analyze_on_dut = analyze_on_dut
 
     def _add_end_marker(self, marker):
         """
@@ -321,15 +324,22 @@ class LogAnalyzer:
         self.ansible_host.command(cmd)
         return start_marker
 
-    def analyze(self, marker, fail=True, maximum_log_length=None, store_la_logs=False):
+    def analyze(self, marker, fail=True, maximum_log_length=None, store_la_logs=False, engine=None,
+                analyze_on_dut=None):
         """
         @summary: Extract syslog logs based on the start/stop markers and compose one file.
                   Download composed file, analyze file based on defined regular expressions.
+                  If "analyze_on_dut" is set, the composed file is analyzed on the DUT and only matching lines
+                  are returned, the file is downloaded only when analysis fails or "store_la_logs" is set.
 
         @param marker: Marker obtained from "init" method.
         @param fail: Flag to enable/disable raising exception when loganalyzer find error messages.
         @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
         @param store_la_logs: Flag to save the match lines
+        @param engine: Analysis engine - "legacy" or "streaming". The "streaming" engine reads the extracted
+                       files backwards in blocks and prefilters lines by literals before running regexes,
+                       it gives the same results as "legacy". Defaults to the engine of this instance.
+        @param analyze_on_dut: Flag to run analysis on the DUT. Defaults to the setting of this instance.
         @return: If "fail" is False - return dictionary of parsed syslog summary,
                  if dictionary can't be parsed - return empty dictionary.
                  If "fail" is True and if found match messages - raise exception.
@@ -345,6 +355,12 @@ class LogAnalyzer:
         tmp_folder = ".".join((SYSLOG_TMP_FOLDER, self.ansible_host.hostname, timestamp))
         marker = marker.replace(' ', '_')
         self.ansible_loganalyzer.run_id = marker
+        engine = engine or self.engine
+        if analyze_on_dut is None:
+            analyze_on_dut = self.analyze_on_dut
+        if engine not in system_msg_handler.ENGINES:
+            raise ValueError("Unknown loganalyzer engine '{}', supported: {}".format(
+                engine, system_msg_handler.ENGINES))
 
         if not self.start_marker:
             start_string = 'start-LogAnalyzer-{}'.format(marker)
@@ -356,8 +372,9 @@ class LogAnalyzer:
             self._add_end_marker(marker)
 
             # On DUT extract syslog files from /var/log/ and create one file by location - /tmp/syslog
+            # Marker index kept in dut_run_dir lets extract_log skip already scanned parts of the logs
             self.ansible_host.extract_log(directory='/var/log', file_prefix='syslog', start_string=start_string,
-                                          target_filename=self.extracted_syslog)
+                                          target_filename=self.extracted_syslog, index_dir=self.dut_run_dir)
             for idx, path in enumerate(self.additional_files):
                 file_dir, file_name = split(path)
                 extracted_file_name = os.path.join(self.dut_run_dir, file_name)
@@ -366,35 +383,33 @@ class LogAnalyzer:
                 else:
                     start_str = start_string
                 self.ansible_host.extract_log(directory=file_dir, file_prefix=file_name, start_string=start_str,
-                                              target_filename=extracted_file_name)
+                                              target_filename=extracted_file_name, index_dir=self.dut_run_dir)
 
-        # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
-        self.save_extracted_log(dest=tmp_folder)
-        file_list = [tmp_folder]
-
-        for path in self.additional_files:
-            file_dir, file_name = split(path)
-            extracted_file_name = os.path.join(self.dut_run_dir, file_name)
-            tmp_folder = ".".join((extracted_file_name, timestamp))
-            self.save_extracted_file(dest=tmp_folder, src=extracted_file_name)
-            file_list.append(tmp_folder)
-
-        match_messages_regex = re.compile('|'.join(self.match_regex)) if len(self.match_regex) else None
-        ignore_messages_regex = re.compile('|'.join(self.ignore_regex)) if len(self.ignore_regex) else None
-        expect_messages_regex = re.compile('|'.join(self.expect_regex)) if len(self.expect_regex) else None
-
-        logging.debug("Analyze files {}".format(file_list))
-        logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
-        logging.debug('    ignore_regex="{}"'.format(ignore_messages_regex.pattern if ignore_messages_regex else ''))
-        logging.debug('    expect_regex="{}"'.format(expect_messages_regex.pattern if expect_messages_regex else ''))
-        analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
-            file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
-            maximum_log_length=maximum_log_length)
-        # Print file content and remove the file
-        for folder in file_list:
-            with open(folder) as fo:
-                logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
-            os.remove(folder)
+        if analyze_on_dut:
+            analyzer_parse_result = self._analyze_extracted_logs_on_dut(marker, maximum_log_length, engine)
+        else:
+            # Download extracted logs from the DUT to the temporal folder defined in SYSLOG_TMP_FOLDER
+            file_list = self._download_extracted_logs(tmp_folder, timestamp)
+
+            match_messages_regex = re.compile('|'.join(self.match_regex)) if len(self.match_regex) else None
+            ignore_messages_regex = re.compile('|'.join(self.ignore_regex)) if len(self.ignore_regex) else None
+            expect_messages_regex = re.compile('|'.join(self.expect_regex)) if len(self.expect_regex) else None
+
+            logging.debug("Analyze files {} with {} engine".format(file_list, engine))
+            logging.debug('    match_regex="{}"'.format(match_messages_regex.pattern if match_messages_regex else ''))
+            logging.debug('    ignore_regex="{}"'.format(
+                ignore_messages_regex.pattern if ignore_messages_regex else ''))
+            logging.debug('    expect_regex="{}"'.format(
+                expect_messages_regex.pattern if expect_messages_regex else ''))
+            analyzer_parse_result = self.ansible_loganalyzer.analyze_file_list(
+                file_list, match_messages_regex, ignore_messages_regex, expect_messages_regex,
+                maximum_log_length=maximum_log_length, engine=engine)
+            # Print file content and remove the file
+            for folder in file_list:
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    with open(folder) as fo:
+                        logging.debug("{} file content:\n\n{}".format(folder, fo.read()))
+                os.remove(folder)
 
         expected_lines_total = []
         unused_regex_messages = []
@@ -419,6 +434,10 @@ class LogAnalyzer:
         analyzer_summary["total"]["expected_missing_match"] = len(unused_regex_messages)
         analyzer_summary["unused_expected_regexp"] = unused_regex_messages
         logging.debug("Analyzer summary: {}".format(pprint.pformat(analyzer_summary)))
+        if analyze_on_dut and (store_la_logs or self._is_failed(analyzer_summary)):
+            # Keep the full logs on the sonic-mgmt host for debugging
+            file_list = self._download_extracted_logs(tmp_folder, timestamp)
+            logging.info("Extracted logs are saved in {}".format(file_list))
         if analyzer_summary["total"]["match"] != 0 and store_la_logs:
             self.save_matching_errors(analyzer_summary["match_messages"].values())
 
@@ -429,6 +448,72 @@ class LogAnalyzer:
         else:
             return analyzer_summary
 
+    def _is_failed(self, analyzer_summary):
+        """
+        @summary: Check whether _verify_log would raise LogAnalyzerError for the analysis summary.
+        """
+        try:
+            self._verify_log(analyzer_summary)
+        except LogAnalyzerError:
+            return True
+        return False
+
+    def _extracted_files(self):
+        """
+        @summary: Get paths of the files extracted on the DUT by analyze phase, syslog goes first.
+        """
+        return [self.extracted_syslog] + [os.path.join(self.dut_run_dir, split(path)[1])
+                                          for path in self.additional_files]
+
+    def _download_extracted_logs(self, tmp_folder, timestamp):
+        """
+        @summary: Download extracted syslog and additional files from the DUT.
+
+        @param tmp_folder: File path to store downloaded syslog.
+        @param timestamp: Timestamp used as suffix of the downloaded additional files.
+        @return: List of paths to the downloaded files.
+        """
+        self.save_extracted_log(dest=tmp_folder)
+        file_list = [tmp_folder]
+
+        for extracted_file_name in self._extracted_files()[1:]:
+            tmp_folder = ".".join((extracted_file_name, timestamp))
+            self.save_extracted_file(dest=tmp_folder, src=extracted_file_name)
+            file_list.append(tmp_folder)
+        return file_list
+
+    def _analyze_extracted_logs_on_dut(self, marker, maximum_log_length, engine):
+        """
+        @summary: Run analysis of the extracted files on the DUT and fetch only matching and expected lines.
+
+        @param marker: Marker obtained from "init" method.
+        @param maximum_log_length: The long message (length > maximum_log_length) will be skipped.
+        @param engine: Analysis engine used on the DUT.
+        @return: Dictionary <file_name, [matching_lines, expected_lines]>, the same as analyze_file_list returns.
+        """
+        regex_file = os.path.join(self.dut_run_dir,
+                                  "loganalyzer_regex.{}.json".format(re.sub(r'[^\w.-]', '_', marker)))
+        self.ansible_host.copy(content=json.dumps({"match": self.match_regex,
+                                                   "ignore": self.ignore_regex,
+                                                   "expect": self.expect_regex}),
+                               dest=regex_file)
+
+        file_list = self._extracted_files()
+        cmd = "python {run_dir}/loganalyzer.py --action analyze_json --run_id {marker} --logs {logs} " \
+              "--regex_file {regex_file} --engine {engine}".format(run_dir=self.dut_run_dir,
+                                                                   marker=shlex.quote(marker),
+                                                                   logs=",".join(file_list), regex_file=regex_file,
+                                                                   engine=engine)
+        if self.start_marker:
+            cmd += " --start_marker {}".format(shlex.quote(self.start_marker))
+        if maximum_log_length is not None:
+            cmd += " --max_log_length {}".format(maximum_log_length)
+        cmd += " && rm -f {}".format(regex_file)
+
+        logging.debug("Analyze files {} on DUT with {} engine".format(file_list, engine))
+        result = self.ansible_host.shell(cmd)
+        return json.loads(result["stdout"])
+
     def _post_err_msg_handler(self, analyzer_summary):
         if skip_loganalyzer_bug_handler(self.ansible_host, self.request):
             self._verify_log(analyzer_summary)
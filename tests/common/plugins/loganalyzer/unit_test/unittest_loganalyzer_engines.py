@@ -0,0 +1,128 @@
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from tests.common.plugins.loganalyzer.system_msg_handler import AnsibleLogAnalyzer, ENGINE_LEGACY, \
+    ENGINE_STREAMING, required_literals
+
+LOGANALYZER_DIR = "tests/common/plugins/loganalyzer"
+COMMON_MATCH = os.path.join(LOGANALYZER_DIR, "loganalyzer_common_match.txt")
+COMMON_IGNORE = os.path.join(LOGANALYZER_DIR, "loganalyzer_common_ignore.txt")
+COMMON_EXPECT = os.path.join(LOGANALYZER_DIR, "loganalyzer_common_expect.txt")
+RUN_ID = "unittest_engines"
+
+# Escape sequences whose arguments must not be taken as literal text by the prefilter
+ESCAPE_PATTERNS = [
+    r"port\x41down",
+    r"code\101xyz",
+    r"café closed",
+    r"na\N{LATIN SMALL LETTER I}ve failure",
+    r"wide\U0001F600smile",
+    r"(dup)licate \1 entry",
+    r"\d+ errors? in \w+ table",
+    r"lag\sPortChannel\d{4} \.down\.",
+    r"tab\there",
+    r"\bERR\b.*fan\S*",
+]
+
+LOG_LINES = [
+    "Oct 18 03:00:00.100000 sonic ERR syncd#syncd: brcm_sai_get_port_stats: port stats get failed with error -2",
+    "Oct 18 03:00:00.200000 sonic ERR orchagent: crash in portsorch",
+    "Oct 18 03:00:00.300000 sonic NOTICE swss#orchagent: port Ethernet0 admin status up",
+    "Oct 18 03:00:00.400000 sonic INFO kernel: [1.0] Oops: 0002 [#1] SMP",
+    "Oct 18 03:00:00.500000 sonic ERR snmp#snmp-subagent: failed to get lldp neighbors",
+    "Oct 18 03:00:00.600000 sonic INFO pmon: portAdown",
+    "Oct 18 03:00:00.700000 sonic INFO pmon: port41down",
+    "Oct 18 03:00:00.800000 sonic INFO pmon: codeAxyz",
+    "Oct 18 03:00:00.900000 sonic INFO pmon: code101xyz",
+    "Oct 18 03:00:01.000000 sonic INFO pmon: café closed",
+    "Oct 18 03:00:01.100000 sonic INFO pmon: cafu00e9 closed",
+    "Oct 18 03:00:01.200000 sonic INFO pmon: naive failure",
+    "Oct 18 03:00:01.300000 sonic INFO pmon: wide\U0001F600smile",
+    "Oct 18 03:00:01.400000 sonic INFO pmon: duplicate dup entry",
+    "Oct 18 03:00:01.500000 sonic INFO pmon: 12 errors in acl table",
+    "Oct 18 03:00:01.600000 sonic INFO teamd: lag PortChannel0001 .down.",
+    "Oct 18 03:00:01.700000 sonic INFO pmon: tab\there",
+    "Oct 18 03:00:01.800000 sonic ERR thermalctld: fan1 is absent",
+    "Oct 18 03:00:01.900000 sonic ERR ntpd[1]: routing socket reports: No buffer space available",
+    "Oct 18 03:00:02.000000 sonic INFO systemd: Started Session 1 of user admin.",
+]
+
+
+class TestLogAnalyzerEngines(unittest.TestCase):
+    """Test the streaming engine reports the same lines as the legacy engine."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.analyzer = AnsibleLogAnalyzer(RUN_ID, False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_file(self, name, lines):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def write_log(self, lines):
+        return self.write_file("syslog", ["Oct 18 02:59:59.000000 sonic INFO boot"] +
+                               [self.analyzer.create_start_marker()] + lines +
+                               [self.analyzer.create_end_marker()])
+
+    def analyze(self, log_file, match_files, ignore_files, expect_files):
+        match_regex = self.analyzer.create_msg_regex(match_files)
+        ignore_regex = self.analyzer.create_msg_regex(ignore_files)
+        expect_regex = self.analyzer.create_msg_regex(expect_files)
+        results = {}
+        for engine in (ENGINE_LEGACY, ENGINE_STREAMING):
+            results[engine] = self.analyzer.analyze_file_list(
+                [log_file],
+                match_regex[0] if match_regex else None,
+                ignore_regex[0] if ignore_regex else None,
+                expect_regex[0] if expect_regex else None,
+                engine=engine)
+        return results
+
+    def regex_file(self, name, patterns):
+        return self.write_file(name, ['r, "{}"'.format(pattern) for pattern in patterns])
+
+    def test_common_regexes(self):
+        log_file = self.write_log(LOG_LINES)
+        results = self.analyze(log_file, [COMMON_MATCH], [COMMON_IGNORE], [COMMON_EXPECT])
+        self.assertEqual(results[ENGINE_LEGACY], results[ENGINE_STREAMING])
+        self.assertTrue(results[ENGINE_LEGACY][log_file][0])
+
+    def test_escape_regexes(self):
+        log_file = self.write_log(LOG_LINES)
+        match_file = self.regex_file("match.txt", ESCAPE_PATTERNS)
+        for pattern in ESCAPE_PATTERNS:
+            results = self.analyze(log_file, [self.regex_file("single_match.txt", [pattern])], [], [])
+            self.assertEqual(results[ENGINE_LEGACY], results[ENGINE_STREAMING], pattern)
+            self.assertTrue(results[ENGINE_LEGACY][log_file][0], pattern)
+
+        results = self.analyze(log_file, [match_file], [COMMON_IGNORE], [])
+        self.assertEqual(results[ENGINE_LEGACY], results[ENGINE_STREAMING])
+
+    def test_escape_regexes_as_ignore_and_expect(self):
+        log_file = self.write_log(LOG_LINES)
+        half = len(ESCAPE_PATTERNS) // 2
+        ignore_file = self.regex_file("ignore.txt", ESCAPE_PATTERNS[:half])
+        expect_file = self.regex_file("expect.txt", ESCAPE_PATTERNS[half:])
+        results = self.analyze(log_file, [COMMON_MATCH, self.regex_file("match.txt", [r"sonic \w+ "])],
+                               [ignore_file], [expect_file])
+        self.assertEqual(results[ENGINE_LEGACY], results[ENGINE_STREAMING])
+        self.assertTrue(results[ENGINE_LEGACY][log_file][1])
+
+    def test_required_literals_of_escapes(self):
+        for pattern in ESCAPE_PATTERNS:
+            literals = required_literals(re.compile(pattern))
+            for literal in literals or []:
+                self.assertNotIn("\\", literal, pattern)
+                self.assertTrue(any(literal in line for line in LOG_LINES if re.search(pattern, line)), pattern)
+
+
+if __name__ == "__main__":
+    unittest.main()
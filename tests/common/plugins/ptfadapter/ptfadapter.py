@@ -1,3 +1,8 @@
+import copy
+import json
+import os
+import time
+
 import nnpy
 import ptf
 import ptf.platforms.nn as nn
@@ -10,6 +15,127 @@ from ptf.dataplane import DataPlane, DataPlanePortNN
 from tests.common.utilities import wait_until
 import logging
 
+# Script run on the PTF host by PtfTestAdapter.send_and_count
+PTF_BURST_SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../../../scripts/ptf_burst.py")
+PTF_BURST_SCRIPT_DEST = "/tmp/ptf_burst.py"
+PTF_BURST_REQUEST_DEST = "/tmp/ptf_burst.json"
+# The burst packets forwarded by ptf_nn_agent are dropped until none is received for PTF_BURST_QUIET_TIME seconds,
+# at most for PTF_BURST_DRAIN_TIME seconds
+PTF_BURST_QUIET_TIME = 0.5
+PTF_BURST_DRAIN_TIME = 10
+
+
+def _overlap(start, end, offset, size):
+    return offset < end and start < offset + size
+
+
+def _field_location(data, layer, name):
+    """Get offset and size in bytes of the field of the layer in the packet data.
+
+    Args:
+        data (bytes): The built packet.
+        layer (scapy layer): Layer of the packet dissected from data.
+        name (str): Field name.
+
+    Returns:
+        tuple: (offset, size, field object)
+    """
+    offset = len(data) - len(bytes(layer))
+    built = b""
+    for fld in layer.fields_desc:
+        value = layer.getfieldval(fld.name)
+        if fld.name == name:
+            start = len(built) if isinstance(built, bytes) else None
+            built = fld.addfield(layer, built, value)
+            if start is None or not isinstance(built, bytes):
+                raise ValueError("Field {} of {} is not byte aligned".format(name, layer.name))
+            return offset + start, len(built) - start, fld
+        built = fld.addfield(layer, built, value)
+    raise ValueError("Field {} is not in {}".format(name, layer.name))
+
+
+def _checksum_offsets(pkt, data, offset, size):
+    """Get offsets of the IPv4 header and TCP/UDP/ICMP checksums covering the bytes of the packet data."""
+    checksums = []
+    layer = pkt
+    while layer:
+        if isinstance(layer, (scapy.IP, scapy.IPv6)):
+            ip_offset = len(data) - len(bytes(layer))
+            if isinstance(layer, scapy.IP):
+                l4_offset = ip_offset + layer.ihl * 4
+                l4_end = min(ip_offset + layer.len, len(data))
+                proto, pseudo_header = layer.proto, (ip_offset + 12, ip_offset + 20)
+                if _overlap(ip_offset, l4_offset, offset, size):
+                    checksums.append(ip_offset + 10)
+                l4_checksum = {1: 2, 6: 16, 17: 6}.get(proto)
+            else:
+                l4_offset = ip_offset + 40
+                l4_end = min(l4_offset + layer.plen, len(data))
+                proto, pseudo_header = layer.nh, (ip_offset + 8, ip_offset + 40)
+                l4_checksum = {6: 16, 17: 6, 58: 2}.get(proto)
+            # ICMP checksum does not cover the IP pseudo header
+            if proto == 1:
+                pseudo_header = (0, 0)
+            if l4_checksum is not None and (_overlap(l4_offset, l4_end, offset, size) or
+                                            _overlap(pseudo_header[0], pseudo_header[1], offset, size)):
+                l4_checksum += l4_offset
+                # zero UDP checksum is not used
+                if proto != 17 or data[l4_checksum:l4_checksum + 2] != b"\0\0":
+                    checksums.append(l4_checksum)
+        layer = layer.payload
+    return [checksum for checksum in checksums if not _overlap(checksum, checksum + 2, offset, size)]
+
+
+def _packet_variations(pkt, variations, ignore_missing=False):
+    """Convert the field variations of a scapy packet to the byte offsets and values used by the PTF burst script.
+
+    Args:
+        pkt (scapy packet): The packet.
+        variations (list): List of tuples (layer, field name, values).
+        ignore_missing (bool): Skip the variations of the layers not in the packet instead of raising ValueError.
+
+    Returns:
+        list: List of dicts with 'offset', 'values' in hex and 'checksums' offsets.
+    """
+    data = bytes(pkt)
+    pkt = pkt.__class__(data)
+    result = []
+    for layer_cls, name, values in variations or []:
+        layer = pkt.getlayer(layer_cls)
+        if layer is None:
+            if ignore_missing:
+                continue
+            raise ValueError("Layer {} is not in the packet".format(layer_cls.__name__))
+        offset, size, fld = _field_location(data, layer, name)
+        packed = []
+        for value in values:
+            value = fld.addfield(layer, b"", fld.any2i(layer, value))
+            if len(value) != size:
+                raise ValueError("Invalid value of field {}: {}".format(name, value))
+            packed.append(value.hex())
+        if not packed:
+            raise ValueError("No value of field {}".format(name))
+        result.append({"offset": offset, "values": packed, "checksums": _checksum_offsets(pkt, data, offset, size)})
+    return result
+
+
+def _port_ifaces(ptfagents, device):
+    """Get the interfaces on the PTF host of the PTF ports of the device.
+
+    ptf.config["port_map"] can't be used, with the nn platform it maps the ports to the ptf_nn_agent socket address.
+
+    Args:
+        ptfagents (list): PtfAgent objects.
+        device (int): Device number of the PTF host.
+
+    Returns:
+        dict: PTF port to interface name, e.g. {0: "eth0"}.
+    """
+    for ptfagent in ptfagents:
+        if ptfagent.device_num == device:
+            return dict(ptfagent.ptf_port_set)
+    raise ValueError("Device {} is not a PTF host".format(device))
+
 
 class PtfAgent:
     def __init__(self, ptf_ip, ptf_ipv6, ptf_nn_port, device_num, ptf_port_set):
@@ -49,6 +175,7 @@ class PtfTestAdapter(BaseTest):
         self.ptfhosts = ptfhosts
         self.ptfagents = ptfagents
         self.ptf_port_set = [k for a in ptfagents for k in a.ptf_port_set.keys()]
+        self._burst_script_hosts = set()
         self._init_ptf_dataplane()
 
     def __enter__(self):
@@ -208,3 +335,102 @@ class PtfTestAdapter(BaseTest):
                 return new_payload[:len_old]
         else:
             return payload
+
+    def _drain_dataplane(self, device, quiet_time=PTF_BURST_QUIET_TIME, max_time=PTF_BURST_DRAIN_TIME):
+        """Drop the packets received from the device until it is quiet, then flush the data plane queues.
+
+        Args:
+            device (int): Device number of the PTF host.
+            quiet_time (float): Time in seconds without any received packet after which the device is quiet.
+            max_time (float): Maximum time in seconds to wait for the device to be quiet.
+        """
+        deadline = time.time() + max_time
+        while time.time() < deadline:
+            res = self.dataplane.poll(device_number=device, timeout=quiet_time)
+            if not isinstance(res, self.dataplane.PollSuccess):
+                break
+        self.dataplane.flush()
+
+    def send_and_count(self, port_id, pkt, count, exp_pkt=None, ports=None, variations=None, timeout=1,
+                       max_samples=5):
+        """Send the packet count times from a PTF port and count the expected packets received on PTF ports.
+
+        The packets are generated, sent, received and matched by a script on the PTF host, only the per port counts
+        and a few mismatched packets come back. It is much faster than sending and verifying the packets one by one
+        through ptf_nn_agent, e.g. for ECMP/LAG load balancing or drop counter tests sending thousands of packets.
+        The payload of the packets is updated to the default pattern the same way as ptf.testutils.send does.
+
+        Args:
+            port_id (int): PTF port to send the packets from.
+            pkt (scapy packet): Template of the sent packets.
+            count (int): Number of packets to send.
+            exp_pkt (scapy packet or masked packet): Expected packet, the sent packet by default.
+            ports (list): PTF ports to count the received packets on, all ports of the PTF host by default.
+            variations (list): Fields changed per packet, list of tuples (layer, field name, values). Packet i gets
+                values[i % len(values)] in the field, e.g. (scapy.TCP, "sport", range(1024, 2048)). The same change
+                is applied to the expected packet if it has the layer. The checksums covering the field are updated.
+            timeout (int): Time in seconds to wait for more packets after the last received one.
+            max_samples (int): Maximum number of mismatched packets returned.
+
+        Returns:
+            dict: 'sent' number of sent packets, 'counts' and 'mismatches' dicts of PTF port to number of received
+                packets matching and not matching the expected packet, 'samples' list of tuples (PTF port, scapy
+                packet) of mismatched packets. A received packet not matching the expected packet is counted only if
+                it has the payload of the sent packet, other traffic is ignored.
+        """
+        device = self.dataplane.port_to_device(port_id)
+        if device >= len(self.ptfhosts):
+            raise ValueError("Port {} is not a port of PTF host".format(port_id))
+        port_ifaces = _port_ifaces(self.ptfagents, device)
+        ports = sorted(port_ifaces) if ports is None else ports
+        if port_id not in port_ifaces or any(port not in port_ifaces for port in ports):
+            raise ValueError("Ports {} are not ports of the PTF host of port {}".format(ports, port_id))
+        iface_ports = {port_ifaces[port]: port for port in ports}
+
+        pkt = self.update_payload(pkt.copy())
+        exp_pkt = self.update_payload(copy.deepcopy(exp_pkt)) if exp_pkt is not None else pkt
+        if isinstance(exp_pkt, mask.Mask):
+            exp_scapy_pkt = exp_pkt.exp_pkt
+            exp_frame = bytes(exp_scapy_pkt)[:exp_pkt.size]
+            if getattr(exp_pkt, "dont_care_all", False):
+                exp_mask = b"\0" * len(exp_frame)
+            else:
+                exp_mask = bytes(bytearray(exp_pkt.mask))
+        else:
+            exp_scapy_pkt, exp_frame, exp_mask = exp_pkt, bytes(exp_pkt), b""
+        raw = pkt.getlayer(scapy.Raw)
+        marker = bytes(raw.load)[:32] if raw is not None and len(raw.load) >= 4 else b""
+
+        request = {
+            "tx_iface": port_ifaces[port_id],
+            "rx_ifaces": list(iface_ports.keys()),
+            "count": count,
+            "frame": bytes(pkt).hex(),
+            "variations": _packet_variations(pkt, variations),
+            "exp_frame": exp_frame.hex(),
+            "exp_mask": exp_mask.hex(),
+            "exp_variations": _packet_variations(exp_scapy_pkt, variations, ignore_missing=True),
+            "marker": marker.hex(),
+            "timeout": timeout,
+            "max_samples": max_samples,
+        }
+
+        ptfhost = self.ptfhosts[device]
+        if device not in self._burst_script_hosts:
+            ptfhost.copy(src=PTF_BURST_SCRIPT, dest=PTF_BURST_SCRIPT_DEST)
+            self._burst_script_hosts.add(device)
+        ptfhost.copy(content=json.dumps(request), dest=PTF_BURST_REQUEST_DEST)
+        res = ptfhost.shell("python3 {} {}".format(PTF_BURST_SCRIPT_DEST, PTF_BURST_REQUEST_DEST))
+        result = json.loads(res["stdout_lines"][-1])
+        logging.info("Sent {} packets from port {} in {:.3f}s, received {}".format(
+            result["sent"], port_id, result["send_time"], result["counts"]))
+
+        # ptf_nn_agent forwarded the packets of the burst too, drop them from the data plane queues
+        self._drain_dataplane(device)
+        return {
+            "sent": result["sent"],
+            "counts": {iface_ports[iface]: value for iface, value in result["counts"].items()},
+            "mismatches": {iface_ports[iface]: value for iface, value in result["mismatches"].items()},
+            "samples": [(iface_ports[sample["iface"]], scapy.Ether(bytes(bytearray.fromhex(sample["frame"]))))
+                        for sample in result["samples"]],
+        }
@@ -0,0 +1,120 @@
+import importlib.util
+import unittest
+
+import ptf.packet as scapy
+from tests.common.plugins.ptfadapter.ptfadapter import PTF_BURST_SCRIPT, _checksum_offsets, _field_location, \
+    _packet_variations
+
+# The script generating the packets on PTF host, it is not in a python package
+spec = importlib.util.spec_from_file_location("ptf_burst", PTF_BURST_SCRIPT)
+ptf_burst = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ptf_burst)
+
+PAYLOAD = bytes(range(32))
+
+# (packet, variations) where the values change the checksums covering the field
+PACKETS = [
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") /
+     scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.TCP(sport=1234, dport=80) / scapy.Raw(PAYLOAD),
+     [(scapy.IP, "src", ["10.0.0.{}".format(i) for i in range(3, 8)]),
+      (scapy.IP, "ttl", range(10, 15)),
+      (scapy.TCP, "sport", range(1000, 1007))]),
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") / scapy.Dot1Q(vlan=5) /
+     scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.UDP(sport=1234, dport=4789) / scapy.Raw(PAYLOAD),
+     [(scapy.Ether, "src", ["00:11:22:33:44:{:02x}".format(i) for i in range(4)]),
+      (scapy.IP, "dst", ["192.168.0.{}".format(i) for i in range(1, 4)]),
+      (scapy.UDP, "dport", range(5000, 5007))]),
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") /
+     scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.UDP(sport=1234, dport=4789, chksum=0) / scapy.Raw(PAYLOAD),
+     [(scapy.IP, "dst", ["192.168.0.{}".format(i) for i in range(1, 4)])]),
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") /
+     scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.ICMP(id=1, seq=1) / scapy.Raw(PAYLOAD),
+     [(scapy.IP, "dst", ["192.168.0.{}".format(i) for i in range(1, 4)]),
+      (scapy.ICMP, "seq", range(2, 7))]),
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") /
+     scapy.IPv6(src="fc00::1", dst="fc00::2") / scapy.TCP(sport=1234, dport=80) / scapy.Raw(PAYLOAD),
+     [(scapy.IPv6, "src", ["fc00::{:x}".format(i) for i in range(3, 8)]),
+      (scapy.IPv6, "hlim", range(10, 15)),
+      (scapy.TCP, "dport", range(1000, 1007))]),
+    (scapy.Ether(dst="00:01:02:03:04:05", src="00:06:07:08:09:0a") /
+     scapy.IPv6(src="fc00::1", dst="fc00::2") / scapy.ICMPv6EchoRequest(id=1, seq=1),
+     [(scapy.IPv6, "dst", ["fc01::{:x}".format(i) for i in range(1, 4)]),
+      (scapy.ICMPv6EchoRequest, "id", range(2, 7))]),
+]
+
+
+def build(pkt, layer_cls, name, value):
+    """Build the packet by scapy with the field set to the value and the checksums recomputed."""
+    pkt = pkt.__class__(bytes(pkt))
+    if layer_cls is not None:
+        setattr(pkt[layer_cls], name, value)
+    for layer in pkt.iterpayloads():
+        for chksum in ("chksum", "cksum"):
+            if chksum in layer.fields and layer.getfieldval(chksum) != 0:
+                delattr(layer, chksum)
+    return bytes(pkt)
+
+
+class TestPacketVariations(unittest.TestCase):
+    """Test the byte offsets, values and checksums of the send_and_count variations against scapy."""
+
+    def test_field_values(self):
+        for pkt, variations in PACKETS:
+            data = bytes(pkt)
+            for (layer_cls, name, values), variation in zip(variations, _packet_variations(pkt, variations)):
+                generator = ptf_burst.FrameGenerator(data.hex(), [variation])
+                for index, value in enumerate(values):
+                    self.assertEqual(generator.get(index), build(pkt, layer_cls, name, value),
+                                     "{} {}={}".format(pkt.summary(), name, value))
+
+    def test_combined_variations(self):
+        for pkt, variations in PACKETS:
+            generator = ptf_burst.FrameGenerator(bytes(pkt).hex(), _packet_variations(pkt, variations))
+            for index in range(20):
+                expected = pkt.__class__(bytes(pkt))
+                for layer_cls, name, values in variations:
+                    values = list(values)
+                    setattr(expected[layer_cls], name, values[index % len(values)])
+                self.assertEqual(generator.get(index), build(expected, None, None, None), pkt.summary())
+
+    def test_checksum_offsets(self):
+        for pkt, variations in PACKETS:
+            data = bytes(pkt)
+            dissected = pkt.__class__(data)
+            for layer_cls, name, values in variations:
+                offset, size, _ = _field_location(data, dissected.getlayer(layer_cls), name)
+                checksums = _checksum_offsets(dissected, data, offset, size)
+                changed = set()
+                for value in values:
+                    expected = build(pkt, layer_cls, name, value)
+                    changed.update(index for index in range(len(data))
+                                   if expected[index] != data[index] and not offset <= index < offset + size)
+                # the checksums are exactly the bytes changed by scapy outside the field
+                self.assertEqual(sorted(changed), sorted(i for chksum in checksums for i in (chksum, chksum + 1)
+                                                         if i in changed),
+                                 "{} {}".format(pkt.summary(), name))
+                for chksum in checksums:
+                    self.assertTrue(changed & {chksum, chksum + 1}, "{} {}: {}".format(pkt.summary(), name, chksum))
+
+    def test_no_checksum(self):
+        pkt = scapy.Ether() / scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.UDP(chksum=0) / scapy.Raw(PAYLOAD)
+        data = bytes(pkt)
+        variation = _packet_variations(pkt, [(scapy.Ether, "dst", ["00:00:00:00:00:01"]),
+                                             (scapy.UDP, "sport", [1])])
+        self.assertEqual(variation[0]["checksums"], [])
+        self.assertEqual(variation[0]["offset"], 0)
+        self.assertEqual(variation[1]["checksums"], [])
+        self.assertEqual(data[variation[1]["offset"] + 6:variation[1]["offset"] + 8], b"\0\0")
+
+    def test_invalid_variations(self):
+        pkt = scapy.Ether() / scapy.Dot1Q(vlan=5) / scapy.IP() / scapy.UDP()
+        # missing layer, fields which are not byte aligned, no values
+        for variation in [(scapy.TCP, "sport", [1]), (scapy.IP, "ihl", [5]), (scapy.Dot1Q, "vlan", [6]),
+                          (scapy.UDP, "sport", [])]:
+            with self.assertRaises(ValueError):
+                _packet_variations(pkt, [variation])
+        self.assertEqual(_packet_variations(pkt, [(scapy.TCP, "sport", [1])], ignore_missing=True), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
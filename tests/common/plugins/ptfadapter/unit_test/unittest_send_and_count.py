@@ -0,0 +1,91 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import ptf.packet as scapy
+from tests.common.plugins.ptfadapter.ptfadapter import PTF_BURST_REQUEST_DEST, PtfAgent, PtfTestAdapter, \
+    _port_ifaces
+
+# Two PTF hosts, the ports of the second one are numbered after the ports of the first one
+PTF_PORT_SETS = [{0: "eth0", 1: "eth1", 2: "eth2", 3: "eth3"}, {4: "eth0", 5: "eth1", 6: "eth2"}]
+
+
+class PollSuccess(object):
+    pass
+
+
+def make_adapter():
+    """Build the adapter without connecting to ptf_nn_agent, the PTF hosts return canned burst results."""
+    adapter = PtfTestAdapter.__new__(PtfTestAdapter)
+    adapter.payload_pattern = ""
+    adapter.ptfagents = [PtfAgent("10.0.0.{}".format(device), None, 10900 + device, device, port_set)
+                         for device, port_set in enumerate(PTF_PORT_SETS)]
+    adapter.ptfhosts = [MagicMock(), MagicMock()]
+    adapter._burst_script_hosts = set()
+    adapter.dataplane = MagicMock()
+    adapter.dataplane.port_to_device = lambda port: 0 if port in PTF_PORT_SETS[0] else 1
+    adapter.dataplane.PollSuccess = PollSuccess
+    adapter.dataplane.poll.return_value = None
+    return adapter
+
+
+def set_result(ptfhost, counts):
+    result = {"sent": 10, "send_time": 0.01, "counts": counts, "mismatches": {iface: 0 for iface in counts},
+              "samples": []}
+    ptfhost.shell.return_value = {"stdout_lines": [json.dumps(result)]}
+
+
+def sent_request(ptfhost):
+    for call in ptfhost.copy.call_args_list:
+        if call.kwargs.get("dest") == PTF_BURST_REQUEST_DEST:
+            return json.loads(call.kwargs["content"])
+    return None
+
+
+class TestSendAndCountPorts(unittest.TestCase):
+    """Test send_and_count maps the PTF ports to the interfaces of the PTF host."""
+
+    def setUp(self):
+        self.pkt = scapy.Ether() / scapy.IP(src="10.0.0.1", dst="10.0.0.2") / scapy.UDP() / scapy.Raw(b"\0" * 32)
+
+    def test_port_ifaces(self):
+        agents = make_adapter().ptfagents
+        self.assertEqual(_port_ifaces(agents, 0), PTF_PORT_SETS[0])
+        self.assertEqual(_port_ifaces(agents, 1), PTF_PORT_SETS[1])
+        with self.assertRaises(ValueError):
+            _port_ifaces(agents, 2)
+
+    def test_interfaces(self):
+        adapter = make_adapter()
+        set_result(adapter.ptfhosts[0], {"eth1": 4, "eth2": 6})
+        result = adapter.send_and_count(3, self.pkt, 10, ports=[1, 2])
+
+        request = sent_request(adapter.ptfhosts[0])
+        self.assertEqual(request["tx_iface"], "eth3")
+        self.assertEqual(sorted(request["rx_ifaces"]), ["eth1", "eth2"])
+        self.assertEqual(result["counts"], {1: 4, 2: 6})
+        self.assertEqual(result["mismatches"], {1: 0, 2: 0})
+        adapter.ptfhosts[1].shell.assert_not_called()
+        adapter.dataplane.flush.assert_called_once()
+
+    def test_default_ports(self):
+        # All ports of the PTF host of the sending port, each one with its own count
+        adapter = make_adapter()
+        set_result(adapter.ptfhosts[1], {"eth0": 1, "eth1": 2, "eth2": 3})
+        result = adapter.send_and_count(5, self.pkt, 10)
+
+        request = sent_request(adapter.ptfhosts[1])
+        self.assertEqual(request["tx_iface"], "eth1")
+        self.assertEqual(sorted(request["rx_ifaces"]), ["eth0", "eth1", "eth2"])
+        self.assertEqual(result["counts"], {4: 1, 5: 2, 6: 3})
+        adapter.ptfhosts[0].shell.assert_not_called()
+
+    def test_ports_of_other_ptf_host(self):
+        adapter = make_adapter()
+        with self.assertRaises(ValueError):
+            adapter.send_and_count(0, self.pkt, 10, ports=[1, 4])
+        adapter.ptfhosts[0].shell.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import logging
 import copy
 import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 
 import pytest
@@ -13,6 +15,7 @@ from tests.common.plugins.sanity_check import constants
 from tests.common.plugins.sanity_check import checks
 from tests.common.plugins.sanity_check.checks import *      # noqa: F401, F403
 from tests.common.plugins.sanity_check.recover import recover, recover_chassis
+from tests.common.plugins.sanity_check.snapshot import collect_dut_snapshots
 from tests.common.plugins.sanity_check.constants import STAGE_PRE_TEST, STAGE_POST_TEST
 from tests.common.helpers.assertions import pytest_assert as pt_assert
 from tests.common.helpers.custom_msg_utils import add_custom_msg
@@ -142,16 +145,101 @@ def filter_check_items(tbinfo, duthosts, check_items):
     return filtered_check_items
 
 
+def _run_check_item(check_fixture, *args, **kwargs):
+    start_time = time.time()
+    results = check_fixture(*args, **kwargs)
+    return results, time.time() - start_time
+
+
+def _schedule_check_items(check_fixtures, max_workers, *args, **kwargs):
+    """
+    @summary: Run the check functions concurrently, following CHECK_ITEM_DEPENDENCIES and EXCLUSIVE_CHECK_ITEMS.
+    @param check_fixtures: Dict of check item name to the check function returned by the check fixture.
+    @param max_workers: Max number of check items running concurrently.
+    @return: Dict of check item name to tuple (check results, duration in seconds).
+    """
+    if max_workers <= 1:
+        # Run the check items in the calling thread, so that they don't fork processes from worker threads
+        return {item: _run_check_item(check_fixture, *args, **kwargs)
+                for item, check_fixture in check_fixtures.items()}
+
+    pending = list(check_fixtures.keys())
+    running = {}        # Future -> check item
+    completed = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for item in list(pending):
+                if len(running) >= max_workers:
+                    break
+                exclusive = item in constants.EXCLUSIVE_CHECK_ITEMS
+                if running and (exclusive or any(i in constants.EXCLUSIVE_CHECK_ITEMS for i in running.values())):
+                    # Keep the order, don't start later check items before the exclusive one
+                    break
+                dependencies = [i for i in constants.CHECK_ITEM_DEPENDENCIES.get(item, []) if i in check_fixtures]
+                if not all(i in completed for i in dependencies):
+                    continue
+                pending.remove(item)
+                running[executor.submit(_run_check_item, check_fixtures[item], *args, **kwargs)] = item
+                if exclusive:
+                    break
+
+            if pending and not running:
+                # Dependencies cannot be satisfied, e.g. circular dependencies. Start the first one anyway.
+                item = pending.pop(0)
+                logger.warning("Dependencies of check item '{}' cannot be satisfied, run it anyway".format(item))
+                running[executor.submit(_run_check_item, check_fixtures[item], *args, **kwargs)] = item
+
+            done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                try:
+                    completed[item] = future.result()
+                except BaseException as e:
+                    logger.error("Check item '{}' raised exception: {}".format(item, repr(e)))
+                    errors.append(e)
+                    # Don't start the remaining check items, wait for the running ones and fail
+                    pending = []
+
+    if errors:
+        raise errors[0]
+    return completed
+
+
 def do_checks(request, check_items, *args, **kwargs):
-    check_results = []
+    # Getting fixture value is not thread safe, get all the check functions before running them
+    check_fixtures = {}
     for item in check_items:
-        check_fixture = request.getfixturevalue(item)
-        results = check_fixture(*args, **kwargs)
+        check_fixtures[item] = request.getfixturevalue(item)
+
+    max_workers = request.config.getoption("--sanity_check_concurrency", default=None)
+    if max_workers is None:
+        max_workers = constants.DEFAULT_CHECK_CONCURRENCY
+    max_workers = max(1, max_workers)
+
+    # Read the DUT state shared by the check items once, before starting them
+    if 'snapshots' not in kwargs:
+        kwargs['snapshots'] = collect_dut_snapshots(request.getfixturevalue('duthosts'), check_items, max_workers)
+
+    completed = _schedule_check_items(check_fixtures, max_workers, *args, **kwargs)
+
+    check_results = []
+    for item in check_fixtures:
+        results, duration = completed[item]
         logger.debug("check results of each item {}".format(results))
         if results and isinstance(results, list):
-            check_results.extend(results)
+            item_results = results
         elif results:
-            check_results.append(results)
+            item_results = [results]
+        else:
+            item_results = []
+        for result in item_results:
+            if isinstance(result, dict):
+                result['duration'] = round(duration, 2)
+        check_results.extend(item_results)
+
+    logger.info("Duration of sanity check items: {}".format(
+        ", ".join("{}: {:.1f}s".format(item, completed[item][1]) for item in check_fixtures)))
     return check_results
 
 
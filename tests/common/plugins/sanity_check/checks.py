@@ -15,6 +15,7 @@ from tests.common.dualtor.constants import UPPER_TOR, LOWER_TOR, NIC
 from tests.common.dualtor.dual_tor_common import CableType, active_standby_ports                # noqa: F401
 from tests.common.cache import FactsCache
 from tests.common.plugins.sanity_check.constants import STAGE_PRE_TEST, STAGE_POST_TEST
+from tests.common.plugins.sanity_check.snapshot import get_dut_snapshot
 from tests.common.helpers.parallel import parallel_run, reset_ansible_local_tmp
 from tests.common.dualtor.mux_simulator_control import _probe_mux_ports
 from tests.common.fixtures.duthost_utils import check_bgp_router_id
@@ -106,9 +107,10 @@ def check_interfaces(duthosts):
     def _check_interfaces_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
+        snapshot = get_dut_snapshot(dut, kwargs.get('snapshots'))
         logger.info("Checking interfaces status on %s..." % dut.hostname)
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = snapshot.get_networking_uptime().seconds
         timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
         if dut.get_facts().get("modular_chassis"):
             timeout = max(timeout, 600)
@@ -120,8 +122,7 @@ def check_interfaces(duthosts):
         check_result = {"failed": True, "check_item": "interfaces", "host": dut.hostname}
         for asic in dut.asics:
             ip_interfaces = []
-            cfg_facts = asic.config_facts(host=dut.hostname,
-                                          source="persistent", verbose=False)['ansible_facts']
+            cfg_facts = snapshot.config_facts(asic)
             phy_interfaces = [k for k, v in list(cfg_facts["PORT"].items()) if
                               "admin_status" in v and v["admin_status"] == "up"]
             if "PORTCHANNEL_INTERFACE" in cfg_facts:
@@ -267,7 +268,7 @@ def check_bgp(duthosts, tbinfo):
             results[dut.hostname] = check_result
             return
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = get_dut_snapshot(dut, kwargs.get('snapshots')).get_networking_uptime().seconds
         if SYSTEM_STABILIZE_MAX_TIME - networking_uptime + 480 > 500:
             # If max_timeout is higher than 600, it will exceed parallel_run's timeout
             # the check will be killed by parallel_run, we can't get expected results.
@@ -343,12 +344,12 @@ def check_dbmemory(duthosts):
         dut = kwargs['node']
         results = kwargs['results']
 
+        snapshot = get_dut_snapshot(dut, kwargs.get('snapshots'))
         logger.info("Checking database memory on %s..." % dut.hostname)
-        redis_cmd = "client list"
         check_result = {"failed": False, "check_item": "dbmemory", "host": dut.hostname}
         # check the db memory on the redis instance running on each instance
         for asic in dut.asics:
-            res = asic.run_redis_cli_cmd(redis_cmd)['stdout_lines']
+            res = snapshot.redis_client_list(asic)
             result, total_omem, non_zero_output = _is_db_omem_over_threshold(res)
             check_result["total_omem"] = total_omem
             if result:
@@ -795,8 +796,9 @@ def check_monit(duthosts):
         dut = kwargs['node']
         results = kwargs['results']
 
+        snapshot = get_dut_snapshot(dut, kwargs.get('snapshots'))
         logger.info("Checking status of each Monit service...")
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = snapshot.get_networking_uptime().seconds
         timeout = max((MONIT_STABILIZE_MAX_TIME - networking_uptime), 0)
         interval = 20
         logger.info("networking_uptime = {} seconds, timeout = {} seconds, interval = {} seconds"
@@ -805,7 +807,7 @@ def check_monit(duthosts):
         check_result = {"failed": False, "check_item": "monit", "host": dut.hostname}
 
         if timeout == 0:
-            monit_services_status = dut.get_monit_services_status()
+            monit_services_status = snapshot.get_monit_services_status()
             if not monit_services_status:
                 logger.info("Monit was not running.")
                 check_result["failed"] = True
@@ -821,7 +823,7 @@ def check_monit(duthosts):
             is_monit_running = False
             while elapsed < timeout:
                 check_result["failed"] = False
-                monit_services_status = dut.get_monit_services_status()
+                monit_services_status = snapshot.get_monit_services_status()
                 if not monit_services_status:
                     wait(interval, msg="Monit was not started and wait {} seconds to retry. Remaining time: {}."
                          .format(interval, timeout - elapsed))
@@ -866,9 +868,10 @@ def check_processes(duthosts):
     def _check_processes_on_dut(*args, **kwargs):
         dut = kwargs['node']
         results = kwargs['results']
+        snapshot = get_dut_snapshot(dut, kwargs.get('snapshots'))
         logger.info("Checking process status on %s..." % dut.hostname)
 
-        networking_uptime = dut.get_networking_uptime().seconds
+        networking_uptime = snapshot.get_networking_uptime().seconds
         timeout = max((SYSTEM_STABILIZE_MAX_TIME - networking_uptime), 0)
         interval = 20
         logger.info("networking_uptime=%d seconds, timeout=%d seconds, interval=%d seconds" %
@@ -876,7 +879,7 @@ def check_processes(duthosts):
 
         check_result = {"failed": False, "check_item": "processes", "host": dut.hostname}
         if timeout == 0:  # Check processes status, do not retry.
-            processes_status = dut.all_critical_process_status()
+            processes_status = snapshot.all_critical_process_status()
             check_result["processes_status"] = processes_status
             check_result["services_status"] = {}
             for container_name, processes in list(processes_status.items()):
@@ -892,7 +895,7 @@ def check_processes(duthosts):
             elapsed = 0
             while elapsed < timeout:
                 check_result["failed"] = False
-                processes_status = dut.all_critical_process_status()
+                processes_status = snapshot.all_critical_process_status()
                 check_result["processes_status"] = processes_status
                 check_result["services_status"] = {}
                 for container_name, processes in list(processes_status.items()):
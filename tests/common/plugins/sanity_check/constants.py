@@ -19,6 +19,19 @@ INFRA_CHECK_ITEMS = [
     "mux_simulator"
 ]
 
+# Scheduling of the check items. Check items are run concurrently, except that:
+# * A check item is started after the check items it depends on are completed.
+# * An exclusive check item is run when no other check item is running.
+CHECK_ITEM_DEPENDENCIES = {
+    # check item: [check items that must be completed before it is started]
+}
+EXCLUSIVE_CHECK_ITEMS = [
+    "check_mux_simulator",      # May restart linkmgrd on the DUTs and restart the mux/nic simulator
+]
+# Max number of check items running concurrently. Many check items fork processes (parallel_run), forking from
+# worker threads may deadlock the children, so the check items are run one by one in the main thread by default.
+DEFAULT_CHECK_CONCURRENCY = 1
+
 # Recover related definitions
 RECOVER_METHODS = {
     "config_reload": {
@@ -0,0 +1,225 @@
+"""Snapshot of the DUT state shared by the sanity check items.
+
+Several check items read the same data from the DUTs: networking uptime, persistent config, monit status,
+critical processes status and redis client list. The snapshot reads all the data needed by the selected check
+items by one 'shell_cmds' run per DUT before the check items are started. The check items use the snapshot for
+their first attempt, and read the data from the DUT again only when they retry.
+"""
+import json
+import logging
+import time
+
+from datetime import datetime, timedelta
+
+from tests.common.helpers.multi_thread_utils import run_concurrently
+from tests.common.helpers.constants import DEFAULT_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+SECTION_UPTIME = "uptime"
+SECTION_CONFIG = "config"
+SECTION_MONIT = "monit"
+SECTION_PROCESSES = "processes"
+SECTION_DBMEMORY = "dbmemory"
+
+# Sections of the snapshot used by each check item
+CHECK_ITEM_SECTIONS = {
+    "check_interfaces": [SECTION_UPTIME, SECTION_CONFIG],
+    "check_bgp": [SECTION_UPTIME],
+    "check_dbmemory": [SECTION_DBMEMORY],
+    "check_monit": [SECTION_UPTIME, SECTION_MONIT],
+    "check_processes": [SECTION_UPTIME, SECTION_PROCESSES],
+}
+
+PERSISTENT_CONFIG_PATH = "/etc/sonic/config_db{}.json"
+REDIS_CLIENT_LIST_CMD = "/usr/bin/redis-cli client list"
+TABLE_NAME_SEPARATOR = "|"
+SNAPSHOT_CMD_TIMEOUT = 60
+
+
+def _format_config(config):
+    """
+    @summary: Convert config DB data to the format of config_facts, i.e. 'TABLE|KEY1|KEY2' is converted to
+              {TABLE: {KEY1: {KEY2: ...}}}.
+    """
+    facts = {}
+    for table, items in list(config.items()):
+        data = {}
+        for key, entry in list(items.items()):
+            if TABLE_NAME_SEPARATOR in key:
+                key_l1, key_l2 = key.split(TABLE_NAME_SEPARATOR, 1)
+                data.setdefault(key_l1, {})[key_l2] = entry
+            elif key not in data:
+                data[key] = entry
+            else:
+                data[key].update(entry)
+        facts[table] = data
+    return facts
+
+
+def _asic_id(asic):
+    return "" if asic.namespace == DEFAULT_NAMESPACE else str(asic.asic_index)
+
+
+class DutSnapshot(object):
+    """
+    @summary: State of a DUT read by one 'shell_cmds' run.
+
+    Each getter falls back to reading the data from the DUT if the section was not collected. Data which may change
+    while a check item is waiting for the DUT to be stable (monit, processes, redis clients) is returned from the
+    snapshot only once, further calls read the data from the DUT.
+    """
+
+    def __init__(self, dut):
+        self.dut = dut
+        self.collected_at = None
+        self.sections = set()
+        self._networking_uptime = None
+        self._config_facts = {}
+        self._monit_services_status = None
+        self._critical_process_status = None
+        self._redis_client_list = {}
+
+    def collect(self, sections):
+        """
+        @summary: Read the sections of the snapshot from the DUT by one 'shell_cmds' run.
+        @param sections: Iterable of the SECTION_* names.
+        """
+        sections = set(sections)
+        cmds = []
+        positions = {}      # section -> (start, end) of its commands in cmds
+
+        def _add_cmds(section, section_cmds):
+            positions[section] = (len(cmds), len(cmds) + len(section_cmds))
+            cmds.extend(section_cmds)
+
+        if SECTION_UPTIME in sections:
+            _add_cmds(SECTION_UPTIME, ["systemctl -p ExecMainStartTimestamp show networking",
+                                       'date +"%Y-%m-%d %H:%M:%S"'])
+        if SECTION_CONFIG in sections:
+            _add_cmds(SECTION_CONFIG, ["cat {}".format(PERSISTENT_CONFIG_PATH.format(_asic_id(asic)))
+                                       for asic in self.dut.asics])
+        if SECTION_MONIT in sections:
+            _add_cmds(SECTION_MONIT, ["sudo monit status"])
+        if SECTION_PROCESSES in sections:
+            _add_cmds(SECTION_PROCESSES, self.dut.critical_group_process_cmds() +
+                      self.dut.critical_process_status_cmds())
+        if SECTION_DBMEMORY in sections:
+            _add_cmds(SECTION_DBMEMORY, [REDIS_CLIENT_LIST_CMD if asic.namespace == DEFAULT_NAMESPACE else
+                                         "sudo ip netns exec {} {}".format(asic.namespace, REDIS_CLIENT_LIST_CMD)
+                                         for asic in self.dut.asics])
+        if not cmds:
+            return self
+
+        start_time = time.time()
+        results = self.dut.shell_cmds(cmds=cmds, continue_on_fail=True, module_ignore_errors=True,
+                                      timeout=SNAPSHOT_CMD_TIMEOUT)['results']
+        self.collected_at = time.time()
+        logger.info("Collected sanity check snapshot {} on {} in {:.1f} seconds".format(
+            sorted(positions.keys()), self.dut.hostname, self.collected_at - start_time))
+
+        for section, (start, end) in list(positions.items()):
+            try:
+                self._parse_section(section, results[start:end])
+                self.sections.add(section)
+            except Exception as e:
+                logger.warning("Failed to parse sanity check snapshot section {} of {}, read it from DUT when used: {}"
+                               .format(section, self.dut.hostname, repr(e)))
+        return self
+
+    def _parse_section(self, section, results):
+        if len(results) == 0 or any(res.get('rc') is None for res in results):
+            raise ValueError("Commands of the section were not run")
+
+        if section == SECTION_UPTIME:
+            props = dict(line.split("=", 1) for line in results[0]['stdout_lines'] if "=" in line)
+            now = datetime.strptime(results[1]['stdout'].strip(), "%Y-%m-%d %H:%M:%S")
+            self._networking_uptime = now - datetime.strptime(props["ExecMainStartTimestamp"],
+                                                              "%a %Y-%m-%d %H:%M:%S %Z")
+        elif section == SECTION_CONFIG:
+            for asic, res in zip(self.dut.asics, results):
+                if res['rc'] == 0:
+                    self._config_facts[asic.asic_index] = _format_config(json.loads(res['stdout']))
+        elif section == SECTION_MONIT:
+            self._monit_services_status = {} if results[0]['rc'] != 0 else \
+                self.dut.parse_monit_services_status(results[0]['stdout_lines'])
+        elif section == SECTION_PROCESSES:
+            num_services = len(self.dut.critical_process_status_cmds())
+            group_process_results = self.dut.parse_critical_group_process(results[:-num_services])
+            self._critical_process_status = self.dut.parse_all_critical_process_status(
+                group_process_results, results[-num_services:])
+        elif section == SECTION_DBMEMORY:
+            for asic, res in zip(self.dut.asics, results):
+                if res['rc'] == 0:
+                    self._redis_client_list[asic.asic_index] = res['stdout_lines']
+
+    def get_networking_uptime(self):
+        if self._networking_uptime is None:
+            return self.dut.get_networking_uptime()
+        return self._networking_uptime + timedelta(seconds=time.time() - self.collected_at)
+
+    def config_facts(self, asic):
+        """
+        @summary: Get persistent config facts of the asic, the same as config_facts(source="persistent").
+        """
+        if asic.asic_index not in self._config_facts:
+            return asic.config_facts(host=self.dut.hostname, source="persistent", verbose=False)['ansible_facts']
+        return self._config_facts[asic.asic_index]
+
+    def get_monit_services_status(self):
+        monit_services_status, self._monit_services_status = self._monit_services_status, None
+        if monit_services_status is None:
+            return self.dut.get_monit_services_status()
+        return monit_services_status
+
+    def all_critical_process_status(self):
+        critical_process_status, self._critical_process_status = self._critical_process_status, None
+        if critical_process_status is None:
+            return self.dut.all_critical_process_status()
+        return critical_process_status
+
+    def redis_client_list(self, asic):
+        client_list = self._redis_client_list.pop(asic.asic_index, None)
+        if client_list is None:
+            return asic.run_redis_cli_cmd("client list")['stdout_lines']
+        return client_list
+
+
+def collect_dut_snapshots(duthosts, check_items, max_workers=1):
+    """
+    @summary: Collect snapshots of the frontend DUTs for the check items. The DUTs without snapshot, like the
+              supervisor of a chassis, read their state when the check items run.
+    @param duthosts: The DUTs.
+    @param check_items: Names of the check items to be run.
+    @param max_workers: Max number of DUTs collected concurrently, the DUTs are collected one by one if it is 1.
+    @return: Dict of hostname to DutSnapshot. Snapshot of a DUT is empty if collecting it failed.
+    """
+    sections = set()
+    for item in check_items:
+        sections.update(CHECK_ITEM_SECTIONS.get(item, []))
+    if not sections:
+        return {}
+
+    def _collect(dut):
+        try:
+            return DutSnapshot(dut).collect(sections)
+        except Exception as e:
+            logger.warning("Failed to collect sanity check snapshot on {}: {}".format(dut.hostname, repr(e)))
+            return DutSnapshot(dut)
+
+    duts = list(duthosts.frontend_nodes)
+    if max_workers <= 1 or len(duts) <= 1:
+        snapshots = [_collect(dut) for dut in duts]
+    else:
+        snapshots = run_concurrently(_collect, duts, max_workers=min(max_workers, len(duts)),
+                                     describe=lambda dut: dut.hostname)
+    return {dut.hostname: snapshot for dut, snapshot in zip(duts, snapshots)}
+
+
+def get_dut_snapshot(dut, snapshots=None):
+    """
+    @summary: Get snapshot of the DUT, or an empty snapshot reading all the data from the DUT.
+    """
+    if snapshots and dut.hostname in snapshots:
+        return snapshots[dut.hostname]
+    return DutSnapshot(dut)
@@ -169,6 +169,117 @@ def wait_until(timeout, interval, delay, condition, *args, **kwargs):
         return False
 
 
+# Keyspace event of a DB key, timestamp is the DUT time in seconds when the event was received by the subscriber
+DbEvent = collections.namedtuple("DbEvent", ["timestamp", "key", "event"])
+
+
+class DbConditionResult(object):
+    """
+    @summary: Result of wait_for_db_condition, True if the condition became True before timeout.
+
+    timestamp: DUT time in seconds (millisecond resolution) of the last event before the condition became True.
+        Local time of the check if the DB events were not available or the condition was True without an event.
+        None if the condition did not become True.
+    events: List of DbEvent received while waiting.
+    """
+
+    def __init__(self, met, timestamp=None, events=None):
+        self.met = met
+        self.timestamp = timestamp
+        self.events = events or []
+
+    def __bool__(self):
+        return bool(self.met)
+
+    def __repr__(self):
+        return "DbConditionResult(met={}, timestamp={}, events={})".format(self.met, self.timestamp, len(self.events))
+
+
+def _check_condition(condition, *args, **kwargs):
+    try:
+        return condition(*args, **kwargs)
+    except Exception as e:
+        exc_info = sys.exc_info()
+        details = traceback.format_exception(*exc_info)
+        logger.error(
+            "Exception caught while checking {}:{}, error:{}".format(
+                condition.__name__, "".join(details), e
+            )
+        )
+        return False
+
+
+def wait_for_db_condition(duthost, db, key_patterns, timeout, interval, delay, condition, *args, **kwargs):
+    """
+    @summary: Wait until the specified condition is True or timeout, checking the condition when the DB keys change.
+
+    The keyspace events of the keys matching the patterns are streamed from the DUT over one subscription, the
+    condition is checked when the events arrive, and every interval seconds without events. If the subscription
+    is not possible, e.g. keyspace events are not enabled in the DB, the condition is polled like wait_until does.
+
+    @param duthost: The SonicHost to subscribe to.
+    @param db: DB name, e.g. 'STATE_DB'.
+    @param key_patterns: List of glob-style key patterns, e.g. ['PORT_TABLE|Ethernet0'].
+    @param timeout: Maximum time to wait
+    @param interval: Check interval without events, and poll interval if the DB events are not available
+    @param delay: Delay time
+    @param condition: A function that returns False or True
+    @param *args: Extra args required by the 'condition' function.
+    @param **kwargs: Extra args required by the 'condition' function. Keyword 'namespace' is the namespace of the
+        DB on multi ASIC DUT and is not passed to the condition.
+    @return: DbConditionResult, True if the condition function returns True before timeout.
+    """
+    namespace = kwargs.pop("namespace", None)
+    logger.debug("Wait until %s is True on %s events of %s, timeout is %s seconds, checking interval is %s, "
+                 "delay is %s seconds" % (condition.__name__, db, key_patterns, timeout, interval, delay))
+
+    if delay > 0:
+        logger.debug("Delay for %s seconds first" % delay)
+        time.sleep(delay)
+
+    start_time = time.time()
+    # Subscribe before the first check, so that no change can be missed between the check and the subscription
+    events = duthost.subscribe_db_events(db, key_patterns, timeout, namespace=namespace)
+    if events is None:
+        logger.debug("%s events are not available, polling %s" % (db, condition.__name__))
+        met = wait_until(timeout, interval, 0, condition, *args, **kwargs)
+        return DbConditionResult(met, time.time() if met else None)
+
+    received = []
+    try:
+        if _check_condition(condition, *args, **kwargs):
+            logger.debug("%s is True, exit early with True" % condition.__name__)
+            return DbConditionResult(True, time.time())
+
+        last_check_time = time.time()
+        for batch in events:
+            now = time.time()
+            if now - start_time >= timeout:
+                break
+            received.extend(batch)
+            if not batch and now - last_check_time < interval:
+                continue
+
+            last_check_time = now
+            if _check_condition(condition, *args, **kwargs):
+                timestamp = batch[-1].timestamp if batch else time.time()
+                logger.debug("%s is True after %d events, exit with True" % (condition.__name__, len(received)))
+                return DbConditionResult(True, timestamp, received)
+            logger.debug("%s is False after %d events, wait for events" % (condition.__name__, len(received)))
+    finally:
+        events.close()
+
+    # The subscription ended early, e.g. the SSH session was lost
+    remaining = timeout - (time.time() - start_time)
+    if remaining > 0:
+        logger.debug("%s events ended, polling %s for %d seconds" % (db, condition.__name__, remaining))
+        met = wait_until(remaining, interval, 0, condition, *args, **kwargs)
+        return DbConditionResult(met, time.time() if met else None, received)
+
+    logger.debug("%s is still False after %d seconds, exit with False" % (condition.__name__, timeout))
+    return DbConditionResult(False, None, received)
+
+
 async def async_wait_until(timeout, interval, delay, condition, *args, **kwargs):
     """
     @summary: Same as wait_until but async
@@ -171,6 +171,8 @@ def pytest_addoption(parser):
                      help="Change (add|remove) post test check items based on pre test check items")
     parser.addoption("--recover_method", action="store", default="adaptive",
                      help="Set method to use for recover if sanity failed")
+    parser.addoption("--sanity_check_concurrency", action="store", default=None, type=int,
+                     help="Max number of sanity check items running concurrently, default 1 to run them one by one")
 
     ########################
     #   pre-test options   #
@@ -251,6 +253,13 @@ def pytest_addoption(parser):
                      help="File to store the state of the parallel run")
     parser.addoption("--is_parallel_leader", action="store_true", default=False, help="Is the parallel leader")
     parser.addoption("--parallel_followers", action="store", default=0, type=int, help="Number of parallel followers")
+    parser.addoption("--dut_concurrency", action="store", default=1, type=int,
+                     help="Maximum number of DUTs an ansible module called on duthosts runs on concurrently")
+    parser.addoption("--asic_concurrency", action="store", default=1, type=int,
+                     help="Maximum number of ASICs an ansible module called with asic_index='all' runs on "
+                          "concurrently")
+    parser.addoption("--fast_shell", action="store_true", default=False,
+                     help="Run plain DUT shell/command calls over a persistent SSH session instead of ansible")
 
     ############################
     #   SmartSwitch options    #
@@ -512,6 +521,9 @@ def fixture_duthosts(enhance_inventory, ansible_adhoc, tbinfo, request):
     @param request: pytest request object
     """
     try:
+        DutHosts.set_concurrency(dut_concurrency=request.config.getoption("--dut_concurrency"),
+                                 asic_concurrency=request.config.getoption("--asic_concurrency"))
+        SonicHost.fast_shell_enabled = request.config.getoption("--fast_shell")
         host = DutHosts(ansible_adhoc, tbinfo, request, get_specified_duts(request),
                         target_hostname=get_target_hostname(request), is_parallel_leader=is_parallel_leader(request))
         return host
@@ -0,0 +1,248 @@
+"""Send a burst of packets from a PTF interface and count the expected packets received on PTF interfaces.
+
+The script is run on the PTF host by PtfTestAdapter.send_and_count, so that the packets are not moved one by
+one between sonic-mgmt and ptf_nn_agent. It has no dependency other than python3.
+
+Usage: ptf_burst.py <request json file>, the result is printed as one JSON object.
+
+Request:
+    tx_iface: Interface to send the packets from.
+    rx_ifaces: Interfaces to count the received packets on.
+    count: Number of packets to send.
+    frame: Hex string of the template packet.
+    variations: Fields changed per packet, list of {"offset", "values", "checksums"}. Packet i gets the hex value
+        values[i % len(values)] at the offset, and the internet checksums at the offsets in checksums are updated.
+    exp_frame, exp_mask, exp_variations: Expected packet, mask of the compared bits and its variations. A received
+        packet matches if its masked bytes are the same as the ones of the expected packet of any sent packet.
+    marker: Hex string, a received packet not matching the expected packets is a mismatch only if it contains
+        the marker. Other packets, e.g. background traffic, are ignored.
+    timeout: Time in seconds to wait for more packets after the last received one.
+    max_samples: Maximum number of mismatched packets returned.
+"""
+import errno
+import json
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+ETH_P_ALL = 0x0003
+ETH_P_8021Q = 0x8100
+SOL_PACKET = 263
+PACKET_AUXDATA = 8
+PACKET_OUTGOING = 4
+TP_STATUS_VLAN_VALID = 1 << 4
+TP_STATUS_VLAN_TPID_VALID = 1 << 6
+# struct tpacket_auxdata: status, len, snaplen, mac, net, vlan_tci, vlan_tpid
+AUXDATA = struct.Struct("IIIHHHH")
+RCVBUF_SIZE = 16 * 1024 * 1024
+
+
+def checksum_update(chksum, old, new):
+    """Incremental update of internet checksum, RFC 1624: HC' = ~(~HC + ~m + m')"""
+    total = ~chksum & 0xFFFF
+    for index in range(0, len(old), 2):
+        total += ~((old[index] << 8) | old[index + 1]) & 0xFFFF
+        total += (new[index] << 8) | new[index + 1]
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+class FrameGenerator(object):
+    """Generate the frames of the burst from the template and its variations."""
+
+    def __init__(self, frame, variations):
+        self.frame = bytes(bytearray.fromhex(frame))
+        self.variations = []
+        for variation in variations or []:
+            values = [bytes(bytearray.fromhex(value)) for value in variation["values"]]
+            self.variations.append((variation["offset"], values, variation.get("checksums", [])))
+
+    def get(self, index):
+        if not self.variations:
+            return self.frame
+        buf = bytearray(self.frame)
+        for offset, values, checksums in self.variations:
+            new = values[index % len(values)]
+            old = buf[offset:offset + len(new)]
+            if old == new:
+                continue
+            # the checksum is computed over 16 bit words, align the changed bytes to them
+            start, end = offset, offset + len(new)
+            aligned_old = bytearray(buf[start - start % 2:end + end % 2])
+            buf[start:end] = new
+            aligned_new = buf[start - start % 2:end + end % 2]
+            for chksum_offset in checksums:
+                chksum = (buf[chksum_offset] << 8) | buf[chksum_offset + 1]
+                chksum = checksum_update(chksum, aligned_old, aligned_new)
+                buf[chksum_offset:chksum_offset + 2] = struct.pack("!H", chksum)
+        return bytes(buf)
+
+
+class Matcher(object):
+    """Match the received frames with the masked bytes of the expected frames."""
+
+    def __init__(self, request):
+        generator = FrameGenerator(request["exp_frame"], request.get("exp_variations"))
+        self.size = len(generator.frame)
+        mask = bytes(bytearray.fromhex(request["exp_mask"])) if request.get("exp_mask") else b"\xff" * self.size
+        self.mask = int.from_bytes(mask, "big")
+        count = request["count"]
+        if request.get("exp_variations"):
+            # the expected frames repeat after the least common multiple of the value list lengths
+            count = min(count, self._period(request["exp_variations"]))
+        self.keys = set(self._key(generator.get(index)) for index in range(count))
+
+    @staticmethod
+    def _period(variations):
+        period = 1
+        for variation in variations:
+            length = len(variation["values"])
+            a, b = period, length
+            while b:
+                a, b = b, a % b
+            period = period * length // a
+        return period
+
+    def _key(self, frame):
+        return int.from_bytes(frame[:self.size], "big") & self.mask
+
+    def match(self, frame):
+        return len(frame) >= self.size and self._key(frame) in self.keys
+
+
+def open_socket(iface):
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_SIZE)
+    sock.setsockopt(SOL_PACKET, PACKET_AUXDATA, 1)
+    sock.bind((iface, ETH_P_ALL))
+    sock.setblocking(False)
+    return sock
+
+
+def recv_frame(sock):
+    """Receive a frame, restore the VLAN tag stripped by the NIC. Returns None for the sent frames."""
+    data, ancdata, _, addr = sock.recvmsg(65535, socket.CMSG_SPACE(AUXDATA.size))
+    if addr[2] == PACKET_OUTGOING:
+        return None
+    for level, cmsg_type, cmsg_data in ancdata:
+        if level != SOL_PACKET or cmsg_type != PACKET_AUXDATA or len(cmsg_data) < AUXDATA.size:
+            continue
+        status, _, _, _, _, vlan_tci, vlan_tpid = AUXDATA.unpack_from(cmsg_data)
+        if vlan_tci or status & TP_STATUS_VLAN_VALID:
+            if not status & TP_STATUS_VLAN_TPID_VALID:
+                vlan_tpid = ETH_P_8021Q
+            data = data[:12] + struct.pack("!HH", vlan_tpid, vlan_tci) + data[12:]
+    return data
+
+
+class Receiver(threading.Thread):
+    """Count the matched and mismatched frames per interface until stopped."""
+
+    def __init__(self, rx_ifaces, matcher, marker, max_samples):
+        super(Receiver, self).__init__()
+        self.daemon = True
+        # the sockets are opened before sending, so that no packet is missed
+        self.socks = {}
+        for iface in rx_ifaces:
+            sock = open_socket(iface)
+            self.socks[sock.fileno()] = (sock, iface)
+        self.matcher = matcher
+        self.marker = marker
+        self.max_samples = max_samples
+        self.counts = {iface: 0 for iface in rx_ifaces}
+        self.mismatches = {iface: 0 for iface in rx_ifaces}
+        self.samples = []
+        self.matched = 0
+        self.last_time = time.time()
+        self.stopped = threading.Event()
+
+    def close(self):
+        for sock, _ in self.socks.values():
+            sock.close()
+
+    def run(self):
+        poller = select.poll()
+        for fd in self.socks:
+            poller.register(fd, select.POLLIN)
+        while not self.stopped.is_set():
+            for fd, _ in poller.poll(100):
+                sock, iface = self.socks[fd]
+                while True:
+                    try:
+                        frame = recv_frame(sock)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    if frame is None:
+                        continue
+                    self.handle(iface, frame)
+
+    def handle(self, iface, frame):
+        if self.matcher.match(frame):
+            self.counts[iface] += 1
+            self.matched += 1
+            self.last_time = time.time()
+        elif not self.marker or self.marker in frame:
+            self.mismatches[iface] += 1
+            self.last_time = time.time()
+            if len(self.samples) < self.max_samples:
+                self.samples.append({"iface": iface, "frame": frame.hex()})
+
+
+def run(request):
+    matcher = Matcher(request)
+    marker = bytes(bytearray.fromhex(request["marker"])) if request.get("marker") else b""
+    receiver = Receiver(request["rx_ifaces"], matcher, marker, request.get("max_samples", 5))
+    receiver.start()
+
+    tx_sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+    tx_sock.bind((request["tx_iface"], 0))
+    generator = FrameGenerator(request["frame"], request.get("variations"))
+    count = request["count"]
+    start_time = time.time()
+    sent = 0
+    for index in range(count):
+        frame = generator.get(index)
+        while True:
+            try:
+                tx_sock.send(frame)
+                break
+            except socket.error as e:
+                # the send queue of the interface is full
+                if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                    raise
+                time.sleep(0.001)
+        sent += 1
+    send_time = time.time()
+
+    # wait until all the sent packets are matched or no packet is received in timeout
+    receiver.last_time = max(receiver.last_time, send_time)
+    timeout = request.get("timeout", 1)
+    while receiver.matched < count and time.time() - receiver.last_time < timeout:
+        time.sleep(0.01)
+    receiver.stopped.set()
+    receiver.join()
+    receiver.close()
+    tx_sock.close()
+
+    return {
+        "sent": sent,
+        "counts": receiver.counts,
+        "mismatches": receiver.mismatches,
+        "samples": receiver.samples,
+        "send_time": send_time - start_time,
+        "total_time": time.time() - start_time,
+    }
+
+
+def main():
+    with open(sys.argv[1]) as f:
+        request = json.load(f)
+    print(json.dumps(run(request)))
+
+
+if __name__ == "__main__":
+    main()